@@ -22,7 +22,7 @@ class BestCpTimes(AppConfig):
 		self.widget = None
 
 	async def on_start(self):
-		self.context.signals.listen(tm_signals.waypoint, self.player_cp)
+		self.context.signals.listen(tm_signals.waypoint_batch, self.player_cps)
 		self.context.signals.listen(mp_signals.player.player_connect, self.player_connect)
 		self.context.signals.listen(mp_signals.map.map_begin, self.map_begin)
 		self.context.signals.listen(mp_signals.map.map_start__end, self.map_end)
@@ -32,12 +32,24 @@ class BestCpTimes(AppConfig):
 
 	# When a player passes a CP
 	async def player_cp(self, player, raw, *args, **kwargs):
+		if self.set_player_cp(player, raw):
+			await self.widget.display()
+
+	# When players passed CPs (batched)
+	async def player_cps(self, events, *args, **kwargs):
+		changed = False
+		for event in events:
+			changed = self.set_player_cp(event['player'], event['raw']) or changed
+		if changed:
+			await self.widget.display()
+
+	def set_player_cp(self, player, raw):
 		cpnm = int(raw['checkpointinlap'])
 		laptime = int(raw['laptime'])
 
 		# Ignore invalid times (cp time will be 0)
 		if laptime == 0:
-			return
+			return False
 
 		pcp = PlayerCP(player, cpnm + 1, laptime)
 		if not self.best_cp_times:
@@ -56,7 +68,7 @@ class BestCpTimes(AppConfig):
 					break
 			if not added:
 				self.best_cp_times.append(pcp)
-		await self.widget.display()
+		return True
 
 	# When the map starts
 	async def map_begin(self, *args, **kwargs):
@@ -48,7 +48,7 @@ class CurrentCPs(AppConfig):
 
 	async def on_start(self):
 		# Listen to some signals
-		self.context.signals.listen(tm_signals.waypoint, self.player_cp)
+		self.context.signals.listen(tm_signals.waypoint_batch, self.player_cps)
 		self.context.signals.listen(tm_signals.start_line, self.player_start)
 		self.context.signals.listen(tm_signals.finish, self.player_finish)
 		self.context.signals.listen(mp_signals.player.player_connect, self.player_connect)
@@ -69,13 +69,22 @@ class CurrentCPs(AppConfig):
 
 	# When a player passes a CP
 	async def player_cp(self, player, race_time, raw, *args, **kwargs):
+		self.set_player_cp(player, race_time, raw)
+		await self.update_view()
+
+	# When players passed CPs (batched)
+	async def player_cps(self, events, *args, **kwargs):
+		for event in events:
+			self.set_player_cp(event['player'], event['race_time'], event['raw'])
+		await self.update_view()
+
+	def set_player_cp(self, player, race_time, raw):
 		cp = int(raw['checkpointinrace'])  # Have to use raw to get the current CP
 		# Create new PlayerCP object if there is no PlayerCP object for that player yet
 		if player.login not in self.current_cps:
 			self.current_cps[player.login] = PlayerCP(player)
 		self.current_cps[player.login].cp = cp + 1  # +1 because checkpointinrace starts at 0
 		self.current_cps[player.login].time = race_time
-		await self.update_view()
 
 	# When a player starts the race
 	async def player_start(self, player, *args, **kwargs):
@@ -187,6 +187,21 @@ class MapListView(ManualListView):
 
 		local_app_installed = 'local_records' in self.app.instance.apps.apps
 		karma_app_installed = 'karma' in self.app.instance.apps.apps
+		advanced = self.advanced and not self.app.instance.performance_mode
+
+		# Get the personal local records of the user, and the best times of those maps, with a single query.
+		player_ranks = dict()
+		best_scores = dict()
+		if advanced and local_app_installed:
+			local_app = self.app.instance.apps.apps['local_records']
+			player_ranks = await local_app.get_player_ranks(self.player)
+			for m in self.app.instance.map_manager.maps:
+				if m.get_id() in player_ranks and hasattr(m, 'local') and m.local['first_record']:
+					best_scores[m.get_id()] = m.local['first_record'].score
+			missing = [map_id for map_id in player_ranks if map_id not in best_scores]
+			if missing:
+				for map_id, summary in (await local_app.get_summaries(missing)).items():
+					best_scores[map_id] = summary.best_score
 
 		for m in self.app.instance.map_manager.maps:
 			map_dict = model_to_dict(m)
@@ -204,21 +219,16 @@ class MapListView(ManualListView):
 			)
 
 			# Skip if in performance mode or advanced is not enabled.
-			if self.app.instance.performance_mode or not self.advanced:
+			if not advanced:
 				data.append(map_dict)
 				continue
 
-			if local_app_installed:
-				# Get personal local record of the user.
-				map_locals = await self.app.instance.apps.apps['local_records'].get_map_record(m)
-				rank, record = await self.app.instance.apps.apps['local_records'].get_player_record_and_rank_for_map(m, self.player)
-
-				if isinstance(rank, int) and rank >= 1:
-					map_dict['local_record_rank'] = int(rank)
-				if record:
-					map_dict['local_record_score'] = record.score
-				if map_locals['first_record'] and record:
-					map_dict['local_record_diff'] = record.score - map_locals['first_record'].score
+			if m.get_id() in player_ranks:
+				rank, score = player_ranks[m.get_id()]
+				map_dict['local_record_rank'] = int(rank)
+				map_dict['local_record_score'] = score
+				if best_scores.get(m.get_id()) is not None:
+					map_dict['local_record_diff'] = score - best_scores[m.get_id()]
 
 			# TODO: Convert to new relation styles.
 			if karma_app_installed and hasattr(m, 'karma'):
@@ -576,7 +586,8 @@ class FolderMapListView(MapListView):
 		if any(f['index'] == "local_record" for f in self.fields):
 			dict_item['local_record'] = times.format_time((map.local['first_record'].score if hasattr(map, 'local') and map.local['first_record'] else 0))
 		if any(f['index'] == "karma" for f in self.fields) and 'karma' in self.app.instance.apps.apps:
-			dict_item['karma'] = (await self.app.instance.apps.apps['karma'].get_map_karma(map))['map_karma']
+			map_karma = map.karma if hasattr(map, 'karma') else await self.app.instance.apps.apps['karma'].get_map_karma(map)
+			dict_item['karma'] = map_karma['map_karma']
 
 		# Use custom field for author to allow for searching on both login and nickname (depending on what's shown).
 		dict_item['author'] = (
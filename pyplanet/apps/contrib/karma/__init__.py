@@ -1,5 +1,7 @@
 import asyncio
 
+from peewee import IntegrityError
+
 from pyplanet.apps.config import AppConfig
 from pyplanet.apps.contrib.karma.views import KarmaListView
 from pyplanet.contrib.command import Command
@@ -11,7 +13,7 @@ from pyplanet.apps.core.maniaplanet import callbacks as mp_signals
 from pyplanet.apps.contrib.karma.views import KarmaWidget
 from pyplanet.apps.contrib.karma.mxkarma import MXKarma
 
-from .models import Karma as KarmaModel
+from .models import Karma as KarmaModel, KarmaSummary
 
 
 class Karma(AppConfig):
@@ -19,17 +21,25 @@ class Karma(AppConfig):
 	game_dependencies = ['trackmania', 'trackmania_next', 'shootmania']
 	app_dependencies = ['core.maniaplanet']
 
+	# Amount of maps per query while loading the summaries.
+	CHUNK_SIZE = 500
+
 	def __init__(self, *args, **kwargs):
 		super().__init__(*args, **kwargs)
 		self.lock = asyncio.Lock()
 
 		self.current_votes = []
+		self.current_summary = None
 		self.current_karma = 0.0
 		self.current_karma_percentage = 0.0
 		self.current_karma_positive = 0.0
 		self.current_karma_negative = 0.0
 		self.widget = None
 
+		self.cache = self.instance.db.cache.namespace(
+			'karma', ttl=300, models=[KarmaModel, KarmaSummary], signals=[mp_signals.map.map_begin]
+		)
+
 		self.setting_expanded_voting = Setting(
 			'expanded_voting', 'Expanded voting', Setting.CAT_BEHAVIOUR, type=bool,
 			description='Expands the karma voting to also use ---, -, +-, + and +++.',
@@ -80,39 +90,96 @@ class Karma(AppConfig):
 			map.karma = await self.get_map_karma(map)
 		else:
 			maps = {m.id: m for m in self.instance.map_manager.maps}
-			map_karmas = dict()
-
-			# Fetch all.
-			rows = await KarmaModel.execute(
-				KarmaModel.select().where(
-					KarmaModel.map_id << list(maps.keys())
-				)
-			)
-
-			# Group by map.
-			# Make sure all maps have an entry in the dictionary.
-			for list_map_id in maps:
-				map_karmas[list_map_id] = list()
-
-			for row in rows:
-				map_karmas[row.map_id].append(row)
+			summaries = await self.get_summaries(list(maps.keys()))
 
 			# Map karma stats.
-			for map_id, karma_list in map_karmas.items():
-				total_score = 0.0
-				for vote in karma_list:
-					if vote.expanded_score is not None:
-						total_score += vote.expanded_score
-					else:
-						total_score += vote.score
-
-				maps[map_id].karma = dict(
-					vote_count=len(karma_list),
-					map_karma=total_score
-				)
+			for map_id, summary in summaries.items():
+				maps[map_id].karma = self.get_summary_info(summary)
+
+	async def get_summaries(self, map_ids):
+		"""
+		Get the karma summaries of the maps. The summaries that don't exist yet are calculated from the votes and stored.
+
+		:param map_ids: List of map ids.
+		:return: Dictionary with the map id as key and the summary as value.
+		:rtype: dict
+		"""
+		summaries = dict()
+		for idx in range(0, len(map_ids), self.CHUNK_SIZE):
+			for summary in await KarmaSummary.execute(
+				KarmaSummary.select().where(KarmaSummary.map << map_ids[idx:idx + self.CHUNK_SIZE])
+			):
+				summaries[summary.map_id] = summary
+
+		missing = [map_id for map_id in map_ids if map_id not in summaries]
+		if missing:
+			summaries.update(await self.create_summaries(missing))
+		return summaries
+
+	async def create_summaries(self, map_ids):
+		"""
+		Calculate and store the karma summaries of the maps.
+
+		:param map_ids: List of map ids.
+		:return: Dictionary with the map id as key and the summary as value.
+		:rtype: dict
+		"""
+		rows = dict((map_id, dict(map=map_id, vote_count=0, total_score=0.0)) for map_id in map_ids)
+		for idx in range(0, len(map_ids), self.CHUNK_SIZE):
+			votes = await KarmaModel.execute(
+				KarmaModel.select(KarmaModel.map, KarmaModel.score, KarmaModel.expanded_score)
+					.where(KarmaModel.map << map_ids[idx:idx + self.CHUNK_SIZE])
+					.tuples()
+			)
+			for map_id, score, expanded_score in votes:
+				rows[map_id]['vote_count'] += 1
+				rows[map_id]['total_score'] += expanded_score if expanded_score is not None else score
+
+		summaries = dict()
+		rows = list(rows.values())
+		for idx in range(0, len(rows), self.CHUNK_SIZE):
+			chunk = rows[idx:idx + self.CHUNK_SIZE]
+			try:
+				await KarmaSummary.execute(KarmaSummary.insert_many(chunk))
+			except IntegrityError:
+				# The summary of one of the maps got created in the meantime, insert the rows one by one.
+				for row in chunk:
+					try:
+						await KarmaSummary.execute(KarmaSummary.insert(**row))
+					except IntegrityError:
+						pass
+			for summary in await KarmaSummary.execute(
+				KarmaSummary.select().where(KarmaSummary.map << [row['map'] for row in chunk])
+			):
+				summaries[summary.map_id] = summary
+		return summaries
+
+	@staticmethod
+	def get_summary_info(summary):
+		return dict(
+			vote_count=summary.vote_count,
+			map_karma=summary.total_score
+		)
 
-			del map_karmas
-			del maps
+	async def update_current_summary(self):
+		"""
+		Update the summary of the current map from the current votes, save it when it has changed and update the map
+		referenced information.
+		"""
+		summary = self.current_summary
+		if summary is None:
+			return
+		vote_count = len(self.current_votes)
+		total_score = float(sum(
+			vote.expanded_score if vote.expanded_score is not None else vote.score for vote in self.current_votes
+		))
+		if (summary.vote_count, summary.total_score) != (vote_count, total_score):
+			summary.vote_count = vote_count
+			summary.total_score = total_score
+			await summary.save()
+
+		# The current map is the same instance as the one in the map list.
+		self.instance.map_manager.current_map.karma = self.get_summary_info(summary)
 
 	async def show_karma_list(self, player, map=None, **kwargs):
 		view = KarmaListView(self, map or self.instance.map_manager.current_map)
@@ -173,10 +240,7 @@ class Karma(AppConfig):
 						player_vote.score = normal_score
 						player_vote.expanded_score = score
 						await player_vote.save()
-
-						map = next((m for m in self.instance.map_manager.maps if m.uid == self.instance.map_manager.current_map.uid), None)
-						if map is not None:
-							map.karma = await self.get_map_karma(self.instance.map_manager.current_map)
+						await self.update_current_summary()
 
 						message = '$ff0Successfully changed your karma vote to $fff{}$ff0{}!'.format(text,
 							(' (same as $fff{}$ff0)'.format(text[:2]) if text == '+++' or text == '---' else '')
@@ -195,10 +259,7 @@ class Karma(AppConfig):
 
 					self.current_votes.append(new_vote)
 					await self.calculate_karma()
-
-					map = next((m for m in self.instance.map_manager.maps if m.uid == self.instance.map_manager.current_map.uid), None)
-					if map is not None:
-						map.karma = await self.get_map_karma(self.instance.map_manager.current_map)
+					await self.update_current_summary()
 
 					message = '$ff0Successfully voted $fff{}$ff0{}!'.format(text,
 						(' (same as $fff{}$ff0)'.format(text[:2]) if text == '+++' or text == '---' else '')
@@ -208,9 +269,6 @@ class Karma(AppConfig):
 						self.widget.display()
 					)
 
-				# Reload map referenced information
-				asyncio.ensure_future(self.load_map_votes(map=self.instance.map_manager.current_map))
-
 	async def reset_karma_vote(self, player, **kwargs):
 		player_votes = [x for x in self.current_votes if x.player_id == player.get_id()]
 		if len(player_votes) == 0:
@@ -225,6 +283,7 @@ class Karma(AppConfig):
 
 		self.current_votes.remove(player_vote)
 		await self.calculate_karma()
+		await self.update_current_summary()
 
 		message = '$ff0Successfully reset your karma vote!'
 		await asyncio.gather(
@@ -232,28 +291,20 @@ class Karma(AppConfig):
 			self.widget.display()
 		)
 
-		# Reload map referenced information
-		asyncio.ensure_future(self.load_map_votes(map=self.instance.map_manager.current_map))
-
 	async def get_map_karma(self, map):
-		vote_list = await KarmaModel.objects.execute(KarmaModel.select().where(KarmaModel.map_id == map.get_id()))
-
-		total_score = 0.0
-		for vote in vote_list:
-			if vote.expanded_score is not None:
-				total_score += vote.expanded_score
-			else:
-				total_score += vote.score
-
-		return dict(
-			vote_count=len(vote_list),
-			map_karma=total_score
-		)
+		async def fetch():
+			summaries = await self.get_summaries([map.get_id()])
+			return self.get_summary_info(summaries[map.get_id()])
+		return await self.cache.get_or_fetch(('map_karma', map.get_id()), fetch)
 
 	async def get_votes_list(self, map):
 		vote_list = await KarmaModel.objects.execute(KarmaModel.select(KarmaModel, Player).join(Player).where(KarmaModel.map_id == map.get_id()))
 		self.current_votes = list(vote_list)
 
+		# Correct the summary when votes are changed outside of the app.
+		self.current_summary = (await self.get_summaries([map.get_id()]))[map.get_id()]
+		await self.update_current_summary()
+
 	async def calculate_karma(self):
 		total_score = 0.0
 		total_abs = 0.0
@@ -1,5 +1,7 @@
 from .karma import Karma
+from .karma_summary import KarmaSummary
 
 __all__ = [
 	'Karma',
+	'KarmaSummary',
 ]
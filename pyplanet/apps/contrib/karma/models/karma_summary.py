@@ -0,0 +1,23 @@
+"""
+Maniaplanet Core Models. These models are used in several apps and should be considered as very stable.
+"""
+from peewee import *
+from pyplanet.core.db import TimedModel
+from pyplanet.apps.core.maniaplanet.models import Map
+
+
+class KarmaSummary(TimedModel):
+	map = ForeignKeyField(Map, unique=True)
+	"""
+	Map of the summary.
+	"""
+
+	vote_count = IntegerField(default=0)
+	"""
+	Amount of karma votes on the map.
+	"""
+
+	total_score = FloatField(default=0.0)
+	"""
+	Sum of the karma votes (expanded score when given).
+	"""
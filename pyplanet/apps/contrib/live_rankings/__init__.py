@@ -56,7 +56,7 @@ class LiveRankings(AppConfig):
 		self.context.signals.listen(mp_signals.map.map_start, self.map_start)
 		self.context.signals.listen(mp_signals.flow.round_start, self.round_start)
 		self.context.signals.listen(tm_signals.finish, self.player_finish)
-		self.context.signals.listen(tm_signals.waypoint, self.player_waypoint)
+		self.context.signals.listen(tm_signals.waypoint_batch, self.player_waypoints)
 		self.context.signals.listen(mp_signals.player.player_connect, self.player_connect)
 		self.context.signals.listen(tm_signals.give_up, self.player_giveup)
 		self.context.signals.listen(tm_signals.scores, self.scores)
@@ -242,6 +242,21 @@ class LiveRankings(AppConfig):
 		if 'laps' not in current_script and 'trackmania/tm_laps_online' not in current_script:
 			return
 
+		self.set_player_waypoint(player, raw)
+		self.current_rankings.sort(key=lambda x: (-x['cps'], x['score']))
+		await self.widget.display()
+
+	async def player_waypoints(self, events, **kwargs):
+		current_script = (await self.instance.mode_manager.get_current_script()).lower()
+		if 'laps' not in current_script and 'trackmania/tm_laps_online' not in current_script:
+			return
+
+		for event in events:
+			self.set_player_waypoint(event['player'], event['raw'])
+		self.current_rankings.sort(key=lambda x: (-x['cps'], x['score']))
+		await self.widget.display()
+
+	def set_player_waypoint(self, player, raw):
 		current_rankings = [x for x in self.current_rankings if x['login'] == player.login]
 		if len(current_rankings) > 0:
 			current_ranking = current_rankings[0]
@@ -258,9 +273,6 @@ class LiveRankings(AppConfig):
 			new_ranking = dict(login=player.login, nickname=player.nickname, score=raw['racetime'], cps=(raw['checkpointinrace'] + 1), best_cps=best_cps, cp_times=raw['curracecheckpoints'], finish=raw['isendrace'], giveup=False)
 			self.current_rankings.append(new_ranking)
 
-		self.current_rankings.sort(key=lambda x: (-x['cps'], x['score']))
-		await self.widget.display()
-
 	async def player_finish(self, player, race_time, lap_time, cps, flow, is_end_race, raw, **kwargs):
 		current_script = (await self.instance.mode_manager.get_current_script()).lower()
 		if 'laps' in current_script or 'trackmania/tm_laps_online' in current_script:
@@ -1,5 +1,7 @@
 import asyncio
 
+from peewee import JOIN, IntegrityError, fn
+
 from pyplanet.apps.config import AppConfig
 from pyplanet.apps.contrib.local_records.views import LocalRecordsListView, LocalRecordsWidget, LocalRecordCpCompareListView
 from pyplanet.apps.core.maniaplanet.models import Player
@@ -12,20 +14,37 @@ from pyplanet.apps.core.maniaplanet import callbacks as mp_signals
 from pyplanet.utils import times
 from pyplanet.utils.log import handle_exception
 
-from .models import LocalRecord
+from .index import RecordIndex
+from .models import LocalRecord, LocalRecordSummary
+from .signals import local_records_changed
 
 
 class LocalRecords(AppConfig):
 	game_dependencies = ['trackmania', 'trackmania_next']
 	app_dependencies = ['core.maniaplanet', 'core.trackmania']
 
+	# Amount of maps per query while loading the summaries.
+	CHUNK_SIZE = 500
+
 	def __init__(self, *args, **kwargs):
 		super().__init__(*args, **kwargs)
 		self.lock = asyncio.Lock()
 
-		self.current_records = []
+		self.current_records = RecordIndex()
+		self.current_summary = None
 		self.widget = None
 
+		self.cache = self.instance.db.cache.namespace(
+			'local_records', ttl=300, models=[LocalRecord, LocalRecordSummary],
+			signals=[mp_signals.map.map_begin, local_records_changed]
+		)
+
+		# The ranks of the players on all maps. Only the records of the current map change while it's played, those are
+		# answered from memory. The ranks of the previous map are refreshed when a new map begins.
+		self.player_cache = self.instance.db.cache.namespace(
+			'local_records_players', ttl=600, max_size=100, signals=[mp_signals.map.map_begin]
+		)
+
 		self.setting_chat_announce = Setting(
 			'chat_announce', 'Minimum index for chat announce', Setting.CAT_BEHAVIOUR, type=int,
 			description='Minimum record index needed for public new record/recordchange announcement (0 for disable).',
@@ -73,49 +92,122 @@ class LocalRecords(AppConfig):
 			map.local = await self.get_map_record(map)
 		else:
 			maps = {m.id: m for m in self.instance.map_manager.maps}
-			map_locals = dict()
-
-			# Fetch all.
-			rows = await LocalRecord.execute(
-				LocalRecord.select().where(
-					LocalRecord.map_id << list(maps.keys())
-				)
-			)
-
-			# Group by map.
-			# Make sure all maps have an entry in the dictionary.
-			for list_map_id in maps:
-				map_locals[list_map_id] = list()
-
-			for row in rows:
-				map_locals[row.map_id].append(row)
+			summaries = await self.get_summaries(list(maps.keys()))
 
 			# Map local stats.
-			for map_id, local_list in map_locals.items():
-				maps[map_id].local = dict(
-					record_count=len(local_list),
-					first_record=local_list[0] if len(local_list) > 0 else None
-				)
-
-			del map_locals
-			del maps
+			for map_id, summary in summaries.items():
+				maps[map_id].local = self.get_summary_info(summary)
 
 	async def get_map_record(self, map=None):
 		if not map:
 			map = self.instance.map_manager.current_map
 
-		record_list = await LocalRecord.objects.execute(
-			LocalRecord.select(LocalRecord, Player)
-				.join(Player)
-				.where(LocalRecord.map_id == map.get_id())
-				.order_by(LocalRecord.score.asc())
-		)
+		async def fetch():
+			summaries = await self.get_summaries([map.get_id()])
+			return self.get_summary_info(summaries[map.get_id()])
+		return await self.cache.get_or_fetch(('map_record', map.get_id()), fetch)
+
+	async def get_summaries(self, map_ids):
+		"""
+		Get the local record summaries of the maps. The summaries that don't exist yet are calculated from the local records
+		and stored.
+
+		:param map_ids: List of map ids.
+		:return: Dictionary with the map id as key and the summary as value.
+		:rtype: dict
+		"""
+		summaries = dict()
+		for idx in range(0, len(map_ids), self.CHUNK_SIZE):
+			for summary in await LocalRecordSummary.execute(
+				LocalRecordSummary.select().where(LocalRecordSummary.map << map_ids[idx:idx + self.CHUNK_SIZE])
+			):
+				summaries[summary.map_id] = summary
+
+		missing = [map_id for map_id in map_ids if map_id not in summaries]
+		if missing:
+			summaries.update(await self.create_summaries(missing))
+		return summaries
+
+	async def create_summaries(self, map_ids):
+		"""
+		Calculate and store the local record summaries of the maps.
 
+		:param map_ids: List of map ids.
+		:return: Dictionary with the map id as key and the summary as value.
+		:rtype: dict
+		"""
+		rows = dict((map_id, dict(map=map_id, record_count=0, best_player=None, best_score=None)) for map_id in map_ids)
+		for idx in range(0, len(map_ids), self.CHUNK_SIZE):
+			records = await LocalRecord.execute(
+				LocalRecord.select(LocalRecord.map, LocalRecord.player, LocalRecord.score)
+					.where(LocalRecord.map << map_ids[idx:idx + self.CHUNK_SIZE])
+					.order_by(LocalRecord.map.asc(), LocalRecord.score.asc())
+					.tuples()
+			)
+			for map_id, player_id, score in records:
+				row = rows[map_id]
+				if row['record_count'] == 0:
+					row['best_player'], row['best_score'] = player_id, score
+				row['record_count'] += 1
+
+		summaries = dict()
+		rows = list(rows.values())
+		for idx in range(0, len(rows), self.CHUNK_SIZE):
+			chunk = rows[idx:idx + self.CHUNK_SIZE]
+			try:
+				await LocalRecordSummary.execute(LocalRecordSummary.insert_many(chunk))
+			except IntegrityError:
+				# The summary of one of the maps got created in the meantime, insert the rows one by one.
+				for row in chunk:
+					try:
+						await LocalRecordSummary.execute(LocalRecordSummary.insert(**row))
+					except IntegrityError:
+						pass
+			for summary in await LocalRecordSummary.execute(
+				LocalRecordSummary.select().where(LocalRecordSummary.map << [row['map'] for row in chunk])
+			):
+				summaries[summary.map_id] = summary
+		return summaries
+
+	@staticmethod
+	def get_summary_info(summary):
+		"""
+		Get the local record information of the map (``map.local``) from the summary.
+
+		.. note::
+
+			The ``first_record`` isn't loaded from the database, only the ``score`` and the ids of the map and player
+			(``map_id`` and ``player_id``) are available. The complete records of the current map are in
+			``current_records``.
+
+		:param summary: Local record summary.
+		:return: Dictionary with the ``record_count`` and the ``first_record``.
+		:rtype: dict
+		"""
 		return {
-			'record_count': len(record_list),
-			'first_record': record_list[0] if len(record_list) > 0 else None
+			'record_count': summary.record_count,
+			'first_record': LocalRecord(
+				map=summary.map_id, player=summary.best_player_id, score=summary.best_score
+			) if summary.record_count else None,
 		}
 
+	def update_current_summary(self):
+		"""
+		Update the summary of the current map from the current records, and queue the write when it has changed.
+		"""
+		summary = self.current_summary
+		if summary is None:
+			return
+		first_record = self.current_records[0] if self.current_records else None
+		record_count = len(self.current_records)
+		best_player = first_record.player.get_id() if first_record else None
+		best_score = first_record.score if first_record else None
+		if (summary.record_count, summary.best_player_id, summary.best_score) != (record_count, best_player, best_score):
+			summary.record_count = record_count
+			summary.best_player = best_player
+			summary.best_score = best_score
+			self.instance.db.writer.save(summary)
+
 	async def get_player_record_for_map(self, map, player):
 		record_list = await LocalRecord.objects.execute(
 			LocalRecord.select(LocalRecord)
@@ -126,19 +218,75 @@ class LocalRecords(AppConfig):
 		return record_list
 
 	async def get_player_record_and_rank_for_map(self, map, player):
-		record_list = await LocalRecord.objects.execute(
-			LocalRecord.select(LocalRecord, Player)
-				.join(Player)
-				.where(LocalRecord.map_id == map.get_id())
-				.order_by(LocalRecord.score.asc())
+		# The records of the current map are in memory.
+		if map.get_id() == self.instance.map_manager.current_map.get_id():
+			return self.current_records.rank(player.login), self.current_records.get(player.login)
+
+		record_list = await self.get_player_record_for_map(map, player)
+		if not len(record_list):
+			return None, None
+
+		record = record_list[0]
+		rank = await LocalRecord.objects.count(
+			LocalRecord.select().where(LocalRecord.map_id == map.get_id()).where(LocalRecord.score < record.score)
 		)
+		return rank + 1, record
+
+	async def get_player_ranks(self, player):
+		"""
+		Get the rank and score of the player on all maps the player has a record on. The ranks of the maps except the
+		current map are cached per player.
+
+		:param player: Player instance.
+		:return: Dictionary with the map id as key and a tuple with the rank and score as value.
+		:rtype: dict
+		"""
+		ranks = dict(await self.player_cache.get_or_fetch(player.get_id(), lambda: self.fetch_player_ranks(player)))
+
+		# The records of the current map are in memory.
+		current_map_id = self.instance.map_manager.current_map.get_id()
+		ranks.pop(current_map_id, None)
+		record = self.current_records.get(player.login)
+		if record:
+			ranks[current_map_id] = (self.current_records.rank(player.login), record.score)
+		return ranks
+
+	async def fetch_player_ranks(self, player):
+		"""
+		Fetch the rank and score of the player on all maps with a single query. A window function is used when the database
+		server supports it, otherwise the faster records are counted with a join.
 
-		rank = 1
-		for rec in record_list:
-			if rec.player == player:
-				return rank, rec
-			rank += 1
-		return None, None
+		:param player: Player instance.
+		:return: Dictionary with the map id as key and a tuple with the rank and score as value.
+		:rtype: dict
+		"""
+		if self.instance.db.server_info.supports_window_functions:
+			engine = self.instance.db.engine
+			quote = lambda name: '{0}{1}{0}'.format(engine.quote_char, name)
+			table, map_column, player_column, score_column = (
+				quote(LocalRecord._meta.db_table), quote(LocalRecord.map.db_column),
+				quote(LocalRecord.player.db_column), quote(LocalRecord.score.db_column),
+			)
+			query = LocalRecord.raw(
+				'SELECT ranked.{map}, ranked.record_rank, ranked.{score} FROM ('
+				'SELECT {map}, {player}, {score}, RANK() OVER (PARTITION BY {map} ORDER BY {score}) AS record_rank '
+				'FROM {table} WHERE {map} IN (SELECT {map} FROM {table} WHERE {player} = {param})'
+				') AS ranked WHERE ranked.{player} = {param}'.format(
+					table=table, map=map_column, player=player_column, score=score_column, param=engine.interpolation,
+				),
+				player.get_id(), player.get_id()
+			).tuples()
+			return dict((map_id, (rank, score)) for map_id, rank, score in await LocalRecord.execute(query))
+
+		faster = LocalRecord.alias()
+		query = (
+			LocalRecord.select(LocalRecord.map, LocalRecord.score, fn.COUNT(faster.id))
+				.join(faster, JOIN.LEFT_OUTER, on=((faster.map == LocalRecord.map) & (faster.score < LocalRecord.score)))
+				.where(LocalRecord.player == player.get_id())
+				.group_by(LocalRecord.map, LocalRecord.score)
+				.tuples()
+		)
+		return dict((map_id, (count + 1, score)) for map_id, score, count in await LocalRecord.execute(query))
 
 	async def get_local(self, id):
 		return await LocalRecord.get(id=id)
@@ -152,15 +300,26 @@ class LocalRecords(AppConfig):
 		await LocalRecord.execute(
 			LocalRecord.delete().where(LocalRecord.id == record.get_id())
 		)
+		self.player_cache.invalidate()
 
 	async def refresh_locals(self):
+		# Make sure the pending records are written before reading them back.
+		await self.instance.db.writer.flush()
 		record_list = await LocalRecord.objects.execute(
 			LocalRecord.select(LocalRecord, Player)
 				.join(Player)
 				.where(LocalRecord.map_id == self.instance.map_manager.current_map.get_id())
 				.order_by(LocalRecord.score.asc())
 		)
-		self.current_records = list(record_list)
+		self.current_records = RecordIndex(record_list)
+
+		# Correct the summary when records are changed outside of the app (deleted records for example).
+		current_map_id = self.instance.map_manager.current_map.get_id()
+		self.current_summary = (await self.get_summaries([current_map_id]))[current_map_id]
+		self.update_current_summary()
+		await local_records_changed.send_robust(
+			dict(map=self.instance.map_manager.current_map, records=self.current_records), raw=True
+		)
 
 	async def show_records_list(self, player, data = None, **kwargs):
 		"""
@@ -200,20 +359,19 @@ class LocalRecords(AppConfig):
 		record_limit = await self.setting_record_limit.get_value()
 		chat_announce = await self.setting_chat_announce.get_value()
 		async with self.lock:
-			current_records = [x for x in self.current_records if x.player.login == player.login]
+			current_record = self.current_records.get(player.login)
 			score = lap_time
 
 			previous_index = None
 			previous_time = None
 
-			if len(current_records) > 0:
-				current_record = current_records[0]
+			if current_record is not None:
 				if score > current_record.score:
 					# No improvement, ignore
 					return
 
 				# Temporary make index + time local for the messages.
-				previous_index = self.current_records.index(current_record) + 1
+				previous_index = self.current_records.rank(player.login)
 				previous_time = current_record.score
 
 				# If equal, only show message.
@@ -237,18 +395,8 @@ class LocalRecords(AppConfig):
 			current_record.score = score
 			current_record.checkpoints = ','.join([str(cp) for cp in cps])
 
-			# Add to list when it's a new record!
-			if current_record.get_id() is None:
-				self.current_records.append(current_record)
-
-			# (Re)sort the record list.
-			self.current_records.sort(key=lambda x: x.score)
-			new_index = self.current_records.index(current_record) + 1
-
-			if new_index == 1:
-				map = next((m for m in self.instance.map_manager.maps if m.uid == self.instance.map_manager.current_map.uid), None)
-				if map is not None:
-					map.local = {'record_count': len(self.current_records), 'first_record': current_record}
+			# Move the record to its new position.
+			new_index = self.current_records.update(current_record)
 
 		# Prepare messages.
 		if previous_index is not None and (record_limit == 0 or previous_index <= record_limit):
@@ -267,15 +415,17 @@ class LocalRecords(AppConfig):
 				player.nickname, new_index, times.format_time(score)
 			)
 
-		# Save to database (but don't wait for it).
+		# Save to database (but don't wait for it). New records are kept in the list until written, so the record is only
+		# inserted once, even when the player improves before the write-behind queue is flushed.
 		try:
-			asyncio.ensure_future(current_record.save())
+			self.instance.db.writer.save(current_record)
 		except Exception as e:
 			# To investigate #283.
 			handle_exception(e, __name__, 'player_finish', extra_data={
-				'own_records': current_records,
+				'own_records': [current_record],
 				'own_record': current_record
 			})
+		self.player_cache.invalidate(player.get_id())
 
 		if self.widget is None:
 			self.widget = LocalRecordsWidget(self)
@@ -288,8 +438,12 @@ class LocalRecords(AppConfig):
 				coros.append(self.instance.chat(message, player))
 		await asyncio.gather(*coros)
 
-		# Reload map referenced information
-		asyncio.ensure_future(self.load_map_locals(map=self.instance.map_manager.current_map))
+		# Update map referenced information (the record may not be written yet). The current map is the same instance as
+		# the one in the map list.
+		current_map = self.instance.map_manager.current_map
+		current_map.local = {'record_count': len(self.current_records), 'first_record': self.current_records[0]}
+		self.update_current_summary()
+		await local_records_changed.send_robust(dict(map=current_map, records=self.current_records), raw=True)
 
 	async def chat_current_record(self):
 		record_limit = await self.setting_record_limit.get_value()
@@ -313,16 +467,11 @@ class LocalRecords(AppConfig):
 			await self.instance.chat(message)
 
 	def chat_personal_record(self, player, record_limit):
-		if record_limit > 0:
-			records = self.current_records[:record_limit]
-		else:
-			records = self.current_records
-
-		record = [x for x in records if x.player_id == player.get_id()]
+		rank = self.current_records.rank(player.login)
 
-		if len(record) > 0:
+		if rank is not None and (record_limit <= 0 or rank <= record_limit):
 			message = '$0f3You currently hold the $fff{}.$0f3 Local Record: $fff\uf017 {}'.format(
-				self.current_records.index(record[0]) + 1, times.format_time(record[0].score)
+				rank, times.format_time(self.current_records.get(player.login).score)
 			)
 			return self.instance.chat(message, player)
 		else:
@@ -340,7 +489,7 @@ class LocalRecords(AppConfig):
 		:return:
 		"""
 		async with self.lock:
-			record = [x for x in self.current_records if x.player_id == player.get_id()]
+			record = self.current_records.get(player.login)
 
 			if data.record > len(self.current_records):
 				message = '$0b3There is no record for rank {}!'.format(data.record)
@@ -348,10 +497,8 @@ class LocalRecords(AppConfig):
 
 			compare_record = self.current_records[data.record - 1]
 
-			record_index = (self.current_records.index(record[0]) + 1) if len(record) else None
-			compare_index = (self.current_records.index(compare_record) + 1)
+			record_index = self.current_records.rank(player.login)
+			compare_index = data.record
 
-		view = LocalRecordCpCompareListView(
-			self, record[0] if len(record) else None, record_index, compare_record, compare_index
-		)
+		view = LocalRecordCpCompareListView(self, record, record_index, compare_record, compare_index)
 		await view.display(player)
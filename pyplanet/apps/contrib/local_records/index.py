@@ -0,0 +1,122 @@
+"""
+The record index keeps the local records of the current map ordered by score, and indexed by player login.
+"""
+import bisect
+import itertools
+
+
+class RecordIndex:
+	"""
+	Sorted record index.
+
+	The index behaves like the (sorted) list of records it replaces (``len``, iterating, indexing and slicing), and adds
+	lookups by login. The sort keys are kept in a separate list, so the position of a record is found with a binary
+	search instead of scanning and re-sorting the list on every finish.
+
+	Records with the same score are ordered by the moment the score was driven (first driven is ranked higher).
+	"""
+
+	def __init__(self, records=None):
+		"""
+		Initiate the index.
+
+		:param records: Records, ordered by score.
+		"""
+		self._counter = itertools.count()
+		self._records = list()
+		self._keys = list()
+		self._by_login = dict()
+		self._key_by_login = dict()
+		if records:
+			self.load(records)
+
+	def load(self, records):
+		"""
+		Replace the records in the index.
+
+		:param records: Records, ordered by score.
+		"""
+		self._records = list()
+		self._keys = list()
+		self._by_login = dict()
+		self._key_by_login = dict()
+		for record in records:
+			login = record.player.login
+			if login in self._by_login:
+				continue
+			key = (record.score, next(self._counter))
+			self._records.append(record)
+			self._keys.append(key)
+			self._by_login[login] = record
+			self._key_by_login[login] = key
+
+	def get(self, login):
+		"""
+		Get the record of the player.
+
+		:param login: Player login.
+		:return: Record or None.
+		"""
+		return self._by_login.get(login)
+
+	def rank(self, login):
+		"""
+		Get the rank (1-based) of the player.
+
+		:param login: Player login.
+		:return: Rank or None when the player has no record.
+		"""
+		key = self._key_by_login.get(login)
+		if key is None:
+			return None
+		return bisect.bisect_left(self._keys, key) + 1
+
+	def update(self, record):
+		"""
+		Insert the record, or move the record to the position of its (new) score.
+
+		:param record: Record with the new score.
+		:return: New rank (1-based).
+		"""
+		login = record.player.login
+		old_key = self._key_by_login.get(login)
+		if old_key is not None:
+			position = bisect.bisect_left(self._keys, old_key)
+			del self._keys[position]
+			del self._records[position]
+
+		key = (record.score, next(self._counter))
+		position = bisect.bisect_right(self._keys, key)
+		self._keys.insert(position, key)
+		self._records.insert(position, record)
+		self._by_login[login] = record
+		self._key_by_login[login] = key
+		return position + 1
+
+	def index(self, record):
+		"""
+		Get the position of the record (like ``list.index``).
+
+		:param record: Record.
+		:return: Position (0-based).
+		:raises ValueError: When the record is not in the index.
+		"""
+		rank = self.rank(record.player.login)
+		if rank is None or self._records[rank - 1] is not record:
+			raise ValueError('Record is not in the index')
+		return rank - 1
+
+	def __contains__(self, record):
+		return self._by_login.get(record.player.login) is record
+
+	def __len__(self):
+		return len(self._records)
+
+	def __iter__(self):
+		return iter(self._records)
+
+	def __getitem__(self, item):
+		return self._records[item]
+
+	def __bool__(self):
+		return bool(self._records)
@@ -1,5 +1,7 @@
 from .local_record import LocalRecord
+from .local_record_summary import LocalRecordSummary
 
 __all__ = [
 	'LocalRecord',
+	'LocalRecordSummary',
 ]
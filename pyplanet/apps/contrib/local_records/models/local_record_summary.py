@@ -0,0 +1,28 @@
+"""
+Maniaplanet Core Models. These models are used in several apps and should be considered as very stable.
+"""
+from peewee import *
+from pyplanet.core.db import TimedModel
+from pyplanet.apps.core.maniaplanet.models import Map, Player
+
+
+class LocalRecordSummary(TimedModel):
+	map = ForeignKeyField(Map, unique=True)
+	"""
+	Map of the summary.
+	"""
+
+	record_count = IntegerField(default=0)
+	"""
+	Amount of local records on the map.
+	"""
+
+	best_player = ForeignKeyField(Player, null=True, default=None)
+	"""
+	Player who holds the first local record.
+	"""
+
+	best_score = IntegerField(null=True, default=None)
+	"""
+	Time/score of the first local record.
+	"""
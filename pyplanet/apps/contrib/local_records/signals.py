@@ -0,0 +1,15 @@
+"""
+Signals of the local records app.
+"""
+from pyplanet.core.events import Signal as _Signal
+from pyplanet.core.events.manager import SignalManager as _SignalManager
+
+local_records_changed = _Signal(code='records_changed', namespace='local_records')
+"""
+Sent when the local records of the current map are (re)loaded or changed by a finish.
+
+:param map: Map instance.
+:param records: List with the local records of the map, ordered by score.
+"""
+
+_SignalManager.register_signal([local_records_changed])
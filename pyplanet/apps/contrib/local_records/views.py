@@ -39,11 +39,9 @@ class LocalRecordsWidget(TimesWidgetView):
 		for player in self.app.instance.player_manager.online:
 			list_records = list()
 
-			player_record = [x for x in current_records if x.player_id == player.get_id()]
-			player_index = (len(current_records) + 1)
-			if len(player_record) > 0:
-				# Set player index if there is a record
-				player_index = (current_records.index(player_record[0]) + 1)
+			player_index = self.app.current_records.rank(player.login)
+			if player_index is None or player_index > len(current_records):
+				player_index = (len(current_records) + 1)
 
 			records = list(current_records[:self.top_entries])
 			custom_start_index = None
@@ -1,11 +1,12 @@
+import datetime
 import logging
 import math
-from packaging import version
-from peewee import RawQuery
 
+from pyplanet.apps.contrib.local_records.models import LocalRecord
+from pyplanet.apps.contrib.local_records.signals import local_records_changed
+from pyplanet.apps.contrib.rankings.engine import RankEngine
 from pyplanet.apps.contrib.rankings.models.ranked_map import RankedMap
 from pyplanet.apps.contrib.rankings.models import Rank
-from pyplanet.apps.contrib.rankings.queries import Queries
 from pyplanet.apps.contrib.rankings.views import TopRanksView, MapListView
 from pyplanet.apps.config import AppConfig
 from pyplanet.apps.core.maniaplanet.models import Player
@@ -23,12 +24,15 @@ class Rankings(AppConfig):
 	# Rankings depend on the local records.
 	app_dependencies = ['core.maniaplanet', 'core.trackmania', 'local_records']
 
-	# Whether the system supports using the partition query.
-	supports_partition = False
+	# Amount of maps or players per query while loading and persisting the ranks.
+	CHUNK_SIZE = 500
 
 	def __init__(self, *args, **kwargs):
 		super().__init__(*args, **kwargs)
 
+		self.engine = RankEngine()
+		self.cache = self.instance.db.cache.namespace('rankings', ttl=300, max_size=100, models=[Player])
+
 		self.setting_records_required = Setting(
 			'minimum_records_required', 'Minimum records to acquire ranking', Setting.CAT_BEHAVIOUR, type=int,
 			description='Minimum of records required to acquire a rank (minimum 3 records).',
@@ -48,10 +52,16 @@ class Rankings(AppConfig):
 		)
 
 	async def on_start(self):
-		await self.check_database_compatibility()
+		# Register settings
+		await self.context.setting.register(self.setting_records_required, self.setting_chat_announce, self.setting_topranks_limit)
+
+		# Load the ranks in memory, they are updated incrementally from now on.
+		await self.load_ranks()
+		await self.persist_ranks()
 
 		# Listen to signals.
 		self.context.signals.listen(mp_signals.map.map_end, self.map_end)
+		self.context.signals.listen(local_records_changed, self.local_records_changed)
 		self.context.signals.listen(mp_signals.player.player_connect, self.player_connect)
 
 		# Register commands.
@@ -61,28 +71,11 @@ class Rankings(AppConfig):
 			Command('topranks', target=self.chat_topranks, description='Displays a list of top ranked players.'),
 		)
 
-		# Register settings
-		await self.context.setting.register(self.setting_records_required, self.setting_chat_announce, self.setting_topranks_limit)
-
-	async def check_database_compatibility(self):
-		# The queries used for calculating the rankings are only compatible with MySQL and MariaDB.
-		# Provide an error when running PostgreSQL.
-		if self.instance.db.server_info.type == "postgresql":
-			raise NotImplementedError("Rankings app only works on PyPlanet instances running on MySQL.")
-
-		logger.info('DB Information: {} ({})'.format(self.instance.db.server_info.type, self.instance.db.server_info.version))
-		# Database engines starting from MySQL 8.0 / MariaDB 10.2 support the PARTITION BY query.
-		# The query without PARTITION BY is unsupported in newer versions.
-		if self.instance.db.server_info.type == "mysql" and \
-			version.parse(self.instance.db.server_info.version) >= version.parse("8.0"):
-			self.supports_partition = True
-		elif self.instance.db.server_info.type == "mariadb" and \
-			version.parse(self.instance.db.server_info.version) >= version.parse("10.2"):
-			self.supports_partition = True
 
 	async def map_end(self, map):
-		# Calculate server ranks.
-		await self.calculate_server_ranks()
+		# Apply changes to the map list and settings, and write the changed ranks.
+		await self.update_ranks()
+		await self.persist_ranks()
 
 		# Display the server rank for all players on the server after calculation, if enabled.
 		if await self.setting_chat_announce.get_value():
@@ -93,25 +86,93 @@ class Rankings(AppConfig):
 		if await self.setting_chat_announce.get_value():
 			await self.chat_rank(player)
 
-	async def calculate_server_ranks(self):
-		maps_on_server = [map_on_server.id for map_on_server in self.instance.map_manager.maps]
-
-		minimum_records_required_setting = await self.setting_records_required.get_value()
-		minimum_records_required = minimum_records_required_setting if minimum_records_required_setting >= 3 else 3
-
-		maximum_record_rank = await self.get_maximum_record_rank()
-
-		query_text = Queries.CALCULATE_WITH_PARTITION if self.supports_partition else Queries.CALCULATE_WITHOUT_PARTITION
-
-		query = RawQuery(Rank, query_text.format(
-			maximum_record_rank, minimum_records_required, str(len(maps_on_server)), ", ".join(str(map_id) for map_id in maps_on_server))
-		)
-
-		await Rank.execute(query)
+	async def local_records_changed(self, map, records, **kwargs):
+		# Only the maps on the server are included in the ranking.
+		if map.get_id() in self.engine.map_ranks:
+			self.engine.set_map(map.get_id(), [record.player.get_id() for record in records])
+
+	async def get_engine_options(self):
+		minimum_records_required = await self.setting_records_required.get_value()
+		return await self.get_maximum_record_rank(), max(minimum_records_required, 3)
+
+	async def get_map_records(self, map_ids):
+		"""
+		Get the ordered player ids of the local records for the maps.
+
+		:param map_ids: List of map ids.
+		:return: Dictionary with the map id as key and the list of player ids as value.
+		"""
+		map_records = dict((map_id, list()) for map_id in map_ids)
+		for idx in range(0, len(map_ids), self.CHUNK_SIZE):
+			rows = await LocalRecord.execute(
+				LocalRecord.select(LocalRecord.map, LocalRecord.player)
+					.where(LocalRecord.map << map_ids[idx:idx + self.CHUNK_SIZE])
+					.order_by(LocalRecord.map.asc(), LocalRecord.score.asc())
+					.tuples()
+			)
+			for map_id, player_id in rows:
+				map_records[map_id].append(player_id)
+		return map_records
+
+	async def load_ranks(self):
+		"""
+		Load the ranks of all maps on the server from the local records.
+		"""
+		record_limit, minimum_records = await self.get_engine_options()
+		self.engine = RankEngine(record_limit=record_limit, minimum_records=minimum_records)
+		self.engine.load(await self.get_map_records([m.id for m in self.instance.map_manager.maps]))
+		logger.info('Loaded {} server ranks from {} maps.'.format(self.engine.total, self.engine.map_count))
+
+	async def update_ranks(self):
+		"""
+		Update the ranks to the current map list and settings. Only the added or removed maps are (re)calculated.
+		"""
+		record_limit, minimum_records = await self.get_engine_options()
+		if record_limit != self.engine.record_limit:
+			return await self.load_ranks()
+		if minimum_records != self.engine.minimum_records:
+			self.engine.minimum_records = minimum_records
+			self.engine.rebuild_index()
+
+		map_ids = set(m.id for m in self.instance.map_manager.maps)
+		for map_id in set(self.engine.map_ranks.keys()) - map_ids:
+			self.engine.remove_map(map_id)
+		new_map_ids = list(map_ids - set(self.engine.map_ranks.keys()))
+		if new_map_ids:
+			for map_id, player_ids in (await self.get_map_records(new_map_ids)).items():
+				self.engine.set_map(map_id, player_ids)
+
+	async def persist_ranks(self):
+		"""
+		Write the changed ranks to the database.
+		"""
+		full, changes = self.engine.pop_changes()
+		if full:
+			await Rank.execute(Rank.delete())
+		else:
+			player_ids = list(changes.keys())
+			for idx in range(0, len(player_ids), self.CHUNK_SIZE):
+				await Rank.execute(Rank.delete().where(Rank.player << player_ids[idx:idx + self.CHUNK_SIZE]))
+
+		now = datetime.datetime.now()
+		rows = [
+			dict(player=player_id, average=average, calculated_at=now)
+			for player_id, average in changes.items() if average is not None
+		]
+		for idx in range(0, len(rows), self.CHUNK_SIZE):
+			await Rank.execute(Rank.insert_many(rows[idx:idx + self.CHUNK_SIZE]))
+
+	async def get_players(self, player_ids):
+		players = await self.cache.execute(Player.select().where(Player.id << list(player_ids)))
+		return dict((player.get_id(), player) for player in players)
 
 	async def chat_topranks(self, player, *args, **kwargs):
 		top_ranks_limit = await self.setting_topranks_limit.get_value()
-		top_ranks = await Rank.execute(Rank.select(Rank, Player).join(Player).order_by(Rank.average.asc()).limit(top_ranks_limit))
+		top = self.engine.top(top_ranks_limit)
+		players = await self.get_players(player_id for player_id, _ in top)
+		top_ranks = [
+			Rank(player=players[player_id], average=average) for player_id, average in top if player_id in players
+		]
 		if len(top_ranks) == 0:
 			await self.instance.chat('$f00$iThere is no Server Rank yet Available!', player)
 			return
@@ -129,31 +190,24 @@ class Rankings(AppConfig):
 			player_rank['rank'], player_rank['total_ranked_players'], player_rank['average']), player)
 
 	async def chat_nextrank(self, player, *args, **kwargs):
-		player_ranks = await Rank.execute(Rank.select().where(Rank.player == player.get_id()))
-
-		if len(player_ranks) == 0:
+		if self.engine.average(player.get_id()) is None:
 			await self.instance.chat('$f00$iYou do not have a server rank yet!', player)
 			return
 
-		player_rank = player_ranks[0]
-		next_ranked_players = await Rank.execute(
-			Rank.select(Rank, Player)
-				.join(Player)
-				.where(Rank.average < player_rank.average)
-				.order_by(Rank.average.desc())
-				.limit(1))
-
-		if len(next_ranked_players) == 0:
+		next_rank = self.engine.get_next(player.get_id())
+		if next_rank is None:
 			await self.instance.chat('$f00$iThere is no better ranked player than you!', player)
 			return
 
-		next_ranked = next_ranked_players[0]
-		next_player_rank_average = '{:0.2f}'.format((next_ranked.average / 10000))
-		next_player_rank_index = (await Rank.objects.count(Rank.select(Rank).where(Rank.average < next_ranked.average)) + 1)
-		next_player_rank_difference = math.ceil((player_rank.average - next_ranked.average) / 10000 * len(self.instance.map_manager.maps))
+		next_player_id, next_player_rank_index, next_player_average = next_rank
+		next_player = (await self.get_players([next_player_id]))[next_player_id]
+		next_player_rank_average = '{:0.2f}'.format((next_player_average / 10000))
+		next_player_rank_difference = math.ceil(
+			(self.engine.average(player.get_id()) - next_player_average) / 10000 * self.engine.map_count
+		)
 
 		await self.instance.chat('$f80The next ranked player is $<$fff{}$>$f80 ($fff{}$f80), average: $fff{}$f80 [$fff-{} $f80RP]'.format(
-			next_ranked.player.nickname, next_player_rank_index, next_player_rank_average, next_player_rank_difference), player)
+			next_player.nickname, next_player_rank_index, next_player_rank_average, next_player_rank_difference), player)
 
 	async def chat_norank(self, player, *args, **kwargs):
 		ranked_maps = await self.get_player_map_ranks(player)
@@ -164,63 +218,41 @@ class Rankings(AppConfig):
 		await view.display(player)
 
 	async def chat_bestrank(self, player, *args, **kwargs):
-		ranked_maps = await self.get_player_map_ranks(player, 'ORDER BY player_rank ASC')
+		ranked_maps = await self.get_player_map_ranks(player)
+		ranked_maps.sort(key=lambda ranked_map: ranked_map.player_rank)
 		view = MapListView(self, player, maps=ranked_maps, title='Your best ranked maps on this server', show_rank=True)
 		await view.display(player)
 
 	async def chat_worstrank(self, player, *args, **kwargs):
-		ranked_maps = await self.get_player_map_ranks(player, 'ORDER BY player_rank DESC')
+		ranked_maps = await self.get_player_map_ranks(player)
+		ranked_maps.sort(key=lambda ranked_map: ranked_map.player_rank, reverse=True)
 		view = MapListView(self, player, maps=ranked_maps, title='Your worst ranked maps on this server', show_rank=True)
 		await view.display(player)
 
-	async def get_player_map_ranks(self, player, sort_query = ''):
-		maximum_record_rank = await self.get_maximum_record_rank()
-
-		query = '''SELECT
-					map.id,
-					map.name,
-					map.uid,
-					map.author_login,
-					ranked_records.player_rank
-				FROM
-				(
-					SELECT
-						id,
-						map_id,
-						player_id,
-						score,
-						@player_rank := IF(@current_rank = map_id, @player_rank + 1, 1) AS player_rank,
-						@current_rank := map_id
-					FROM localrecord r,
-						(SELECT @player_rank := 0) pr,
-						(SELECT @current_rank := 0) cr
-					ORDER BY map_id, score ASC
-				) AS ranked_records
-
-				INNER JOIN map
-				ON map.id = map_id
-
-				WHERE player_rank <= {}
-				AND player_id = {} {}'''.format(maximum_record_rank, player.id, sort_query)
-
-		select_query = RawQuery(RankedMap, query)
-		ranked_maps = [map for map in await RankedMap.execute(select_query) if
-					   map.id in [server_map.id for server_map in self.instance.map_manager.maps]]
+	async def get_player_map_ranks(self, player):
+		player_id = player.get_id()
+		ranked_maps = list()
+		for server_map in self.instance.map_manager.maps:
+			player_ids = self.engine.map_ranks.get(server_map.id, ())
+			if player_id in player_ids:
+				ranked_maps.append(RankedMap(
+					id=server_map.id, name=server_map.name, uid=server_map.uid, author_login=server_map.author_login,
+					player_rank=player_ids.index(player_id) + 1
+				))
 
 		return ranked_maps
 
 	async def get_player_rank(self, player):
-		player_ranks = await Rank.execute(Rank.select().where(Rank.player == player.get_id()))
-
-		if len(player_ranks) == 0:
+		player_rank = self.engine.get_rank(player.get_id())
+		if player_rank is None:
 			return None
 
-		player_rank = player_ranks[0]
-		player_rank_average = '{:0.2f}'.format((player_rank.average / 10000))
-		player_rank_index = (await Rank.objects.count(Rank.select(Rank).where(Rank.average < player_rank.average)) + 1)
-		total_ranked_players = await Rank.objects.count(Rank.select(Rank))
-
-		return {'rank': player_rank_index, 'average': player_rank_average, 'total_ranked_players': total_ranked_players}
+		player_rank_index, player_rank_average = player_rank
+		return {
+			'rank': player_rank_index,
+			'average': '{:0.2f}'.format((player_rank_average / 10000)),
+			'total_ranked_players': self.engine.total
+		}
 
 	async def get_maximum_record_rank(self):
 		# Determine the maximum record rank that is included in the locals.
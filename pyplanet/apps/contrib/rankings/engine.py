@@ -0,0 +1,209 @@
+"""
+The rank engine keeps the server ranks in memory and updates them incrementally, instead of recalculating the ranks of
+all players from all local records.
+"""
+import bisect
+
+
+class RankEngine:
+	"""
+	Incremental server rank engine.
+
+	For every map the engine keeps the player ids of the ranked records (top ``record_limit``, in order). For every player
+	it keeps the sum and the amount of the record ranks. The average of a player is calculated the same way as before::
+
+		(sum + (map_count - count) * record_limit) / map_count * 10000
+
+	The ordering of the players only depends on ``sum - count * record_limit`` (the key), which doesn't change when maps
+	are added or removed. The keys of the ranked players are kept in a sorted list, so the rank of a player (and the next
+	ranked player) is found with a binary search.
+	"""
+
+	def __init__(self, record_limit=1000, minimum_records=3):
+		"""
+		Initiate the engine.
+
+		:param record_limit: Maximum record rank that is included in the ranking.
+		:param minimum_records: Minimum amount of ranked records required to acquire a rank.
+		"""
+		self.record_limit = record_limit
+		self.minimum_records = minimum_records
+
+		self.map_ranks = dict()
+		self.rank_sums = dict()
+		self.rank_counts = dict()
+
+		self.index = list()
+		self.keys = dict()
+
+		self.changed = set()
+		self.persisted_map_count = None
+
+	@property
+	def map_count(self):
+		return len(self.map_ranks)
+
+	@property
+	def total(self):
+		"""
+		Amount of ranked players.
+		"""
+		return len(self.index)
+
+	def load(self, map_records):
+		"""
+		Load the ranks from scratch.
+
+		:param map_records: Dictionary with the map id as key and the player ids ordered by the record score as value.
+		"""
+		self.map_ranks = dict()
+		self.rank_sums = dict()
+		self.rank_counts = dict()
+		for map_id, player_ids in map_records.items():
+			player_ids = tuple(player_ids[:self.record_limit])
+			self.map_ranks[map_id] = player_ids
+			for rank, player_id in enumerate(player_ids, start=1):
+				self.rank_sums[player_id] = self.rank_sums.get(player_id, 0) + rank
+				self.rank_counts[player_id] = self.rank_counts.get(player_id, 0) + 1
+		self.rebuild_index()
+		self.persisted_map_count = None
+
+	def rebuild_index(self):
+		"""
+		Rebuild the sorted index, needed when the minimum amount of records changes.
+		"""
+		self.keys = dict(
+			(player_id, self._key(player_id)) for player_id, count in self.rank_counts.items()
+			if count >= self.minimum_records
+		)
+		self.index = sorted((key, player_id) for player_id, key in self.keys.items())
+		self.persisted_map_count = None
+
+	def set_map(self, map_id, player_ids):
+		"""
+		Update the ranked records of the map. Only the players whose rank on the map changed are updated.
+
+		:param map_id: Map id.
+		:param player_ids: Player ids ordered by the record score.
+		"""
+		new_ranks = tuple(player_ids[:self.record_limit])
+		old_ranks = self.map_ranks.get(map_id, ())
+		self.map_ranks[map_id] = new_ranks
+
+		# Skip the unchanged head of the list (the common case is a record that moves up a few places).
+		start = 0
+		for old_player, new_player in zip(old_ranks, new_ranks):
+			if old_player != new_player:
+				break
+			start += 1
+
+		old_positions = dict((player_id, rank) for rank, player_id in enumerate(old_ranks[start:], start=start + 1))
+		new_positions = dict((player_id, rank) for rank, player_id in enumerate(new_ranks[start:], start=start + 1))
+		for player_id in old_positions.keys() | new_positions.keys():
+			old_rank = old_positions.get(player_id)
+			new_rank = new_positions.get(player_id)
+			if old_rank == new_rank:
+				continue
+			self._update(
+				player_id,
+				(new_rank or 0) - (old_rank or 0),
+				(1 if new_rank else 0) - (1 if old_rank else 0),
+			)
+
+	def remove_map(self, map_id):
+		"""
+		Remove the contribution of the map (for example when it's removed from the server).
+
+		:param map_id: Map id.
+		"""
+		old_ranks = self.map_ranks.pop(map_id, ())
+		for rank, player_id in enumerate(old_ranks, start=1):
+			self._update(player_id, -rank, -1)
+
+	def average(self, player_id):
+		"""
+		Get the average of the player, multiplied by 10000 (like stored in the ``Rank`` model).
+
+		:param player_id: Player id.
+		:return: Average or None when the player is not ranked.
+		"""
+		key = self.keys.get(player_id)
+		if key is None or not self.map_count:
+			return None
+		return self._average(key)
+
+	def get_rank(self, player_id):
+		"""
+		Get the rank and average of the player.
+
+		:param player_id: Player id.
+		:return: Tuple with rank and average or None when the player is not ranked.
+		"""
+		key = self.keys.get(player_id)
+		if key is None or not self.map_count:
+			return None
+		return bisect.bisect_left(self.index, (key,)) + 1, self._average(key)
+
+	def get_next(self, player_id):
+		"""
+		Get the next better ranked player.
+
+		:param player_id: Player id.
+		:return: Tuple with the player id, rank and average of the next player, None when there is no better player.
+		:raises KeyError: When the player is not ranked.
+		"""
+		key = self.keys[player_id]
+		position = bisect.bisect_left(self.index, (key,))
+		if position == 0:
+			return None
+		next_key, next_player_id = self.index[position - 1]
+		return next_player_id, bisect.bisect_left(self.index, (next_key,)) + 1, self._average(next_key)
+
+	def top(self, limit):
+		"""
+		Get the best ranked players.
+
+		:param limit: Amount of players.
+		:return: List with tuples of player id and average.
+		"""
+		return [(player_id, self._average(key)) for key, player_id in self.index[:limit]]
+
+	def pop_changes(self):
+		"""
+		Get and reset the changes since the last call, to persist them.
+
+		:return: Tuple with a boolean that is True when all ranks have to be rewritten (the averages of all players change
+				 when the amount of maps changes), and a dictionary with the player id as key and the new average (or None
+				 when the player lost the rank) as value.
+		"""
+		full = self.persisted_map_count != self.map_count
+		if full:
+			changes = dict((player_id, self._average(key)) for player_id, key in self.keys.items())
+		else:
+			changes = dict((player_id, self.average(player_id)) for player_id in self.changed)
+
+		self.changed = set()
+		self.persisted_map_count = self.map_count
+		return full, changes
+
+	def _update(self, player_id, rank_delta, count_delta):
+		self.rank_sums[player_id] = self.rank_sums.get(player_id, 0) + rank_delta
+		self.rank_counts[player_id] = self.rank_counts.get(player_id, 0) + count_delta
+		if self.rank_counts[player_id] <= 0:
+			del self.rank_sums[player_id]
+			del self.rank_counts[player_id]
+
+		old_key = self.keys.pop(player_id, None)
+		if old_key is not None:
+			del self.index[bisect.bisect_left(self.index, (old_key, player_id))]
+		if self.rank_counts.get(player_id, 0) >= self.minimum_records:
+			new_key = self._key(player_id)
+			self.keys[player_id] = new_key
+			bisect.insort(self.index, (new_key, player_id))
+		self.changed.add(player_id)
+
+	def _key(self, player_id):
+		return self.rank_sums[player_id] - self.rank_counts[player_id] * self.record_limit
+
+	def _average(self, key):
+		return round((key + self.map_count * self.record_limit) / self.map_count * 10000)
@@ -2,11 +2,66 @@ from pyplanet.views import TemplateView
 from pyplanet.views.generics.widget import WidgetView
 
 
+def get_fastest_records(app, logins):
+	"""
+	Get the fastest (dedimania or local) record of the given players. The dedimania records are indexed by login once and
+	the local records are looked up in the record index of the local records app, instead of scanning the record lists
+	for every player.
+
+	:param app: App instance.
+	:param logins: List of player logins.
+	:return: Dictionary with login as key and tuple with (score, checkpoints string, source) as value.
+	"""
+	dedi_records = dict()
+	local_records = None
+	if 'dedimania' in app.instance.apps.apps:
+		try:
+			for record in app.instance.apps.apps['dedimania'].current_records:
+				dedi_records.setdefault(record.login, record)
+		except:
+			pass
+	if 'local_records' in app.instance.apps.apps:
+		try:
+			# The local records are already indexed by login.
+			local_records = app.instance.apps.apps['local_records'].current_records
+		except:
+			pass
+
+	result = dict()
+	for login in logins:
+		dedi_record = dedi_records.get(login)
+		local_record = local_records.get(login) if local_records is not None else None
+		dedi_score = dedi_record.score if dedi_record and hasattr(dedi_record, 'score') else 0
+		local_score = local_record.score if local_record and hasattr(local_record, 'score') else 0
+
+		# Get fastest score, source and checkpoint scores.
+		fastest_score = 0
+		fastest_source = None
+		fastest_cps = list()
+		if dedi_score > 0 and (local_score <= 0 or dedi_score < local_score):
+			fastest_score = dedi_score
+			fastest_cps = dedi_record.cps
+			fastest_source = 'Dedi'
+		elif local_score > 0 and (dedi_score <= 0 or local_score <= dedi_score):
+			fastest_score = local_score
+			fastest_cps = local_record.checkpoints
+			fastest_source = 'Local'
+
+		if isinstance(fastest_cps, list):
+			fastest_cps = ','.join([str(c) for c in fastest_cps])
+		if not fastest_cps:
+			fastest_score = 0
+
+		result[login] = (fastest_score, fastest_cps, fastest_source)
+	return result
+
+
 class SectorTimesWidget(WidgetView):
 	# widget_x = 20
 	widget_y = -70
 
 	template_name = 'sector_times/sector_times.xml'
+	fragment_template_name = 'sector_times/sector_times_player.xml'
 
 	def __init__(self, app):
 		"""
@@ -25,55 +80,11 @@ class SectorTimesWidget(WidgetView):
 				return -55
 		return 20
 
-	async def get_per_player_data(self, login):
-		dedi_score = 0
-		dedi_record = None
-		local_score = 0
-		local_record = None
-		if 'dedimania' in self.app.instance.apps.apps:
-			try:
-				dedi_record = [x for x in self.app.instance.apps.apps['dedimania'].current_records if x.login == login]
-				if len(dedi_record) > 0:
-					dedi_record = dedi_record[0]
-			except:
-				pass
-		if 'local_records' in self.app.instance.apps.apps:
-			try:
-				local_record = [x for x in self.app.instance.apps.apps['local_records'].current_records if x.player.login == login]
-				if len(local_record) > 0:
-					local_record = local_record[0]
-			except:
-				pass
-
-		if dedi_record and hasattr(dedi_record, 'score'):
-			dedi_score = dedi_record.score
-		if local_record and hasattr(local_record, 'score'):
-			local_score = local_record.score
-
-		# Get fastest score, source and checkpoint scores.
-		fastest_score = 0
-		fastest_source = ''
-		fastest_cps = list()
-		if dedi_score > 0 and (local_score <= 0 or dedi_score < local_score):
-			fastest_score = dedi_score
-			fastest_cps = dedi_record.cps
-			fastest_source = 'Dedi'
-		elif local_score > 0 and (dedi_score <= 0 or local_score <= dedi_score):
-			fastest_score = local_score
-			fastest_cps = local_record.checkpoints
-			fastest_source = 'Local'
-
-		if isinstance(fastest_cps, list):
-			fastest_cps = ','.join([str(c) for c in fastest_cps])
-
-		context = await super().get_per_player_data(login)
-		context['record_sector_times'] = fastest_cps
-		context['record_time'] = fastest_score
-		context['record_source'] = fastest_source
-		if not fastest_cps:
-			context['record_time'] = 0
-
-		return context
+	async def get_all_player_data(self, logins):
+		data = await super().get_all_player_data(logins)
+		for login, (score, cps, source) in get_fastest_records(self.app, logins).items():
+			data[login] = dict(record_sector_times=cps, record_time=score, record_source=source or '')
+		return data
 
 
 class CheckpointDiffWidget(WidgetView):
@@ -81,6 +92,7 @@ class CheckpointDiffWidget(WidgetView):
 	widget_y = 0
 
 	template_name = 'sector_times/cp_diff.xml'
+	fragment_template_name = 'sector_times/cp_diff_player.xml'
 
 	def __init__(self, app):
 		"""
@@ -92,53 +104,11 @@ class CheckpointDiffWidget(WidgetView):
 		self.manager = app.context.ui
 		self.id = 'pyplanet__widgets_cp_diff'
 
-	async def get_per_player_data(self, login):
-		dedi_score = 0
-		dedi_record = None
-		local_score = 0
-		local_record = None
-		if 'dedimania' in self.app.instance.apps.apps:
-			try:
-				dedi_record = [x for x in self.app.instance.apps.apps['dedimania'].current_records if x.login == login]
-				if len(dedi_record) > 0:
-					dedi_record = dedi_record[0]
-			except:
-				pass
-		if 'local_records' in self.app.instance.apps.apps:
-			try:
-				local_record = [x for x in self.app.instance.apps.apps['local_records'].current_records if x.player.login == login]
-				if len(local_record) > 0:
-					local_record = local_record[0]
-			except:
-				pass
-
-		if dedi_record and hasattr(dedi_record, 'score'):
-			dedi_score = dedi_record.score
-		if local_record and hasattr(local_record, 'score'):
-			local_score = local_record.score
-
-		# Get fastest score, source and checkpoint scores.
-		fastest_score = 0
-		fastest_source = 'PB'
-		fastest_cps = list()
-		if dedi_score > 0 and (local_score <= 0 or dedi_score < local_score):
-			fastest_score = dedi_score
-			fastest_cps = dedi_record.cps
-		elif local_score > 0 and (dedi_score <= 0 or local_score <= dedi_score):
-			fastest_score = local_score
-			fastest_cps = local_record.checkpoints
-
-		if isinstance(fastest_cps, list):
-			fastest_cps = ','.join([str(c) for c in fastest_cps])
-
-		context = await super().get_per_player_data(login)
-		context['record_sector_times'] = fastest_cps
-		context['record_time'] = fastest_score
-		context['record_source'] = fastest_source
-		if not fastest_cps:
-			context['record_time'] = 0
-
-		return context
+	async def get_all_player_data(self, logins):
+		data = await super().get_all_player_data(logins)
+		for login, (score, cps, source) in get_fastest_records(self.app, logins).items():
+			data[login] = dict(record_sector_times=cps, record_time=score, record_source='PB')
+		return data
 
 
 class GearIndicatorView(TemplateView):
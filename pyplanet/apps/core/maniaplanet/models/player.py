@@ -2,7 +2,7 @@
 Maniaplanet Core Models. This models are used in several apps and should be considered as very stable.
 """
 from peewee import *
-from pyplanet.core.db import TimedModel
+from pyplanet.core.db import TimedModel, IdentityMap
 from pyplanet.utils.functional import empty
 
 
@@ -59,7 +59,11 @@ class Player(TimedModel):
 	the name of the level.
 	"""
 
-	CACHE = dict()
+	CACHE = IdentityMap(max_size=1000, ttl=3600)
+	"""
+	Identity map with the player instances. Online players are pinned by the player manager, offline players are evicted
+	after one hour without access or when more than 1000 offline players are cached.
+	"""
 
 	def __str__(self):
 		return self.login
@@ -85,11 +89,12 @@ class Player(TimedModel):
 
 	async def save(self, *args, **kwargs):
 		res = await super().save(*args, **kwargs)
-		if self.login not in self.CACHE or (self.login in self.CACHE and id(self) != id(self.CACHE[self.login])):
-			if self.login in self.CACHE and id(self) != id(self.CACHE[self.login]):
-				self.__flow = self.CACHE[self.login].flow
-				self.__attributes = self.CACHE[self.login].attributes
-			self.CACHE[self.login] = self
+		cached = self.CACHE.peek(self.login)
+		if cached is not self:
+			if cached is not None:
+				self.__flow = cached.flow
+				self.__attributes = cached.attributes
+			self.CACHE.set(self.login, self)
 		return res
 
 	@classmethod
@@ -102,16 +107,50 @@ class Player(TimedModel):
 		:return: Player instance
 		:rtype: pyplanet.apps.core.maniaplanet.models.player.Player
 		"""
-		if login in cls.CACHE:
-			return cls.CACHE[login]
+		player = cls.CACHE.get(login)
+		if player is not None:
+			return player
 		try:
-			cls.CACHE[login] = player = await cls.get(login=login)
+			player = await cls.get(login=login)
 		except DoesNotExist:
 			if default is not empty:
 				return default
 			raise
+
+		# Another coroutine could have cached the player in the meantime, keep that instance.
+		cached = cls.CACHE.peek(login)
+		if cached is not None:
+			return cached
+		cls.CACHE.set(login, player)
 		return player
 
+	@classmethod
+	async def get_many_by_login(cls, logins):
+		"""
+		Get multiple players by login. The players that are not in the cache are fetched with a single query.
+
+		:param logins: List of logins.
+		:return: Dictionary with login as key and player instance as value. Unknown logins are left out.
+		:rtype: dict
+		"""
+		players = dict()
+		missing = list()
+		for login in logins:
+			player = cls.CACHE.get(login)
+			if player is not None:
+				players[login] = player
+			else:
+				missing.append(login)
+
+		if missing:
+			for player in await cls.execute(cls.select().where(cls.login.in_(missing))):
+				cached = cls.CACHE.peek(player.login)
+				if cached is None:
+					cls.CACHE.set(player.login, player)
+					cached = player
+				players[player.login] = cached
+		return players
+
 	def get_level_string(self):
 		for level_nr, level_name in self.LEVEL_CHOICES:
 			if self.level == level_nr:
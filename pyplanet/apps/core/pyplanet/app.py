@@ -4,6 +4,7 @@ import platform
 
 from pyplanet.apps.config import AppConfig
 from pyplanet.apps.core.pyplanet.dev import DevComponent
+from pyplanet.apps.core.pyplanet.diagnostics import DiagnosticsComponent
 from pyplanet.apps.core.pyplanet.setting import SettingComponent
 from pyplanet.apps.core.pyplanet.toolbar import ToolbarComponent
 from pyplanet.apps.core.pyplanet.views.command import CommandsListView
@@ -28,6 +29,7 @@ class PyPlanetConfig(AppConfig):
 		# Initiate components.
 		self.setting = SettingComponent(self)
 		self.dev = DevComponent(self)
+		self.diagnostics = DiagnosticsComponent(self)
 		self.toolbar = ToolbarComponent(self)
 
 		# Initiate app (global) view.
@@ -40,12 +42,14 @@ class PyPlanetConfig(AppConfig):
 		# Call components.
 		await self.setting.on_init()
 		await self.dev.on_init()
+		await self.diagnostics.on_init()
 		await self.toolbar.on_init()
 
 	async def on_start(self):
 		# Call components.
 		await self.setting.on_start()
 		await self.dev.on_start()
+		await self.diagnostics.on_start()
 		await self.toolbar.on_start()
 
 		# Change some ui elements positions and visibility.
@@ -0,0 +1,45 @@
+"""
+Diagnostics app component. Shows the event loop diagnostics of the instance.
+"""
+import logging
+
+from pyplanet.apps.core.pyplanet.views.diagnostics import SlowCallbacksView
+from pyplanet.contrib.command import Command
+from pyplanet.utils.diagnostics import monitor
+
+logger = logging.getLogger(__name__)
+
+
+class DiagnosticsComponent:
+	def __init__(self, app):
+		"""
+		Initiate diagnostics component.
+
+		:param app: App config instance
+		:type app: pyplanet.apps.core.pyplanet.app.PyPlanetConfig
+		"""
+		self.app = app
+
+	async def on_init(self):
+		pass
+
+	async def on_start(self):
+		await self.app.instance.permission_manager.register(
+			'diagnostics', 'View the event loop diagnostics.', app=self.app, min_level=2
+		)
+
+		await self.app.instance.command_manager.register(
+			Command('diagnostics', self.admin_diagnostics, perms='core.pyplanet:diagnostics', admin=True,
+					description='Displays the event loop lag and the callbacks that block the event loop.')
+				.add_param('slow', type=str, required=False, help='Show the recent slow callbacks in a window.'),
+		)
+
+	async def admin_diagnostics(self, player, data, **kwargs):
+		if data.slow:
+			return await SlowCallbacksView(self.app, player).display()
+
+		await self.app.instance.chat('$ff0{}'.format(monitor.format_summary()), player)
+
+		# The stack samples don't fit in the chat, write the full report to the log.
+		logger.info(monitor.format_report())
+		await self.app.instance.chat('$ff0The report with the stack samples has been written to the log.', player)
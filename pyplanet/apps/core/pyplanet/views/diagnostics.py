@@ -0,0 +1,81 @@
+"""
+Diagnostics Views.
+"""
+import time
+
+from pyplanet.utils.diagnostics import monitor
+from pyplanet.views.generics import ManualListView
+
+
+class SlowCallbacksView(ManualListView):
+	title = 'Slow callbacks'
+	icon_style = 'Icons128x128_1'
+	icon_substyle = 'Statistics'
+
+	def __init__(self, app, player):
+		"""
+		:param app: App config instance.
+		:param player: Player instance.
+		:type app: pyplanet.apps.core.pyplanet.app.PyPlanetConfig
+		:type player: pyplanet.apps.core.maniaplanet.models.player.Player
+		"""
+		super().__init__()
+		self.manager = app.context.ui
+		self.app = app
+		self.player = player
+
+	async def get_data(self):
+		return [
+			dict(
+				time=time.strftime('%H:%M:%S', time.localtime(entry['time'])),
+				duration=round(entry['duration'], 3),
+				name=entry['name'],
+				signal=entry['signal'] or '-',
+				location=entry['location'] or '-',
+			)
+			for entry in reversed(monitor.slow_callbacks)
+		]
+
+	async def get_fields(self):
+		return [
+			{
+				'name': 'Time',
+				'index': 'time',
+				'sorting': True,
+				'searching': False,
+				'width': 18,
+				'type': 'label'
+			},
+			{
+				'name': 'Duration',
+				'index': 'duration',
+				'sorting': True,
+				'searching': False,
+				'width': 18,
+				'type': 'label'
+			},
+			{
+				'name': 'Callback',
+				'index': 'name',
+				'sorting': True,
+				'searching': True,
+				'width': 65,
+				'type': 'label'
+			},
+			{
+				'name': 'Signal',
+				'index': 'signal',
+				'sorting': True,
+				'searching': True,
+				'width': 35,
+				'type': 'label'
+			},
+			{
+				'name': 'Location',
+				'index': 'location',
+				'sorting': False,
+				'searching': True,
+				'width': 65,
+				'type': 'label'
+			},
+		]
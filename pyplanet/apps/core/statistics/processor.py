@@ -4,7 +4,6 @@ Please note that this file is only meant for the statistics app, and can change
 """
 import asyncio
 
-from datetime import datetime
 from peewee import JOIN
 
 from pyplanet.apps.contrib.local_records import LocalRecord
@@ -26,8 +25,8 @@ class StatisticsProcessor:
 		"""
 		self.app = app
 
-		self.topsums_cache = None
-		self.topsums_cache_time = None
+		# The topsums are only expired by time, recalculating them after every new record is too expensive.
+		self.cache = self.app.instance.db.cache.namespace('statistics', ttl=60, max_size=10)
 
 	async def get_dashboard_data(self, player):
 		"""
@@ -115,14 +114,14 @@ class StatisticsProcessor:
 		if 'local_records' not in self.app.instance.apps.apps:
 			return None
 
-		now = datetime.now()
-		diff = now - self.topsums_cache_time if self.topsums_cache_time else False
-		if not self.topsums_cache or not diff or diff.total_seconds() > 60:
-			self.topsums_cache = None
-			self.topsums_cache_time = None
-		elif self.topsums_cache:
-			return self.topsums_cache
+		return await self.cache.get_or_fetch('topsums', self.calculate_topsums)
 
+	async def calculate_topsums(self):
+		"""
+		Calculate the topsums of the server.
+
+		:return: List of top 100 players on the server with the statistics.
+		"""
 		maps = self.app.instance.map_manager.maps
 		players = dict()
 
@@ -142,9 +141,7 @@ class StatisticsProcessor:
 		topsums = list(players.items())
 		topsums.sort(key=lambda item: item[1][0] + item[1][1] + item[1][2], reverse=True)
 
-		self.topsums_cache = topsums[:100]
-		self.topsums_cache_time = datetime.now()
-		return self.topsums_cache
+		return topsums[:100]
 
 	async def get_top_active_players(self):
 		"""
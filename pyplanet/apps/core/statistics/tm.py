@@ -1,6 +1,8 @@
 """
 Trackmania app component.
 """
+import datetime
+
 from pyplanet.apps.core.statistics.models import Score
 from pyplanet.apps.core.statistics.views.dashboard import StatsDashboardView
 from pyplanet.apps.core.statistics.views.records import TopSumsView
@@ -37,13 +39,15 @@ class TrackmaniaComponent:
 		)
 
 	async def on_finish(self, player, race_time, lap_time, cps, flow, raw, **kwargs):
-		# Register the score of the player.
-		await Score(
-			player=player,
-			map=self.app.instance.map_manager.current_map,
+		# Register the score of the player (written in batches by the write-behind queue).
+		self.app.instance.db.writer.insert(
+			Score,
+			player=player.get_id(),
+			map=self.app.instance.map_manager.current_map.get_id(),
 			score=race_time,
-			checkpoints=','.join([str(cp) for cp in cps])
-		).save()
+			checkpoints=','.join([str(cp) for cp in cps]),
+			created_at=datetime.datetime.now(),
+		)
 
 	async def open_stats(self, player, **kwargs):
 		view = StatsDashboardView(self.app, self.app.context.ui, player)
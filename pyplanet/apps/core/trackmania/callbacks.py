@@ -2,7 +2,7 @@ import asyncio
 import logging
 
 from pyplanet.core import Controller
-from pyplanet.core.events import Callback, Signal, handle_generic
+from pyplanet.core.events import BatchedSignal, Callback, Signal, handle_generic
 from pyplanet.core.exceptions import SignalGlueStop
 
 
@@ -14,6 +14,9 @@ async def handle_start_line(source, signal, **kwargs):
 	flow = player.flow
 	flow.start_run()
 
+	# Make sure the waypoints of the previous run are handled first.
+	await waypoint_batch.flush()
+
 	# TM 2020 Royal Mode.
 	if royal_mode:
 		flow.handle_start_line_royal(source['time'])
@@ -57,6 +60,9 @@ async def handle_waypoint(source, signal, **kwargs):
 		if source['isendlap'] and not source['isendrace']:
 			flow.start_run()
 
+		# Make sure the batched waypoints are handled before the finish.
+		await waypoint_batch.flush()
+
 		await finish.send_robust(source=dict(
 			player=player, race_time=source['racetime'], lap_time=source['laptime'],
 			cps=source['curlapcheckpoints'], lap_cps=source['curlapcheckpoints'], race_cps=source['curracecheckpoints'],
@@ -77,6 +83,9 @@ async def handle_give_up(source, signal, **kwargs):
 	royal_mode = await Controller.instance.mode_manager.get_current_script() == 'Trackmania/TM_RoyalTimeAttack_Online'
 	flow.reset_run()
 
+	# Make sure the batched waypoints are handled before the give up.
+	await waypoint_batch.flush()
+
 	# TM 2020 Royal mode.
 	if royal_mode:
 		flow.handle_give_up_royal(source['time'])
@@ -229,6 +238,31 @@ player=player, race_time=source['racetime'], flow=flow, raw=source
 """
 
 
+waypoint_batch = BatchedSignal(
+	source=waypoint,
+	namespace='trackmania',
+	code='waypoint_batch',
+	interval=0.05,
+	max_size=100,
+)
+"""
+:Signal:
+	Batch of players crossing checkpoints.
+:Code:
+	``trackmania:waypoint_batch``
+:Description:
+	Opt-in batched variant of the ``trackmania:waypoint`` signal. The waypoints are delivered every 50 milliseconds or
+	every 100 waypoints. The pending waypoints are always delivered before the ``trackmania:finish``,
+	``trackmania:give_up`` and ``trackmania:start_line`` signals of the same player are sent.
+:Original Callback:
+	`Script` Trackmania.Event.WayPoint
+
+:param events: List with the payloads of the ``trackmania:waypoint`` signal (player, race_time, flow, raw).
+:type events: list
+
+"""
+
+
 give_up = Callback(
 	call='Script.Trackmania.Event.GiveUp',
 	namespace='trackmania',
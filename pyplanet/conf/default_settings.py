@@ -34,6 +34,25 @@ SELF_UPGRADE = True
 # Allow changing the server slots (max players/spectators).
 ALLOW_SLOTS_CHANGE = True
 
+# Seconds between the heartbeats of the instances to the god process (event loop lag, callback throughput, memory
+# usage and open tasks).
+SUPERVISOR_HEARTBEAT_INTERVAL = 5
+
+# Kill an instance when it didn't send a heartbeat, or its event loop lagged, for more than this amount of seconds. The
+# instance is only restarted within the --max-restarts of the start command. Set to 0 to disable (default).
+SUPERVISOR_LAG_THRESHOLD = 0
+
+# Local port to serve the status of all instances on (JSON over HTTP on 127.0.0.1). None to disable.
+SUPERVISOR_STATUS_PORT = None
+
+# Trace the callbacks that block the event loop for more than this amount of seconds (with a stack sample). Set to 0 to
+# disable the tracing.
+DIAGNOSTICS_SLOW_THRESHOLD = 0.1
+
+# Seconds between the event loop diagnostics summaries in the log (lag, pending payloads and slowest callbacks).
+# Set to 0 to disable.
+DIAGNOSTICS_SUMMARY_INTERVAL = 300
+
 ##########################################
 ################## DB ####################
 ##########################################
@@ -60,6 +79,17 @@ CACHES = {
 }
 
 
+##########################################
+################## UI ####################
+##########################################
+
+# Amount of worker threads to render the player variants of manialinks concurrently. Keep 0 to render on the event loop.
+UI_RENDER_WORKERS = 0
+
+# Minimum amount of player variants of a manialink before the render is handed over to the worker threads.
+UI_RENDER_THRESHOLD = 16
+
+
 ##########################################
 ############### LOGGING ##################
 ##########################################
@@ -1,16 +1,33 @@
+import datetime
+import json
+import os
+import time
+
 import pymysql
 import pymysql.cursors
 
+from pyplanet.apps.core.maniaplanet.models import Player, Map
+
 
 class BaseConverter:
 	"""
 	Base Converter is the abstract converter class.
 
+	The converters stream the source tables with a server-side cursor and convert them in chunks. Every chunk is inserted
+	with a single insert statement, rows that already exist in the PyPlanet database are skipped. The progress is
+	written to a checkpoint file after every chunk, an interrupted conversion continues after the last converted chunk
+	when it's started again.
+
 	Please take a look at the other classes bellow.
 	"""
+	CHUNK_SIZE = 1000
+
+	# Seconds between the progress reports.
+	REPORT_INTERVAL = 5
+
 	def __init__(
 		self, instance, db_type, db_host, db_name, db_user=None, db_password=None, db_port=None, prefix=None,
-		charset='utf8'
+		charset='utf8', chunk_size=None, checkpoint_file=None,
 	):
 		"""
 		Create converter.
@@ -24,7 +41,8 @@ class BaseConverter:
 		:param db_port: Port.
 		:param prefix: Table prefix.
 		:param charset: Charset of source db. Only supporting utf8 now.
-		:param extra: Any extra parameters given.
+		:param chunk_size: Amount of source rows converted and inserted at once.
+		:param checkpoint_file: File to keep the progress in, to resume an interrupted conversion. None to disable.
 		:type instance: pyplanet.core.instance.Instance
 		"""
 		self.instance = instance
@@ -38,6 +56,14 @@ class BaseConverter:
 		self.prefix = prefix or ''
 		self.charset = charset
 
+		self.chunk_size = chunk_size or self.CHUNK_SIZE
+		self.checkpoint_file = checkpoint_file
+		self.checkpoint = dict()
+
+		# Login and uid to PyPlanet primary key.
+		self.player_ids = dict()
+		self.map_ids = dict()
+
 		self.connection = None
 
 	async def connect(self):
@@ -57,7 +83,193 @@ class BaseConverter:
 	async def start(self):
 		if not self.connection:
 			raise Exception('Please connect first (connect()).')
-		return await self.migrate(self.connection)
+
+		self.load_checkpoint()
+		if self.checkpoint:
+			print('Resuming the conversion from checkpoint file \'{}\'...'.format(self.checkpoint_file))
+		await self.load_ids()
+
+		result = await self.migrate(self.connection)
+
+		# The conversion is completed, a new conversion starts from scratch.
+		if self.checkpoint_file and os.path.exists(self.checkpoint_file):
+			os.remove(self.checkpoint_file)
+		return result
 
 	async def migrate(self, source_connection):
 		raise NotImplementedError
+
+	def load_checkpoint(self):
+		if self.checkpoint_file and os.path.exists(self.checkpoint_file):
+			with open(self.checkpoint_file, 'r') as checkpoint_file:
+				self.checkpoint = json.load(checkpoint_file)
+
+	def save_checkpoint(self):
+		if not self.checkpoint_file:
+			return
+		# Write to a temporary file first, an interrupted write must not corrupt the checkpoint.
+		temp_file = '{}.tmp'.format(self.checkpoint_file)
+		with open(temp_file, 'w') as checkpoint_file:
+			json.dump(self.checkpoint, checkpoint_file)
+		os.replace(temp_file, self.checkpoint_file)
+
+	async def load_ids(self):
+		"""
+		Load the logins and uids of the players and maps that exist in PyPlanet, with one query per table.
+		"""
+		self.player_ids = dict(await Player.execute(Player.select(Player.login, Player.id).tuples()))
+		self.map_ids = dict(await Map.execute(Map.select(Map.uid, Map.id).tuples()))
+
+	def stream(self, query, skip=0):
+		"""
+		Stream the result of the source query in chunks, with a server-side (unbuffered) cursor.
+
+		:param query: Source SQL query.
+		:param skip: Amount of rows to skip (already converted).
+		:return: Generator with lists of rows.
+		"""
+		if skip:
+			query = '{} LIMIT {}, 18446744073709551615'.format(query, int(skip))
+		with self.connection.cursor(pymysql.cursors.SSDictCursor) as cursor:
+			cursor.execute(query)
+			while True:
+				rows = cursor.fetchmany(self.chunk_size)
+				if not rows:
+					break
+				yield rows
+
+	async def migrate_rows(self, name, query, model, convert, unique=None):
+		"""
+		Convert the rows of the source query into the model, chunk by chunk.
+
+		:param name: Name of the step, used for the progress and the checkpoint.
+		:param query: Source SQL query. The query should have a stable ordering to resume a conversion.
+		:param model: Target model.
+		:param convert: Function that converts a source row to a dictionary with the model fields, or None to skip it.
+		:param unique: Field names that identify a row, the rows that already exist are skipped.
+		:return: Amount of inserted rows.
+		"""
+		done = self.checkpoint.get(name, 0)
+		if done is True:
+			print('{}: already converted, skipping..'.format(name))
+			return 0
+
+		inserted = 0
+		start = last_report = time.monotonic()
+		for chunk in self.stream(query, skip=done):
+			rows = [row for row in (convert(source) for source in chunk) if row]
+			if rows:
+				inserted += await self.insert_rows(model, rows, unique)
+
+			done += len(chunk)
+			self.checkpoint[name] = done
+			self.save_checkpoint()
+
+			if time.monotonic() - last_report >= self.REPORT_INTERVAL:
+				last_report = time.monotonic()
+				print('{}: {} rows converted, {} inserted ({:.0f} rows/s)'.format(
+					name, done, inserted, done / (last_report - start)
+				))
+
+		self.checkpoint[name] = True
+		self.save_checkpoint()
+		print('{}: done, {} rows converted, {} inserted in {:.1f} seconds.'.format(
+			name, done, inserted, time.monotonic() - start
+		))
+		return inserted
+
+	async def insert_rows(self, model, rows, unique=None):
+		"""
+		Insert the rows with a single statement, without the rows that already exist (or are duplicated in the rows).
+
+		:param model: Model.
+		:param rows: List with dictionaries.
+		:param unique: Field names that identify a row.
+		:return: Amount of inserted rows.
+		"""
+		if unique:
+			fields = [getattr(model, field) for field in unique]
+			conditions = [field << list(set(row[name] for row in rows)) for field, name in zip(fields, unique)]
+			existing = set(await model.execute(model.select(*fields).where(*conditions).tuples()))
+
+			new_rows = list()
+			for row in rows:
+				key = tuple(row[name] for name in unique)
+				if key not in existing:
+					existing.add(key)
+					new_rows.append(row)
+			rows = new_rows
+
+		if not rows:
+			return 0
+
+		now = datetime.datetime.now()
+		for row in rows:
+			for field in ('created_at', 'updated_at'):
+				if field in model._meta.fields and not row.get(field):
+					row[field] = now
+
+		await model.execute(model.insert_many(rows))
+
+		# The summaries of the maps with new rows are outdated, they are recalculated when they are loaded again.
+		summary_model = self.get_summary_model(model)
+		if summary_model:
+			map_ids = list(set(row['map'] for row in rows))
+			await summary_model.execute(summary_model.delete().where(summary_model.map << map_ids))
+		return len(rows)
+
+	@staticmethod
+	def get_summary_model(model):
+		"""
+		Get the model with the per map summaries of the model (local records and karma).
+
+		:param model: Model.
+		:return: Summary model or None.
+		"""
+		from pyplanet.apps.contrib.karma.models import Karma, KarmaSummary
+		from pyplanet.apps.contrib.local_records.models import LocalRecord, LocalRecordSummary
+		return {LocalRecord: LocalRecordSummary, Karma: KarmaSummary}.get(model)
+
+	async def migrate_player_rows(self, name, query, convert):
+		"""
+		Convert the players, and add them to the login to id map.
+
+		:param name: Name of the step.
+		:param query: Source SQL query.
+		:param convert: Function that converts a source row to a dictionary with the player fields.
+		"""
+		def convert_new(source):
+			row = convert(source)
+			return row if row and row['login'] not in self.player_ids else None
+
+		await self.migrate_rows(name, query, Player, convert_new, unique=['login'])
+		self.player_ids = dict(await Player.execute(Player.select(Player.login, Player.id).tuples()))
+
+	async def migrate_map_rows(self, name, query, convert):
+		"""
+		Convert the maps, and add them to the uid to id map.
+
+		:param name: Name of the step.
+		:param query: Source SQL query.
+		:param convert: Function that converts a source row to a dictionary with the map fields.
+		"""
+		def convert_new(source):
+			row = convert(source)
+			return row if row and row['uid'] not in self.map_ids else None
+
+		await self.migrate_rows(name, query, Map, convert_new, unique=['uid'])
+		self.map_ids = dict(await Map.execute(Map.select(Map.uid, Map.id).tuples()))
+
+	def get_ids(self, uid, login):
+		"""
+		Get the PyPlanet map and player id.
+
+		:param uid: Map uid.
+		:param login: Player login.
+		:return: Tuple with the map and player id, or None when the map or player is unknown.
+		"""
+		map_id = self.map_ids.get(uid)
+		player_id = self.player_ids.get(login)
+		if map_id is None or player_id is None:
+			return None
+		return map_id, player_id
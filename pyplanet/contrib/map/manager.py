@@ -1,10 +1,12 @@
 import asyncio
+import datetime
 import os
 import logging
 import re
 
 from xmlrpc.client import Fault
 from peewee import DoesNotExist
+from playhouse.shortcuts import case
 
 from pyplanet.utils.log import handle_exception
 from pyplanet.apps.core.maniaplanet.models import Map
@@ -27,6 +29,10 @@ class MapManager(CoreContrib):
 		Don't initiate this class yourself.
 
 	"""
+
+	# Amount of rows per bulk insert/update statement, and uids per select.
+	CHUNK_SIZE = 500
+
 	def __init__(self, instance):
 		"""
 		Initiate, should only be done from the core instance.
@@ -40,8 +46,11 @@ class MapManager(CoreContrib):
 		# The matchsettings contains the name of the current loaded matchsettings file.
 		self._matchsettings = None
 
-		# The maps contain a list of map instances in the order that are in the current loaded list.
-		self._maps = set()
+		# The maps contain a list of map instances in the order that are in the current loaded list. The maps are indexed
+		# by uid and filename for the lookups.
+		self._maps = list()
+		self._maps_by_uid = dict()
+		self._maps_by_file = dict()
 
 		# The current map will always be in this variable. The next map will always be here. It will be updated. once
 		# it's updated it should be send to the dedicated to queue the next map.
@@ -137,93 +146,64 @@ class MapManager(CoreContrib):
 		updated = list()
 
 		if full_update:
-			# Query all existing entries from database.
-			maps = list(await Map.execute(
-				Map.select().where(Map.uid << [m['UId'] for m in raw_list])
-			))
-
-			db_uids = [m.uid for m in maps]
-			diff = [x for x in raw_list if x['UId'] not in db_uids]
-
-			# Update existing maps with author nicknames and (T)MX-IDs.
-			for existing_map in [m for m in maps if m.author_nickname is None or len(m.author_nickname) == 0 or (m.mx_id is None and "MX" in m.file)]:
-				details = [m for m in raw_list if m['UId'] == existing_map.uid][0]
-
-				# Detect any (T)MX-id from the filename.
-				try:
-					mx_id = int(self._extract_mx_id(details['FileName']))
-				except:
-					mx_id = None
-
-				author_nickname = await self.get_map_author_nickname(details)
-
-				map_instance = await Map.get_or_create_from_info(
-					details['UId'], details['FileName'], details['Name'], details['Author'],
-					author_nickname=author_nickname, environment=details['Environnement'],
-					time_gold=details['GoldTime'],
-					price=details['CopperPrice'], map_type=details['MapType'], map_style=details['MapStyle'],
-					mx_id=mx_id,
-				)
-
-				maps = [m for m in maps if m.uid != details['UId']]
-				maps.append(map_instance)
+			# Reuse the known map instances, only query the maps we don't know yet.
+			known = dict(self._maps_by_uid)
+			unknown_uids = [details['UId'] for details in raw_list if details['UId'] not in known]
+			for idx in range(0, len(unknown_uids), self.CHUNK_SIZE):
+				for map_instance in await Map.execute(
+					Map.select().where(Map.uid << unknown_uids[idx:idx + self.CHUNK_SIZE])
+				):
+					known[map_instance.uid] = map_instance
+
+			missing, changed = self._diff_list(raw_list, known)
+
+			# Update existing maps with new names, filenames, author nicknames and (T)MX-IDs.
+			rows = list()
+			for map_instance, details in changed:
+				rows.append(await self._get_map_row(details))
+			if rows:
+				await self._bulk_update(rows, known)
 
 			# Insert all missing maps into the DB.
 			rows = list()
-			for details in diff:
-				mx_id = self._extract_mx_id(details['FileName'])
-
-				# HACK: Due to a limited map name length of 150 chars, we want to strip it to the maximum possible.
-				# This is a temporary fix and should be better handled in the future.
-				name = details['Name']
-				if len(name) > 150:
-					name = name[:150]
-					logging.getLogger(__name__).warning('Map name is very long, truncating to 150 chars.')
-
-				author_nickname = await self.get_map_author_nickname(details)
-
-				rows.append(dict(
-					uid=details['UId'], file=details['FileName'], name=name, author_login=details['Author'],
-					author_nickname=author_nickname, environment=details['Environnement'], time_gold=details['GoldTime'],
-					price=details['CopperPrice'], map_type=details['MapType'], map_style=details['MapStyle'], mx_id=mx_id
-				))
-
-			if len(rows) > 0:
-				await Map.execute(Map.insert_many(rows))
-				maps += list(await Map.execute(
-					Map.select().where(Map.uid << [m['uid'] for m in rows])
-				))
+			for details in missing:
+				rows.append(await self._get_map_row(details))
+			new_maps = list()
+			for idx in range(0, len(rows), self.CHUNK_SIZE):
+				chunk = rows[idx:idx + self.CHUNK_SIZE]
+				await Map.execute(Map.insert_many(chunk))
+				new_maps.extend(await Map.execute(Map.select().where(Map.uid << [m['uid'] for m in chunk])))
+			for map_instance in new_maps:
+				known[map_instance.uid] = map_instance
 
 			# Order the maps to match the order on the server.
-			ordered_uids = [m['UId'] for m in raw_list]
-			ordered_maps = sorted(set(maps), key=lambda m: ordered_uids.index(m.uid) if m.uid in ordered_uids else -1)
+			ordered_maps = self._order_maps(raw_list, known)
+			previous_uids = set(self._maps_by_uid.keys())
 
 			async with self.lock:
-				self._maps = ordered_maps
+				self._set_maps(ordered_maps)
 
-			# Reload locals for all maps.
-			# TODO: Find better way to remove this and handle it on the folders way.
+			# Reload locals and karma for all maps, only needed when maps are new to the list (the known instances keep
+			# their loaded information).
 			coroutines = list()
-			if 'local_records' in self._instance.apps.apps:
-				if detach_fks:
-					asyncio.ensure_future(self._instance.apps.apps['local_records'].load_map_locals())
-				else:
+			if any(m.uid not in previous_uids for m in ordered_maps):
+				# TODO: Find better way to remove this and handle it on the folders way.
+				if 'local_records' in self._instance.apps.apps:
 					coroutines.append(self._instance.apps.apps['local_records'].load_map_locals())
-
-			# Reload karma for all maps.
-			if 'karma' in self._instance.apps.apps:
-				if detach_fks:
-					asyncio.ensure_future(self._instance.apps.apps['karma'].load_map_votes())
-				else:
+				if 'karma' in self._instance.apps.apps:
 					coroutines.append(self._instance.apps.apps['karma'].load_map_votes())
 
 			if coroutines:
-				await asyncio.gather(*coroutines)
+				if detach_fks:
+					for coroutine in coroutines:
+						asyncio.ensure_future(coroutine)
+				else:
+					await asyncio.gather(*coroutines)
 		else:
 			# Only update/insert the changed bits, (not checking for removed maps!!).
 			async with self.lock:
 				for details in raw_list:
-					if not any(m.uid == details['UId'] for m in self._maps):
+					if details['UId'] not in self._maps_by_uid:
 						# Detect any MX-id from the filename.
 						mx_id = self._extract_mx_id(details['FileName'])
 
@@ -236,10 +216,116 @@ class MapManager(CoreContrib):
 							price=details['CopperPrice'], map_type=details['MapType'], map_style=details['MapStyle'],
 							mx_id=mx_id,
 						)
-						self._maps.add(map_instance)
+						self._add_to_index(map_instance)
+						self._maps.append(map_instance)
 						updated.append(map_instance)
 		return updated
 
+	def _diff_list(self, raw_list, known):
+		"""
+		Diff the map list of the dedicated server with the known map instances.
+
+		:param raw_list: Map list of the dedicated server.
+		:param known: Dictionary with the uid as key and the map instance as value.
+		:return: Tuple with the list of missing map details and a list of (map instance, details) tuples of the maps that
+				 need to be updated.
+		"""
+		missing = list()
+		changed = list()
+		for details in raw_list:
+			map_instance = known.get(details['UId'])
+			if map_instance is None:
+				missing.append(details)
+			elif (
+				map_instance.file != details['FileName'] or map_instance.name != details['Name'][:150] or
+				(not map_instance.author_nickname and 'AuthorNickname' in details) or
+				(map_instance.mx_id is None and 'MX' in details['FileName'] and self._extract_mx_id(details['FileName']))
+			):
+				changed.append((map_instance, details))
+		return missing, changed
+
+	@staticmethod
+	def _order_maps(raw_list, known):
+		"""
+		Get the map instances in the order of the map list of the dedicated server.
+
+		:param raw_list: Map list of the dedicated server.
+		:param known: Dictionary with the uid as key and the map instance as value.
+		:return: List of map instances.
+		"""
+		ordered_maps = list()
+		seen = set()
+		for details in raw_list:
+			map_instance = known.get(details['UId'])
+			if map_instance is not None and details['UId'] not in seen:
+				seen.add(details['UId'])
+				ordered_maps.append(map_instance)
+		return ordered_maps
+
+	async def _get_map_row(self, details):
+		"""
+		Get the database columns of the map details.
+
+		:param details: Map details from the dedicated server.
+		:return: Dictionary with the columns.
+		"""
+		# HACK: Due to a limited map name length of 150 chars, we want to strip it to the maximum possible.
+		# This is a temporary fix and should be better handled in the future.
+		name = details['Name']
+		if len(name) > 150:
+			name = name[:150]
+			logging.getLogger(__name__).warning('Map name is very long, truncating to 150 chars.')
+
+		mx_id = self._extract_mx_id(details['FileName'])
+		author_nickname = await self.get_map_author_nickname(details)
+
+		return dict(
+			uid=details['UId'], file=details['FileName'], name=name, author_login=details['Author'],
+			author_nickname=author_nickname, environment=details['Environnement'], time_gold=details['GoldTime'],
+			price=details['CopperPrice'], map_type=details['MapType'], map_style=details['MapStyle'],
+			mx_id=int(mx_id) if mx_id else None,
+		)
+
+	async def _bulk_update(self, rows, known):
+		"""
+		Update the changed columns of the existing maps, with one update statement per chunk.
+
+		:param rows: Map rows (see :meth:`_get_map_row`).
+		:param known: Dictionary with the uid as key and the map instance as value.
+		"""
+		columns = ['file', 'name', 'author_nickname', 'mx_id']
+		now = datetime.datetime.now()
+		for idx in range(0, len(rows), self.CHUNK_SIZE):
+			chunk = rows[idx:idx + self.CHUNK_SIZE]
+			ids = [known[row['uid']].get_id() for row in chunk]
+			update = dict(
+				(column, case(Map.id, [(map_id, row[column]) for map_id, row in zip(ids, chunk)], getattr(Map, column)))
+				for column in columns
+			)
+			await Map.execute(Map.update(updated_at=now, **update).where(Map.id << ids))
+
+			for row in chunk:
+				map_instance = known[row['uid']]
+				for column in columns:
+					setattr(map_instance, column, row[column])
+				map_instance.updated_at = now
+
+	def _set_maps(self, maps):
+		self._maps = maps
+		self._maps_by_uid = dict()
+		self._maps_by_file = dict()
+		for map_instance in maps:
+			self._add_to_index(map_instance)
+
+	def _add_to_index(self, map_instance):
+		self._maps_by_uid[map_instance.uid] = map_instance
+		self._maps_by_file[map_instance.file] = map_instance
+		Map.CACHE[map_instance.uid] = map_instance
+
+	def _remove_from_index(self, map_instance):
+		self._maps_by_uid.pop(map_instance.uid, None)
+		self._maps_by_file.pop(map_instance.file, None)
+
 	async def get_map_author_nickname(self, map_details):
 		"""
 		Get the map author nickname by map details.
@@ -266,11 +352,23 @@ class MapManager(CoreContrib):
 		:param uid: By uid (pk).
 		:return: Player or exception if not found
 		"""
+		if uid in self._maps_by_uid:
+			return self._maps_by_uid[uid]
 		try:
 			return await Map.get_by_uid(uid)
 		except DoesNotExist:
 			raise MapNotFound('Map not found.')
 
+	def get_map_by_file(self, filename):
+		"""
+		Get the map instance of the current playlist by filename.
+
+		:param filename: Filename, relative to the 'Maps' directory.
+		:return: Map instance or None when not in the playlist.
+		:rtype: pyplanet.apps.core.maniaplanet.models.Map
+		"""
+		return self._maps_by_file.get(filename)
+
 	async def get_map_by_index(self, index):
 		"""
 		Get map instance by index id (primary key).
@@ -361,10 +459,7 @@ class MapManager(CoreContrib):
 		:param uid: UID String
 		:return: Boolean, True if it's in our current playlist (match settings in our session).
 		"""
-		for map_instance in self.maps:
-			if map_instance.uid == uid:
-				return True
-		return False
+		return uid in self._maps_by_uid
 
 	async def add_map(self, filename, insert=True, save_matchsettings=True):
 		"""
@@ -443,12 +538,9 @@ class MapManager(CoreContrib):
 		try:
 			success = await self._instance.gbx('RemoveMap', map)
 			if success:
-				the_map = None
-				for m in self._maps:
-					if m.file == map:
-						the_map = m
-						break
+				the_map = self._maps_by_file.get(map)
 				if the_map:
+					self._remove_from_index(the_map)
 					self._maps.remove(the_map)
 		except Fault as e:
 			if 'unknown' in e.faultString:
@@ -25,6 +25,7 @@ class PermissionManager(CoreContrib):
 		:type instance: pyplanet.core.instance.Instance
 		"""
 		self._instance = instance
+		self._cache = instance.db.cache.namespace('permissions', ttl=300, models=[Permission])
 
 	async def on_start(self):
 		"""
@@ -60,7 +61,9 @@ class PermissionManager(CoreContrib):
 		:type name: str
 		:type namespace: str
 		"""
-		return await Permission.get(namespace=namespace, name=name)
+		return await self._cache.get_or_fetch(
+			(namespace, name), lambda: Permission.get(namespace=namespace, name=name)
+		)
 
 	async def register(self, name, description='', app=None, min_level=1, namespace=None):
 		"""
@@ -2,7 +2,8 @@ import asyncio
 import datetime
 import logging
 
-from peewee import DoesNotExist
+from peewee import DoesNotExist, IntegrityError
+from playhouse.shortcuts import case
 
 from pyplanet.apps.core.maniaplanet.models import Player
 from pyplanet.conf import settings
@@ -34,6 +35,8 @@ class PlayerManager(CoreContrib):
 
 		Don't initiate this class yourself.
 	"""
+	CHUNK_SIZE = 500
+
 	def __init__(self, instance):
 		"""
 		Initiate, should only be done from the core instance.
@@ -49,6 +52,12 @@ class PlayerManager(CoreContrib):
 		self._online = set()
 		self._online_logins = set()
 
+		# Connects that are being handled, login as key and future (resolved with the player) as value.
+		self._connecting = dict()
+
+		# Connects that are waiting for the next batch, login as key and future as value.
+		self._pending_connects = dict()
+
 		# Counters.
 		self._counter_lock = asyncio.Lock()
 		self._total_count = 0
@@ -82,7 +91,7 @@ class PlayerManager(CoreContrib):
 		current playing players are also initiated correctly!
 		"""
 		player_list = await self._instance.gbx('GetPlayerList', -1, 0)
-		await asyncio.gather(*[self.handle_connect(player['Login']) for player in player_list])
+		await self.handle_connects([player['Login'] for player in player_list])
 
 		# Load and activate blacklist.
 		try:
@@ -102,21 +111,13 @@ class PlayerManager(CoreContrib):
 		"""
 		# Update player and spectator counters.
 		player_list = await self._instance.gbx('GetPlayerList', -1, 0)
+		infos = await self._get_player_infos([player['Login'] for player in player_list])
 
 		total = 0
 		specs = 0
 		players = 0
 
-		for player in player_list:
-			if self._instance.game.server_is_dedicated and self._instance.game.server_player_login == player['Login']:
-				continue
-
-			try:
-				info = await self._instance.gbx('GetDetailedPlayerInfo', player['Login'])
-			except:
-				# Player has left during this time.
-				continue
-
+		for info in infos.values():
 			total += 1
 			if info['IsSpectator']:
 				specs += 1
@@ -132,6 +133,9 @@ class PlayerManager(CoreContrib):
 		"""
 		Handle a connection of a player, this call is being called inside of the Glue of the callbacks.
 
+		The connects that arrive in the same event loop iteration are handled together in one batch
+		(see :meth:`handle_connects`), so the player connect signals are sent after the batch is completed.
+
 		:param login: Login, received from dedicated.
 		:return: Database Player instance.
 		:rtype: pyplanet.apps.core.maniaplanet.models.Player
@@ -140,55 +144,175 @@ class PlayerManager(CoreContrib):
 		if self._instance.game.server_is_dedicated and self._instance.game.server_player_login == login:
 			return
 
+		future = self._get_connect_future(login)
+		if not self._pending_connects:
+			asyncio.get_event_loop().call_soon(self._flush_connects)
+		self._pending_connects[login] = future
+		return await asyncio.shield(future)
+
+	def _flush_connects(self):
+		pending, self._pending_connects = self._pending_connects, dict()
+		if pending:
+			asyncio.ensure_future(self._run_connects(pending))
+
+	async def _run_connects(self, pending):
+		players = dict()
 		try:
-			info = await self._instance.gbx('GetDetailedPlayerInfo', login)
-		except:
-			# Most likely too late, did disconnect directly after connecting..
-			# See #126
-			return
-		ip, _, port = info['IPAddress'].rpartition(':')
-		is_owner = login in settings.OWNERS[self._instance.process_name]
+			players = await self.handle_connects(list(pending.keys()))
+		except Exception as e:
+			logger.exception(e)
+		finally:
+			for login, future in pending.items():
+				if not future.done():
+					future.set_result(players.get(login))
 
+	async def handle_connects(self, logins):
+		"""
+		Handle the connections of multiple players at once. The player details are requested in one multicall, the
+		known players are fetched with one query, the unknown players are inserted at once and the known players are
+		updated with one update statement.
+
+		:param logins: List of logins.
+		:return: Dictionary with login as key and player instance as value. Players that disconnected in the meantime are
+				 left out.
+		:rtype: dict
+		"""
+		if self._instance.game.server_is_dedicated:
+			logins = [login for login in logins if login != self._instance.game.server_player_login]
+
+		futures = dict((login, self._get_connect_future(login)) for login in logins)
+		players = dict()
 		try:
-			player = await Player.get_by_login(login)
-			player.last_ip = ip
-			player.last_seen = datetime.datetime.now()
-			player.nickname = info['NickName']
-			if is_owner:
-				player.level = Player.LEVEL_MASTER
-			await player.save()
-		except DoesNotExist:
-			# Get details of player from dedicated.
-			player = await Player.create(
-				login=login,
-				nickname=info['NickName'],
-				last_ip=ip,
-				last_seen=datetime.datetime.now(),
-				level=Player.LEVEL_MASTER if is_owner else Player.LEVEL_PLAYER,
+			players = await self._handle_connects(logins)
+			return players
+		finally:
+			for login, future in futures.items():
+				if self._connecting.get(login) is future:
+					del self._connecting[login]
+				if not future.done():
+					future.set_result(players.get(login))
+
+	def _get_connect_future(self, login):
+		future = self._connecting.get(login)
+		if not future or future.done():
+			self._connecting[login] = future = asyncio.get_event_loop().create_future()
+		return future
+
+	async def _get_player_infos(self, logins):
+		"""
+		Get the detailed player info of the players with a single multicall.
+
+		:param logins: List of logins.
+		:return: Dictionary with login as key and the player info as value. Players that already left are left out.
+		:rtype: dict
+		"""
+		if self._instance.game.server_is_dedicated:
+			logins = [login for login in logins if login != self._instance.game.server_player_login]
+		if not logins:
+			return dict()
+
+		results = await self._instance.gbx.multicall(
+			*[self._instance.gbx('GetDetailedPlayerInfo', login) for login in logins]
+		)
+		return dict(
+			(login, info) for login, info in zip(logins, results)
+			# Most likely too late, did disconnect directly after connecting.. See #126
+			if isinstance(info, dict) and 'faultCode' not in info
+		)
+
+	async def _handle_connects(self, logins):
+		infos = await self._get_player_infos(logins)
+		if not infos:
+			return dict()
+
+		now = datetime.datetime.now()
+		owners = settings.OWNERS[self._instance.process_name]
+		rows = dict()
+		for login, info in infos.items():
+			ip, _, port = info['IPAddress'].rpartition(':')
+			rows[login] = dict(
+				login=login, nickname=info['NickName'], last_ip=ip, last_seen=now,
+				level=Player.LEVEL_MASTER if login in owners else Player.LEVEL_PLAYER,
 			)
 
-		# Set the join time.
-		player.flow.joined_at = datetime.datetime.now()
+		players = await Player.get_many_by_login(list(rows.keys()))
+		await self._bulk_update_players([players[login] for login in rows if login in players], rows, now)
+
+		new_rows = [row for login, row in rows.items() if login not in players]
+		if new_rows:
+			await self._bulk_insert_players(new_rows, now)
+			players.update(await Player.get_many_by_login([row['login'] for row in new_rows]))
 
 		# Update counter and state.
 		async with self._counter_lock:
-			player.flow.player_id = info['PlayerId']
-			player.flow.team_id = info['TeamId']
-			player.flow.is_spectator = bool(info['IsSpectator'])
-			player.flow.is_player = not bool(info['IsSpectator'])
-			player.flow.zone = parse_path(info['Path'])
-
-			self._total_count += 1
-			if player.flow.is_spectator:
-				self._spectators_count += 1
-			else:
-				self._players_count += 1
-
-		self._online.add(player)
-		self._online_logins.add(login)
+			for login, player in players.items():
+				info = infos[login]
+				player.flow.joined_at = now
+				player.flow.player_id = info['PlayerId']
+				player.flow.team_id = info['TeamId']
+				player.flow.is_spectator = bool(info['IsSpectator'])
+				player.flow.is_player = not bool(info['IsSpectator'])
+				player.flow.zone = parse_path(info['Path'])
+
+				self._total_count += 1
+				if player.flow.is_spectator:
+					self._spectators_count += 1
+				else:
+					self._players_count += 1
+
+		for login, player in players.items():
+			Player.CACHE.pin(login)
+			self._online.add(player)
+			self._online_logins.add(login)
 		self.performance_mode = len(self._online) >= await performance_mode.get_value()
 
-		return player
+		return players
+
+	async def _bulk_update_players(self, players, rows, now):
+		"""
+		Update the nickname, ip, level and last seen of the known players with one update statement per chunk. The level
+		is only raised for the owners.
+
+		:param players: Player instances.
+		:param rows: Dictionary with login as key and the player details as value.
+		:param now: Current time.
+		"""
+		for idx in range(0, len(players), self.CHUNK_SIZE):
+			chunk = players[idx:idx + self.CHUNK_SIZE]
+			for player in chunk:
+				row = rows[player.login]
+				player.nickname = row['nickname']
+				player.last_ip = row['last_ip']
+				player.last_seen = now
+				player.updated_at = now
+				if row['level'] == Player.LEVEL_MASTER:
+					player.level = Player.LEVEL_MASTER
+
+			ids = [player.get_id() for player in chunk]
+			update = dict(
+				(column, case(Player.id, [(player.get_id(), getattr(player, column)) for player in chunk], getattr(Player, column)))
+				for column in ['nickname', 'last_ip', 'level']
+			)
+			await Player.execute(Player.update(last_seen=now, updated_at=now, **update).where(Player.id << ids))
+
+	async def _bulk_insert_players(self, rows, now):
+		"""
+		Insert the unknown players with one insert statement per chunk.
+
+		:param rows: Player details.
+		:param now: Current time.
+		"""
+		for idx in range(0, len(rows), self.CHUNK_SIZE):
+			chunk = [dict(row, created_at=now, updated_at=now) for row in rows[idx:idx + self.CHUNK_SIZE]]
+			try:
+				await Player.execute(Player.insert_many(chunk))
+			except IntegrityError:
+				# Another connect inserted one of the players in the meantime, insert the rows one by one.
+				for row in chunk:
+					try:
+						await Player.execute(Player.insert(**row))
+					except IntegrityError:
+						pass
 
 	async def handle_info_change(self, player, is_spectator, is_temp_spectator, is_pure_spectator, target, team_id, **kwargs):
 		if not player:
@@ -260,10 +384,7 @@ class PlayerManager(CoreContrib):
 			time_on_server = datetime.datetime.now() - player.flow.joined_at
 			player.total_playtime += int(time_on_server.total_seconds())
 
-		try:
-			del Player.CACHE[login]
-		except:
-			pass
+		Player.CACHE.unpin(login)
 		player.last_seen = datetime.datetime.now()
 		await player.save()
 
@@ -293,12 +414,37 @@ class PlayerManager(CoreContrib):
 			else:
 				raise PlayerNotFound('Player not found.')
 		except DoesNotExist:
-			if lock:
-				await asyncio.sleep(4)
+			if lock and login:
+				# The player could be connecting right now, wait for the connect to be handled.
+				future = self._get_connect_future(login)
+				try:
+					await asyncio.wait_for(asyncio.shield(future), 4)
+				except asyncio.TimeoutError:
+					if self._connecting.get(login) is future:
+						del self._connecting[login]
 				return await self.get_player(login=login, pk=pk, lock=False)
 			else:
 				raise PlayerNotFound('Player not found.')
 
+	async def get_players(self, logins):
+		"""
+		Get multiple players by login, with a single query for the players that are not cached.
+
+		:param logins: List of logins.
+		:return: Dictionary with login as key and player instance as value. Unknown logins are left out.
+		:rtype: dict
+		"""
+		return await Player.get_many_by_login(logins)
+
+	@property
+	def cache_stats(self):
+		"""
+		Statistics of the player identity map (size, pinned, hits, misses, hit_ratio and evictions).
+
+		:rtype: dict
+		"""
+		return Player.CACHE.stats()
+
 	async def get_player_by_id(self, identifier):
 		"""
 		Get player object by ID.
@@ -2,6 +2,8 @@ from .database import Database, Proxy
 from .registry import Registry
 from .migrator import Migrator
 from .model import Model, TimedModel
+from .identity import IdentityMap
+from .cache import QueryCache
 
 __all__ = [
 	'Database',
@@ -10,4 +12,6 @@ __all__ = [
 	'Migrator',
 	'Model',
 	'TimedModel',
+	'IdentityMap',
+	'QueryCache',
 ]
@@ -0,0 +1,213 @@
+"""
+The query cache is a shared read-through cache for the results of read queries. The cache is divided into namespaces, every
+namespace has its own time to live, size and invalidation rules.
+"""
+import asyncio
+import collections
+import time
+
+
+class CacheNamespace:
+	"""
+	Namespace of the query cache.
+
+	The entries are evicted when they are older than ``ttl`` seconds, or when there are more than ``max_size`` entries
+	(least recently used first). All entries are invalidated when one of the ``models`` is written (through the model
+	methods, like ``save``, ``destroy`` and ``execute``) or when one of the ``signals`` is sent.
+
+	Concurrent misses of the same key share a single fetch.
+	"""
+
+	def __init__(self, name, ttl=60, max_size=1000, models=None):
+		"""
+		Initiate the namespace.
+
+		:param name: Name of the namespace.
+		:param ttl: Seconds the entries are cached. None to disable expiration.
+		:param max_size: Maximum amount of entries.
+		:param models: Models that invalidate the namespace when written.
+		"""
+		self.name = name
+		self.ttl = ttl
+		self.max_size = max_size
+		self.models = tuple(models or ())
+
+		self._entries = collections.OrderedDict()
+		self._fetching = dict()
+
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+		self.invalidations = 0
+
+	async def get_or_fetch(self, key, fetch):
+		"""
+		Get the value from the cache, or fetch (and cache) it when it's missing or invalid.
+
+		:param key: Key (hashable), for example the query parameters.
+		:param fetch: Coroutine function without arguments that fetches the value.
+		:return: Value.
+		"""
+		version = self._get_version()
+		entry = self._entries.get(key)
+		if entry is not None and entry[1] == version and not self._is_expired(entry):
+			self.hits += 1
+			self._entries.move_to_end(key)
+			return entry[0]
+
+		self.misses += 1
+		future = self._fetching.get(key)
+		if future is not None:
+			return await asyncio.shield(future)
+
+		future = self._fetching[key] = asyncio.get_event_loop().create_future()
+		try:
+			value = await fetch()
+		except Exception as e:
+			future.set_exception(e)
+			# Retrieve the exception, so it isn't logged when nobody else was waiting.
+			future.exception()
+			raise
+		else:
+			future.set_result(value)
+		finally:
+			if self._fetching.get(key) is future:
+				del self._fetching[key]
+
+		# Only cache the value when nothing was written while fetching.
+		if version == self._get_version():
+			self.set(key, value)
+		return value
+
+	async def execute(self, query, key=None):
+		"""
+		Execute the select query through the cache. The results are cached as a list.
+
+		:param query: Select query.
+		:param key: Optional key, the SQL and parameters of the query by default.
+		:return: List with the results.
+		:rtype: list
+		"""
+		if key is None:
+			sql, params = query.sql()
+			key = (query.model_class, sql, tuple(params))
+		model = query.model_class
+
+		async def fetch():
+			return list(await model.execute(query))
+		return await self.get_or_fetch(key, fetch)
+
+	def set(self, key, value):
+		"""
+		Set the value in the cache.
+
+		:param key: Key.
+		:param value: Value.
+		"""
+		self._entries[key] = (value, self._get_version(), time.monotonic())
+		self._entries.move_to_end(key)
+		while len(self._entries) > self.max_size:
+			self._entries.popitem(last=False)
+			self.evictions += 1
+
+	def invalidate(self, key=None):
+		"""
+		Invalidate a single key, or the complete namespace.
+
+		:param key: Key or None for all entries.
+		"""
+		if key is None:
+			self._entries.clear()
+		else:
+			self._entries.pop(key, None)
+		self.invalidations += 1
+
+	async def on_signal(self, *args, **kwargs):
+		self.invalidate()
+
+	def stats(self):
+		"""
+		Get the statistics of the namespace.
+
+		:return: Dictionary with the size, hits, misses, hit ratio, evictions and invalidations.
+		:rtype: dict
+		"""
+		total = self.hits + self.misses
+		return dict(
+			size=len(self._entries),
+			max_size=self.max_size,
+			ttl=self.ttl,
+			hits=self.hits,
+			misses=self.misses,
+			hit_ratio=self.hits / total if total else 0.0,
+			evictions=self.evictions,
+			invalidations=self.invalidations,
+		)
+
+	def _get_version(self):
+		return tuple(model.get_write_version() for model in self.models)
+
+	def _is_expired(self, entry):
+		return self.ttl is not None and time.monotonic() - entry[2] > self.ttl
+
+	def __len__(self):
+		return len(self._entries)
+
+
+class QueryCache:
+	"""
+	Shared query cache, accessible with ``instance.db.cache``.
+
+	Get (or create) a namespace and read through it:
+
+	.. code-block:: python
+
+		cache = self.instance.db.cache.namespace(
+			'karma', ttl=300, models=[Karma, KarmaSummary], signals=['maniaplanet:map_begin']
+		)
+		summaries = await cache.execute(KarmaSummary.select().where(KarmaSummary.map == map.get_id()))
+	"""
+
+	def __init__(self):
+		self.namespaces = dict()
+
+	def namespace(self, name, ttl=60, max_size=1000, models=None, signals=None):
+		"""
+		Get the namespace, or create it when it doesn't exist yet.
+
+		:param name: Name of the namespace.
+		:param ttl: Seconds the entries are cached. None to disable expiration.
+		:param max_size: Maximum amount of entries.
+		:param models: Models that invalidate the namespace when written.
+		:param signals: Signals (instances or ``namespace:code`` strings) that invalidate the namespace.
+		:return: Namespace.
+		:rtype: pyplanet.core.db.cache.CacheNamespace
+		"""
+		if name in self.namespaces:
+			return self.namespaces[name]
+
+		namespace = self.namespaces[name] = CacheNamespace(name, ttl=ttl, max_size=max_size, models=models)
+		if signals:
+			from pyplanet.core.events.manager import SignalManager
+			for signal in signals:
+				SignalManager.listen(signal, namespace.on_signal)
+		return namespace
+
+	def invalidate(self, name=None):
+		"""
+		Invalidate a namespace or all namespaces.
+
+		:param name: Name of the namespace, None for all.
+		"""
+		for namespace_name, namespace in self.namespaces.items():
+			if name is None or namespace_name == name:
+				namespace.invalidate()
+
+	def stats(self):
+		"""
+		Get the statistics of all namespaces.
+
+		:return: Dictionary with the namespace name as key and the statistics as value.
+		:rtype: dict
+		"""
+		return dict((name, namespace.stats()) for name, namespace in self.namespaces.items())
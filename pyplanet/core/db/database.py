@@ -12,18 +12,26 @@ from pyplanet.core.exceptions import ImproperlyConfigured
 from .registry import Registry
 from .migrator import Migrator
 from .server_info import ServerInfo
+from .cache import QueryCache
+from .writer import WriteBehindQueue
 
 Proxy = peewee.Proxy()
 
+POOLED_ENGINES = {
+	'peewee_async.MySQLDatabase': 'peewee_async.PooledMySQLDatabase',
+	'peewee_async.PostgresqlDatabase': 'peewee_async.PooledPostgresqlDatabase',
+}
+
 
 class Database:
-	def __init__(self, engine_cls, instance, *args, **kwargs):
+	def __init__(self, engine_cls, instance, *args, write_behind=None, **kwargs):
 		"""
 		Initiate database.
 
 		:param engine_cls: Engine class
 		:param instance: Instance of the app.
 		:param args: *
+		:param write_behind: Options of the write-behind queue (interval, max_size, max_batch).
 		:param kwargs: **
 		:type instance: pyplanet.core.instance.Instance
 		"""
@@ -33,6 +41,8 @@ class Database:
 		self.registry = Registry(self.instance, self)
 		self.objects = peewee_async.Manager(self.engine, loop=self.instance.loop)
 		self.server_info = ServerInfo(self.engine, self)
+		self.writer = WriteBehindQueue(self, **(write_behind or dict()))
+		self.cache = QueryCache()
 
 		# Don't allow any sync code.
 		if hasattr(self.engine, 'allow_sync'):
@@ -43,23 +53,34 @@ class Database:
 	@classmethod
 	def create_from_settings(cls, instance, conf):
 		try:
-			engine_path, _, cls_name = conf['ENGINE'].rpartition('.')
+			engine_name = conf['ENGINE']
 			db_name = conf['NAME']
 			db_options = conf['OPTIONS'] if 'OPTIONS' in conf and conf['OPTIONS'] else dict()
+			pool_options = conf.get('POOL', None)
+			write_behind = dict((k.lower(), v) for k, v in (conf.get('WRITE_BEHIND', None) or dict()).items())
 
 			# FIX for #331. Replace utf8 by utf8mb4 in the mysql driver encoding.
-			if conf['ENGINE'] == 'peewee_async.MySQLDatabase' and 'charset' in db_options and db_options['charset'] == 'utf8':
+			if engine_name == 'peewee_async.MySQLDatabase' and 'charset' in db_options and db_options['charset'] == 'utf8':
 				logging.info('Forcing to use \'utf8mb4\' instead of \'utf8\' for the MySQL charset option! (Fix #331).')
 				db_options['charset'] = 'utf8mb4'
 
+			# Use the pooled variant of the async engines when the pool is configured.
+			if pool_options and engine_name in POOLED_ENGINES:
+				engine_name = POOLED_ENGINES[engine_name]
+				db_options['min_connections'] = pool_options.get('MIN_SIZE', 1)
+				db_options['max_connections'] = pool_options.get('MAX_SIZE', 10)
+			elif pool_options:
+				logging.warning('Database engine \'{}\' doesn\'t support a connection pool, ignoring POOL!'.format(engine_name))
+
 			# We will try to load it so we have the validation inside this class.
+			engine_path, _, cls_name = engine_name.rpartition('.')
 			engine = getattr(importlib.import_module(engine_path), cls_name)
 		except ImportError:
 			raise ImproperlyConfigured('Database engine doesn\'t exist!')
 		except Exception as e:
 			raise ImproperlyConfigured('Database configuration isn\'t complete or engine could\'t be found!')
 
-		return cls(engine, instance, db_name, **db_options)
+		return cls(engine, instance, db_name, write_behind=write_behind, **db_options)
 
 	@contextlib.contextmanager
 	def __fake_allow_sync(self):
@@ -0,0 +1,168 @@
+"""
+The identity map keeps a single model instance per key in memory, so all parts of PyPlanet work with the same instance
+(and the same in-memory state) of a database row.
+"""
+import collections
+import time
+
+
+class IdentityMap:
+	"""
+	Bounded identity map. Pinned entries (online players for example) are always kept, the other entries are evicted
+	when they are not accessed for ``ttl`` seconds or when there are more than ``max_size`` of them (least recently used
+	first).
+
+	The map supports the basic dictionary operations (``in``, ``[]``, ``del``), but only :meth:`get` counts towards
+	the hit and miss statistics.
+	"""
+
+	def __init__(self, max_size=1000, ttl=3600):
+		"""
+		Initiate the identity map.
+
+		:param max_size: Maximum amount of unpinned entries.
+		:param ttl: Seconds after the last access before an unpinned entry is evicted. None to disable.
+		"""
+		self.max_size = max_size
+		self.ttl = ttl
+
+		self._pinned = dict()
+		self._entries = collections.OrderedDict()
+
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+
+	def get(self, key, default=None):
+		"""
+		Get the instance from the map and mark it as recently used.
+
+		:param key: Key.
+		:param default: Default when the key is not in the map.
+		:return: Instance or default.
+		"""
+		if key in self._pinned:
+			self.hits += 1
+			return self._pinned[key]
+		entry = self._entries.get(key)
+		if entry is None or self._is_expired(entry):
+			self.misses += 1
+			return default
+
+		self.hits += 1
+		self._entries.move_to_end(key)
+		entry[1] = time.monotonic()
+		return entry[0]
+
+	def peek(self, key, default=None):
+		"""
+		Get the instance from the map without touching the usage and statistics.
+
+		:param key: Key.
+		:param default: Default when the key is not in the map.
+		:return: Instance or default.
+		"""
+		if key in self._pinned:
+			return self._pinned[key]
+		entry = self._entries.get(key)
+		return entry[0] if entry is not None else default
+
+	def set(self, key, value):
+		"""
+		Set the instance in the map. The pinned state of the key is kept.
+
+		:param key: Key.
+		:param value: Instance.
+		"""
+		if key in self._pinned:
+			self._pinned[key] = value
+			return
+		self._entries[key] = [value, time.monotonic()]
+		self._entries.move_to_end(key)
+		self.evict()
+
+	def pin(self, key):
+		"""
+		Pin the key, the instance will not be evicted until it's unpinned.
+
+		:param key: Key.
+		"""
+		entry = self._entries.pop(key, None)
+		if entry is not None:
+			self._pinned[key] = entry[0]
+
+	def unpin(self, key):
+		"""
+		Unpin the key, the instance becomes the most recently used unpinned entry.
+
+		:param key: Key.
+		"""
+		if key in self._pinned:
+			self._entries[key] = [self._pinned.pop(key), time.monotonic()]
+			self.evict()
+
+	def is_pinned(self, key):
+		return key in self._pinned
+
+	def evict(self):
+		"""
+		Evict the expired and the least recently used unpinned entries.
+		"""
+		while self._entries:
+			key, entry = next(iter(self._entries.items()))
+			if len(self._entries) <= self.max_size and not self._is_expired(entry):
+				break
+			del self._entries[key]
+			self.evictions += 1
+
+	def pop(self, key, default=None):
+		if key in self._pinned:
+			return self._pinned.pop(key)
+		entry = self._entries.pop(key, None)
+		return entry[0] if entry is not None else default
+
+	def clear(self):
+		self._pinned.clear()
+		self._entries.clear()
+
+	def stats(self):
+		"""
+		Get the statistics of the map.
+
+		:return: Dictionary with the size, pinned entries, hits, misses, hit ratio and evictions.
+		:rtype: dict
+		"""
+		total = self.hits + self.misses
+		return dict(
+			size=len(self),
+			pinned=len(self._pinned),
+			max_size=self.max_size,
+			hits=self.hits,
+			misses=self.misses,
+			hit_ratio=self.hits / total if total else 0.0,
+			evictions=self.evictions,
+		)
+
+	def _is_expired(self, entry):
+		return self.ttl is not None and time.monotonic() - entry[1] > self.ttl
+
+	def __contains__(self, key):
+		return key in self._pinned or key in self._entries
+
+	def __getitem__(self, key):
+		value = self.peek(key, self)
+		if value is self:
+			raise KeyError(key)
+		return value
+
+	def __setitem__(self, key, value):
+		self.set(key, value)
+
+	def __delitem__(self, key):
+		if key in self._pinned:
+			del self._pinned[key]
+		else:
+			del self._entries[key]
+
+	def __len__(self):
+		return len(self._pinned) + len(self._entries)
@@ -45,10 +45,16 @@ class Migrator:
 
 	async def create_tables(self):
 		creating = list()
+		existing_apps = set()
 		for name, (app, name, model) in self.db.registry.models.items():
 			if not model.table_exists():
 				creating.append(model)
 				self.pass_migrations.add(app.label)
+			else:
+				existing_apps.add(app.label)
+
+		# Only skip the migrations of apps that are installed for the first time (not when a model is added to an app).
+		self.pass_migrations -= existing_apps
 
 		self.db.engine.create_tables(creating, safe=True)
 
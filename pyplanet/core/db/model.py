@@ -1,7 +1,7 @@
 import datetime
 
 from peewee import Model as PeeweeModel, ReverseRelationDescriptor
-from peewee import DateTimeField
+from peewee import DateTimeField, DeleteQuery, InsertQuery, UpdateQuery
 from peewee_async import Manager
 
 from .database import Proxy
@@ -48,13 +48,34 @@ class ObjectManager(Manager):
 class Model(PeeweeModel):
 	objects = ObjectManager()
 
+	# Write version per model class, increased on every write through the model methods. Used to invalidate cached reads.
+	_write_versions = dict()
+
+	@classmethod
+	def get_write_version(cls):
+		"""
+		Get the write version of the model. The version changes after every insert, update or delete executed through the
+		model methods.
+
+		:rtype: int
+		"""
+		return Model._write_versions.get(cls, 0)
+
+	@classmethod
+	def mark_written(cls):
+		Model._write_versions[cls] = Model._write_versions.get(cls, 0) + 1
+
 	@classmethod
 	async def get(cls, *args, **kwargs):
 		return await cls.objects.get(cls, *args, **kwargs)
 
 	@classmethod
 	async def execute(cls, query):
-		return await cls.objects.execute(query)
+		result = await cls.objects.execute(query)
+		# Raw queries are mostly selects, and aren't treated as writes.
+		if isinstance(query, (InsertQuery, UpdateQuery, DeleteQuery)):
+			query.model_class.mark_written()
+		return result
 
 	@classmethod
 	async def get_or_create(cls, *args, **kwargs):
@@ -101,7 +122,9 @@ class Model(PeeweeModel):
 					field_dict.pop(pk_part_name, None)
 			else:
 				field_dict.pop(pk_field.name, None)
-			return await self._update(__data=True, **field_dict)
+			rows = await self._update(__data=True, **field_dict)
+			self.mark_written()
+			return rows
 		elif pk_field is None:
 			await self._insert(**field_dict)
 			rows = 1
@@ -112,10 +135,13 @@ class Model(PeeweeModel):
 			self._set_pk_value(pk_value)
 			rows = 1
 		self._dirty.clear()
+		self.mark_written()
 		return rows
 
 	async def destroy(self, recursive=False, delete_nullable=False):
-		return await self.objects.delete(self, recursive, delete_nullable)
+		result = await self.objects.delete(self, recursive, delete_nullable)
+		self.mark_written()
+		return result
 
 	class Meta:
 		database = Proxy
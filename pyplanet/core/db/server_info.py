@@ -55,3 +55,20 @@ class ServerInfo:
 			# No database version could be established
 			logger.warning("Unable to determine database server version (type: {})".format(self.type))
 
+
+	@property
+	def supports_window_functions(self):
+		"""
+		Whether the database server supports window functions (like ``RANK() OVER (...)``). MySQL supports them since 8.0,
+		MariaDB since 10.2 and PostgreSQL since 8.4.
+
+		:rtype: bool
+		"""
+		minimum = dict(mysql=(8, 0), mariadb=(10, 2), postgresql=(8, 4)).get(self.type)
+		if not minimum or not self.version:
+			return False
+		try:
+			version = tuple(int(part) for part in self.version.split('.')[:2])
+		except ValueError:
+			return False
+		return version >= minimum
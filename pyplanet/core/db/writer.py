@@ -0,0 +1,186 @@
+"""
+The write-behind queue collects database writes that don't need to be awaited by the caller (statistics, records) and
+writes them in batches, outside of the hot callback path.
+"""
+import asyncio
+import collections
+import logging
+import time
+
+import peewee_async
+
+from pyplanet.utils.log import handle_exception
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindQueue:
+	"""
+	Write-behind queue.
+
+	* Rows added with :meth:`insert` are grouped per model and written with ``insert_many`` statements.
+	* Instances added with :meth:`save` are coalesced, an instance that is saved multiple times before the flush is only
+	  written once (with the latest state). The pending saves are written in a single transaction.
+
+	The queue is flushed every ``interval`` seconds, at the end of every map, when the queue reaches ``max_size`` and on
+	shutdown. Failed writes are kept in the queue and retried on the next flush.
+	"""
+
+	INTERVAL = 2.0
+	MAX_SIZE = 500
+	MAX_BATCH = 250
+
+	def __init__(self, database, interval=None, max_size=None, max_batch=None):
+		"""
+		Initiate the write-behind queue.
+
+		:param database: Database instance.
+		:param interval: Seconds between the flushes.
+		:param max_size: Amount of pending writes that triggers a flush.
+		:param max_batch: Maximum amount of rows per insert statement.
+		:type database: pyplanet.core.db.database.Database
+		"""
+		self.database = database
+		self.interval = interval or self.INTERVAL
+		self.max_size = max_size or self.MAX_SIZE
+		self.max_batch = max_batch or self.MAX_BATCH
+
+		self.inserts = collections.OrderedDict()
+		self.saves = collections.OrderedDict()
+
+		self.lock = None
+		self.task = None
+		self._flush_future = None
+
+		self.metrics = dict(flushes=0, rows=0, failures=0, flush_last=0.0, flush_max=0.0)
+
+	@property
+	def depth(self):
+		"""
+		Amount of pending writes.
+		"""
+		return sum(len(rows) for rows in self.inserts.values()) + len(self.saves)
+
+	def insert(self, model, **row):
+		"""
+		Queue the insert of a row.
+
+		:param model: Model class.
+		:param row: Column values.
+		"""
+		self.inserts.setdefault(model, list()).append(row)
+		self._check_size()
+
+	def save(self, instance):
+		"""
+		Queue the save of the model instance.
+
+		:param instance: Model instance.
+		"""
+		pk = instance._get_pk_value()
+		self.saves[(instance.__class__, pk if pk is not None else id(instance))] = instance
+		self._check_size()
+
+	def _check_size(self):
+		if self.depth >= self.max_size and not (self._flush_future and not self._flush_future.done()):
+			self._flush_future = asyncio.ensure_future(self.flush())
+
+	async def start(self):
+		"""
+		Start the flush timer and flush at the end of every map.
+		"""
+		from pyplanet.core.events.manager import SignalManager
+
+		if not self.task:
+			self.task = asyncio.ensure_future(self.loop())
+		SignalManager.listen('maniaplanet:map_end', self.map_end)
+
+	async def stop(self):
+		"""
+		Stop the timer and flush all pending writes.
+		"""
+		if self.task:
+			self.task.cancel()
+			self.task = None
+		await self.flush()
+		if self.depth:
+			logger.error('Write-behind queue could not write {} pending rows on shutdown!'.format(self.depth))
+
+	async def loop(self):
+		while True:
+			await asyncio.sleep(self.interval)
+			try:
+				await self.flush()
+			except Exception as e:
+				handle_exception(e, __name__, 'loop')
+
+	async def map_end(self, *args, **kwargs):
+		await self.flush()
+
+	async def flush(self):
+		"""
+		Write all pending rows and instances now.
+		"""
+		if not self.lock:
+			self.lock = asyncio.Lock()
+
+		async with self.lock:
+			if not self.depth:
+				return
+
+			inserts, self.inserts = self.inserts, collections.OrderedDict()
+			saves, self.saves = self.saves, collections.OrderedDict()
+			start = time.monotonic()
+			rows = 0
+
+			for model, model_rows in inserts.items():
+				for idx in range(0, len(model_rows), self.max_batch):
+					batch = model_rows[idx:idx + self.max_batch]
+					try:
+						await model.execute(model.insert_many(batch))
+						rows += len(batch)
+					except Exception as e:
+						# Keep the rows for the next flush.
+						self.metrics['failures'] += 1
+						self.inserts.setdefault(model, list()).extend(batch)
+						logger.exception(e)
+
+			if saves:
+				try:
+					async with self.transaction():
+						for instance in saves.values():
+							await instance.save()
+					rows += len(saves)
+				except Exception as e:
+					self.metrics['failures'] += 1
+					for key, instance in saves.items():
+						self.saves.setdefault(key, instance)
+					logger.exception(e)
+
+			duration = time.monotonic() - start
+			self.metrics['flushes'] += 1
+			self.metrics['rows'] += rows
+			self.metrics['flush_last'] = duration
+			self.metrics['flush_max'] = max(self.metrics['flush_max'], duration)
+			logger.debug('Write-behind queue flushed {} rows in {:.3f}s.'.format(rows, duration))
+
+	def transaction(self):
+		if isinstance(self.database.engine, peewee_async.AsyncDatabase):
+			return self.database.objects.atomic()
+		return _null_transaction()
+
+	def stats(self):
+		"""
+		Get the queue depth and flush statistics.
+
+		:rtype: dict
+		"""
+		return dict(depth=self.depth, **self.metrics)
+
+
+class _null_transaction:
+	async def __aenter__(self):
+		return None
+
+	async def __aexit__(self, exc_type, exc_val, exc_tb):
+		return False
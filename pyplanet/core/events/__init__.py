@@ -1,9 +1,11 @@
 from .dispatcher import Signal
 from .manager import SignalManager, public_signal, public_callback
+from .batched import BatchedSignal
 from .callback import Callback, handle_generic
 
 __all__ = [
 	'Signal',
+	'BatchedSignal',
 
 	'SignalManager',
 	'public_signal',
@@ -0,0 +1,100 @@
+"""
+The batched signal collects the events of a (high frequency) source signal and delivers them in micro-batches.
+"""
+import asyncio
+import collections
+import logging
+
+from pyplanet.core.events.dispatcher import Signal
+from pyplanet.core.events.manager import SignalManager
+
+logger = logging.getLogger(__name__)
+
+
+class BatchedSignal(Signal):
+	"""
+	A batched signal is an opt-in variant of a high frequency signal. It listens to the source signal and collects the
+	payloads, to deliver them in one go to its own receivers every ``interval`` seconds or once ``max_size`` events
+	are collected (whatever comes first).
+
+	The receivers will get the ``events`` keyword argument, a list with the payloads (dictionaries) of the source signal
+	in the order they were received. This makes it possible to update the state for all events and only re-render
+	once per batch.
+
+	.. code-block:: python
+
+		self.context.signals.listen(tm_signals.waypoint_batch, self.player_waypoints)
+
+		async def player_waypoints(self, events, **kwargs):
+			for event in events:
+				...  # Update state with event['player'], event['race_time'], etc.
+			await self.widget.display()
+
+	"""
+
+	def __init__(self, source, code=None, namespace=None, interval=0.05, max_size=100):
+		"""
+		Initiate the batched signal.
+
+		:param source: Source signal to collect the events from.
+		:param code: Code of the batched signal.
+		:param namespace: Namespace of the batched signal.
+		:param interval: Maximum time in seconds an event is held before the batch is delivered.
+		:param max_size: Maximum amount of events in a batch.
+		:type source: pyplanet.core.events.dispatcher.Signal
+		"""
+		super().__init__(code=code, namespace=namespace)
+		self.source_signal = source
+		self.interval = interval
+		self.max_size = max_size
+
+		self.buffer = list()
+		self.pending = collections.deque()
+		self.flush_lock = None
+		self._flush_handle = None
+
+		self.source_signal.register(self.collect, weak=False)
+		SignalManager.register_signal(self, app=None)
+
+	def collect(self, signal=None, **kwargs):
+		"""
+		Collect the event of the source signal (receiver of the source signal).
+		"""
+		# Don't hold events when nobody is listening.
+		if not self.receivers:
+			return
+
+		self.buffer.append(kwargs)
+		if len(self.buffer) >= self.max_size:
+			self._cancel_flush()
+			self.pending.append(self.buffer)
+			self.buffer = list()
+			asyncio.ensure_future(self.flush())
+		elif not self._flush_handle:
+			self._flush_handle = asyncio.get_event_loop().call_later(self.interval, self._scheduled_flush)
+
+	def _scheduled_flush(self):
+		self._flush_handle = None
+		asyncio.ensure_future(self.flush())
+
+	def _cancel_flush(self):
+		if self._flush_handle:
+			self._flush_handle.cancel()
+			self._flush_handle = None
+
+	async def flush(self):
+		"""
+		Deliver the collected events to the receivers now. Call this before sending a signal that should be handled after
+		all pending events (for example the finish after the waypoints of a player). The batches are delivered one by one,
+		so the receivers will never process two batches at the same time.
+		"""
+		if not self.flush_lock:
+			self.flush_lock = asyncio.Lock()
+		async with self.flush_lock:
+			if self.buffer:
+				self._cancel_flush()
+				self.pending.append(self.buffer)
+				self.buffer = list()
+
+			while self.pending:
+				await self.send_robust(dict(events=self.pending.popleft()), raw=True)
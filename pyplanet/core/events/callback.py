@@ -3,6 +3,7 @@ This file contains a glue between core callbacks and desired callbacks.
 """
 from pyplanet.apps.core.maniaplanet.models import Player
 from pyplanet.core.events import Signal, SignalManager
+from pyplanet.core.events.dispatcher import _make_id
 
 
 class Callback(Signal):
@@ -28,7 +29,7 @@ class Callback(Signal):
 		super().__init__(code=code, namespace=namespace, process_target=target)
 
 		# Initiate raw signal, the raw gbx/script callback.
-		self.raw_signal = Signal(code=call, namespace='raw')
+		self.raw_signal = RawSignal(self, code=call, namespace='raw')
 		self.raw_signal.register(self.glue, weak=False)
 
 		SignalManager.register_signal(self.raw_signal, app=None, callback=True)
@@ -40,6 +41,30 @@ class Callback(Signal):
 		"""
 		return await self.send_robust(source)
 
+	def has_listeners(self):
+		"""
+		Has the callback listeners. The callbacks with their own processor always have, the processor could keep state
+		(for example the current map).
+
+		:return:
+		"""
+		return self.process_target is not handle_generic or super().has_listeners()
+
+
+class RawSignal(Signal):
+	"""
+	The raw signal of a callback. The glue to the destination callback is always registered, so the raw signal only has
+	listeners when the destination callback has, or when other receivers listen to the raw signal itself. This is used
+	to skip decoding the script callbacks that nobody listens to.
+	"""
+	def __init__(self, callback, **kwargs):
+		super().__init__(**kwargs)
+		self.callback = callback
+
+	def has_listeners(self):
+		glue_key = _make_id(self.callback.glue)
+		return self.callback.has_listeners() or any(key != glue_key for key, _ in self.receivers)
+
 
 async def handle_generic(source, signal, **kwargs):
 	"""
@@ -6,7 +6,14 @@ import threading
 import weakref
 import logging
 import asyncio
+import time
 
+try:
+	import contextvars
+except ImportError:  # pragma: no cover
+	contextvars = None
+
+from pyplanet.core.events.timing import LatencyHistogram, receiver_name
 from pyplanet.core.exceptions import SignalException, SignalGlueStop
 from pyplanet.utils.log import handle_exception
 
@@ -18,7 +25,9 @@ def _make_id(target):
 
 
 NONE_ID = _make_id(None)
-NO_RECEIVERS = object()
+
+# The signal that is being sent in the current context (task), None when unknown (Python 3.6).
+current_signal = contextvars.ContextVar('current_signal', default=None) if contextvars else None
 
 logger = logging.getLogger(__name__)
 
@@ -28,9 +37,16 @@ class Signal:
 	A signal is a destination tho distribute to where multiple listeners get the message. (event distribution).
 	"""
 
-	def __init__(self, code=None, namespace=None, process_target=None, use_caching=False):
+	def __init__(self, code=None, namespace=None, process_target=None, use_caching=False, receiver_budget=None):
 		"""
 		Create a new signal.
+
+		:param code: Code of the signal.
+		:param namespace: Namespace of the signal.
+		:param process_target: Processor (glue) method.
+		:param use_caching: Ignored, only kept for compatibility. The receivers are always compiled into a table.
+		:param receiver_budget: Default time budget in seconds for the async receivers. A receiver that exceeds the budget
+								is detached into a background task so it doesn't stall the other receivers.
 		"""
 		if not process_target:
 			process_target = self.process
@@ -50,10 +66,14 @@ class Signal:
 		else:
 			self.namespace = self.Meta.namespace
 
-		self.use_caching = use_caching
-		self.sender_receivers_cache = weakref.WeakKeyDictionary() if use_caching else {}
 		self._dead_receivers = False
 
+		# The receiver table is compiled on the first send after the receivers have been changed.
+		self.receiver_budget = receiver_budget
+		self.receiver_budgets = dict()
+		self.receiver_timings = dict()
+		self._receiver_table = None
+
 	class Meta:
 		"""
 		The meta-class contains the code of the signal, used for string notation.
@@ -83,7 +103,7 @@ class Signal:
 
 		:return:
 		"""
-		return bool(self._live_receivers())
+		return bool(self._get_receiver_table())
 
 	def set_self(self, receiver, slf):  # pragma: no cover
 		"""
@@ -104,7 +124,7 @@ class Signal:
 					return
 			raise Exception('Receiver is not yet known! You registered too early!')
 
-	def register(self, receiver, weak=True, dispatch_uid=None):
+	def register(self, receiver, weak=True, dispatch_uid=None, budget=None):
 		"""
 		Connect receiver to sender for signal.
 
@@ -120,12 +140,18 @@ class Signal:
 
 		:param dispatch_uid: An identifier used to uniquely identify a particular instance of
 			a receiver. This will usually be a string, though it may be anything hashable.
+
+		:param budget: Time budget in seconds for an async receiver, overrides the default budget of the signal.
+			When the receiver exceeds the budget, it will be detached into a background task.
 		"""
 		if dispatch_uid:
 			lookup_key = dispatch_uid
 		else:
 			lookup_key = _make_id(receiver)
 
+		if budget is not None:
+			self.receiver_budgets[lookup_key] = budget
+
 		if weak:
 			ref = weakref.ref
 			receiver_object = receiver
@@ -144,7 +170,7 @@ class Signal:
 					break
 			else:
 				self.receivers.append((lookup_key, receiver))
-			self.sender_receivers_cache.clear()
+			self._receiver_table = None
 
 	def unregister(self, receiver=None, dispatch_uid=None):
 		"""
@@ -170,13 +196,16 @@ class Signal:
 					del self.receivers[index]
 					if rec_key in self.self_refs:
 						del self.self_refs[rec_key]
+					if rec_key in self.receiver_budgets:
+						del self.receiver_budgets[rec_key]
 					break
-			self.sender_receivers_cache.clear()
+			self._receiver_table = None
 
 		return disconnected
 
 	@staticmethod
-	async def execute_receiver(receiver, args, kwargs, ignore_exceptions=False):
+	async def execute_receiver(receiver, args, kwargs, ignore_exceptions=False, timing=None):
+		start = time.perf_counter()
 		try:
 			if asyncio.iscoroutinefunction(receiver):
 				if len(args) > 0:
@@ -189,17 +218,66 @@ class Signal:
 		except Exception as exc:
 			if not ignore_exceptions:
 				raise
+			return receiver, Signal._handle_receiver_exception(receiver, exc)
+		finally:
+			if timing:
+				timing.add(time.perf_counter() - start)
+
+	@staticmethod
+	def execute_sync_receiver(receiver, args, kwargs, ignore_exceptions=False, timing=None):
+		"""
+		Execute a synchronous receiver inline, without wrapping it into a coroutine.
+		"""
+		start = time.perf_counter()
+		try:
+			return receiver, receiver(*args, **kwargs)
+		except Exception as exc:
+			if not ignore_exceptions:
+				raise
+			return receiver, Signal._handle_receiver_exception(receiver, exc)
+		finally:
+			if timing:
+				timing.add(time.perf_counter() - start)
+
+	@staticmethod
+	def _handle_receiver_exception(receiver, exc):
+		logger.exception(SignalException(
+			'Signal receiver \'{}\' => {} thrown an exception!'.format(receiver.__module__, receiver.__name__)
+		), exc_info=False)
 
-			logger.exception(SignalException(
-				'Signal receiver \'{}\' => {} thrown an exception!'.format(receiver.__module__, receiver.__name__)
-			), exc_info=False)
+		# Handle, will send to sentry if it's related to the core/contrib apps.
+		handle_exception(exc, receiver.__module__, receiver.__name__)
 
-			# Handle, will send to sentry if it's related to the core/contrib apps.
-			handle_exception(exc, receiver.__module__, receiver.__name__)
+		# Log the actual exception.
+		logger.exception(exc)
+		return exc
 
-			# Log the actual exception.
-			logger.exception(exc)
-			return receiver, exc
+	async def execute_budgeted_receiver(self, receiver, args, kwargs, budget, ignore_exceptions=False, timing=None):
+		"""
+		Execute the async receiver within the given time budget. When the budget is exceeded, the receiver will continue
+		in the background and the response of the receiver will be None.
+		"""
+		task = asyncio.ensure_future(self.execute_receiver(receiver, args, kwargs, ignore_exceptions, timing))
+		done, _ = await asyncio.wait({task}, timeout=budget)
+		if done:
+			return task.result()
+
+		if timing:
+			timing.detached += 1
+		logger.debug('Signal receiver \'{}\' exceeded the time budget of {}s on signal \'{}:{}\', detached it!'.format(
+			receiver_name(receiver), budget, self.namespace, self.code
+		))
+		task.add_done_callback(self._detached_receiver_done)
+		return receiver, None
+
+	@staticmethod
+	def _detached_receiver_done(task):
+		if task.cancelled():
+			return
+		exc = task.exception()
+		if exc:
+			handle_exception(exc, __name__, 'execute_budgeted_receiver')
+			logger.exception(exc, exc_info=exc)
 
 	async def send(self, source, raw=False, catch_exceptions=False, gather=True):
 		"""
@@ -208,6 +286,8 @@ class Signal:
 		terminating the dispatch loop. So it's possible that all receivers
 		won't be called if an error is raised.
 
+		Synchronous receivers are called inline, the async receivers are executed in parallel (when gather is enabled).
+
 		:param source: The data to be send to the processor which produces data that will be send to the receivers.
 		:param raw: Optional bool parameter to just send the source to the receivers without any processing.
 		:param catch_exceptions: Catch and return the exceptions.
@@ -215,41 +295,74 @@ class Signal:
 
 		:return: Return a list of tuple pairs [(receiver, response), ... ].
 		"""
-		if raw is False:
-			try:
-				kwargs = await self.process_target(signal=self, source=source)
-			except SignalGlueStop:
-				# Stop calling the receivers when our glue says we should!
-				return []
-		else:
-			kwargs = dict(**source, signal=self)
-
-		if not self.receivers:
-			return []
-
-		# Prepare the responses from the calls.
-		responses = []
-		gather_list = []
-		for key, receiver in self._live_receivers():
-			# Dereference the weak reference.
-			slf = self.self_refs.get(key, None)
-			if slf and isinstance(slf, weakref.ReferenceType):
-				slf = slf()
-			args = [slf] if slf else []
-
-			# Execute the receiver.
-			coro = self.execute_receiver(receiver, args, kwargs, ignore_exceptions=catch_exceptions)
-			if gather:
-				gather_list.append(coro)
+		# Mark the signal as the signal being processed, for the diagnostics of the receivers (and their tasks).
+		token = current_signal.set(self) if current_signal else None
+		try:
+			if raw is False:
+				try:
+					kwargs = await self.process_target(signal=self, source=source)
+				except SignalGlueStop:
+					# Stop calling the receivers when our glue says we should!
+					return []
 			else:
-				responses.append(await coro)
+				kwargs = dict(**source, signal=self)
 
-		# If gather, wait on the asyncio.gather operation and return the responses from there.
-		if gather:
-			return await asyncio.gather(*gather_list)
+			if not self.receivers:
+				return []
 
-		# Done, respond with all the results
-		return responses
+			# Prepare the responses from the calls.
+			responses = []
+			gather_list = []
+			try:
+				for key, receiver, is_weak, is_async, budget, timing in self._get_receiver_table():
+					# Dereference the weak reference.
+					if is_weak:
+						receiver = receiver()
+						if receiver is None:
+							continue
+
+					args = []
+					if self.self_refs:
+						slf = self.self_refs.get(key, None)
+						if slf and isinstance(slf, weakref.ReferenceType):
+							slf = slf()
+						args = [slf] if slf else []
+
+					# Execute the receiver.
+					if not is_async:
+						responses.append(self.execute_sync_receiver(
+							receiver, args, kwargs, ignore_exceptions=catch_exceptions, timing=timing
+						))
+						continue
+
+					if budget is not None:
+						coro = self.execute_budgeted_receiver(
+							receiver, args, kwargs, budget, ignore_exceptions=catch_exceptions, timing=timing
+						)
+					else:
+						coro = self.execute_receiver(receiver, args, kwargs, ignore_exceptions=catch_exceptions, timing=timing)
+
+					if gather:
+						gather_list.append((len(responses), coro))
+						responses.append(None)
+					else:
+						responses.append(await coro)
+			except Exception:
+				for _, coro in gather_list:
+					coro.close()
+				raise
+
+			# If gather, wait on the asyncio.gather operation and put the responses in the receiver order.
+			if gather_list:
+				results = await asyncio.gather(*[coro for _, coro in gather_list])
+				for (idx, _), result in zip(gather_list, results):
+					responses[idx] = result
+
+			# Done, respond with all the results
+			return responses
+		finally:
+			if token is not None:
+				current_signal.reset(token)
 
 	async def send_robust(self, source=None, raw=False, gather=True):
 		"""
@@ -265,9 +378,47 @@ class Signal:
 		"""
 		return await self.send(source, raw, catch_exceptions=True, gather=gather)
 
+	def get_receiver_stats(self):
+		"""
+		Get the latency statistics of the receivers of this signal.
+
+		:return: List with dictionaries per receiver.
+		:rtype: list
+		"""
+		return [timing.to_dict() for timing in self.receiver_timings.values() if timing.count]
+
+	def _get_receiver_table(self):
+		"""
+		Get the compiled receiver table. The table is rebuild after the receivers are changed and contains the
+		receiver (or weak reference), if the receiver is async, the time budget and the timing histogram.
+		"""
+		table = self._receiver_table
+		if table is not None and not self._dead_receivers:
+			return table
+
+		with self.lock:
+			self._clear_dead_receivers()
+			table = list()
+			for key, receiver in self.receivers:
+				is_weak = isinstance(receiver, weakref.ReferenceType)
+				target = receiver() if is_weak else receiver
+				if target is None:
+					continue
+				# The timings are kept per receiver name, so instances of the same view or app share the histogram.
+				name = receiver_name(target)
+				if name not in self.receiver_timings:
+					self.receiver_timings[name] = LatencyHistogram(name)
+				table.append((
+					key, receiver, is_weak, asyncio.iscoroutinefunction(target),
+					self.receiver_budgets.get(key, self.receiver_budget), self.receiver_timings[name],
+				))
+			self._receiver_table = table
+		return table
+
 	def _clear_dead_receivers(self):
 		if self._dead_receivers:
 			self._dead_receivers = False
+			self._receiver_table = None
 			new_receivers = []
 			for rec in self.receivers:
 				if isinstance(rec[1], weakref.ReferenceType) and rec[1]() is None:
@@ -275,50 +426,6 @@ class Signal:
 				new_receivers.append(rec)
 			self.receivers = new_receivers
 
-	def _live_receivers(self):
-		"""
-		Filter sequence of receivers to get resolved, live receivers.
-		This checks for weak references and resolves them, then returning only
-		live receivers.
-		"""
-		# We don't use the sender. Set it to none.
-		sender = None
-
-		receivers = None
-		if self.use_caching and not self._dead_receivers:
-			receivers = self.sender_receivers_cache.get(sender)
-			# We could end up here with NO_RECEIVERS even if we do check this case in
-			# .send() prior to calling _live_receivers() due to concurrent .send() call.
-			if receivers is NO_RECEIVERS:
-				return []
-
-		if receivers is None:
-			with self.lock:
-				self._clear_dead_receivers()
-				receivers = []
-				for receiverkey, receiver in self.receivers:
-					receivers.append((receiverkey, receiver))
-				if self.use_caching:
-					if not receivers:
-						self.sender_receivers_cache[sender] = NO_RECEIVERS
-					else:
-						# Note, we must cache the weakref versions.
-						self.sender_receivers_cache[sender] = receivers
-		non_weak_receivers = []
-
-		for receiver in receivers:
-			key = receiver[0]
-			receiver = receiver[1]
-
-			if isinstance(receiver, weakref.ReferenceType):
-				# Dereference the weak reference.
-				receiver = receiver()
-				if receiver is not None:
-					non_weak_receivers.append((key, receiver))
-			else:
-				non_weak_receivers.append((key, receiver))
-		return non_weak_receivers
-
 	def _remove_receiver(self):
 		# The list must be marked as dead. And will be cleaned in the next registry or call.
 		# We can't directly remove because GC is always running when lock is preserved.
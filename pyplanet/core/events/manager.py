@@ -115,6 +115,25 @@ class _SignalManager:
 		else:
 			raise KeyError('No such signal {}!'.format(key))
 
+	def get_receiver_stats(self, limit=None):
+		"""
+		Get the latency statistics of all the receivers of all signals, ordered by the total time spent.
+
+		:param limit: Limit the number of rows.
+		:return: List with dictionaries, containing the signal key, receiver name and latency details.
+		:rtype: list
+		"""
+		signals = list(self.signals.items())
+		signals.extend(('raw:{}'.format(code), signal) for code, signal in self.callbacks.items())
+
+		stats = list()
+		for key, signal in signals:
+			for row in signal.get_receiver_stats():
+				row['signal'] = key
+				stats.append(row)
+		stats.sort(key=lambda row: row['total'], reverse=True)
+		return stats[:limit] if limit else stats
+
 	def finish_reservations(self):  # pragma: no cover
 		"""
 		The method will copy all reservations to the actual signals. (PRIVATE)
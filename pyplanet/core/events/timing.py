@@ -0,0 +1,85 @@
+"""
+Timing utilities for the signal dispatcher, used to find out which receivers are slowing down the (hot) signals.
+"""
+import bisect
+
+
+class LatencyHistogram:
+	"""
+	Latency histogram of a single signal receiver. The buckets contain the upper bound in seconds.
+	"""
+	BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+	__slots__ = ('name', 'count', 'total', 'max', 'detached', 'buckets')
+
+	def __init__(self, name):
+		self.name = name
+		self.count = 0
+		self.total = 0.0
+		self.max = 0.0
+		self.detached = 0
+		self.buckets = [0] * (len(self.BUCKETS) + 1)
+
+	def add(self, seconds):
+		"""
+		Add a measurement.
+
+		:param seconds: Duration in seconds.
+		"""
+		self.count += 1
+		self.total += seconds
+		if seconds > self.max:
+			self.max = seconds
+		self.buckets[bisect.bisect_left(self.BUCKETS, seconds)] += 1
+
+	def percentile(self, percent):
+		"""
+		Get the (upper bound) of the bucket that contains the given percentile.
+
+		:param percent: Percentile, between 0 and 100.
+		:return: Upper bound in seconds, or the max duration for the overflow bucket.
+		"""
+		if not self.count:
+			return 0.0
+		threshold = self.count * percent / 100
+		seen = 0
+		for idx, amount in enumerate(self.buckets):
+			seen += amount
+			if seen >= threshold:
+				return self.BUCKETS[idx] if idx < len(self.BUCKETS) else self.max
+		return self.max
+
+	def reset(self):
+		self.count = 0
+		self.total = 0.0
+		self.max = 0.0
+		self.detached = 0
+		self.buckets = [0] * (len(self.BUCKETS) + 1)
+
+	def to_dict(self):
+		return dict(
+			receiver=self.name,
+			count=self.count,
+			total=self.total,
+			avg=self.total / self.count if self.count else 0.0,
+			max=self.max,
+			p50=self.percentile(50),
+			p95=self.percentile(95),
+			p99=self.percentile(99),
+			detached=self.detached,
+			buckets=dict(zip([str(b) for b in self.BUCKETS] + ['+inf'], self.buckets)),
+		)
+
+
+def receiver_name(receiver):
+	"""
+	Get the readable name of a receiver.
+
+	:param receiver: Receiver function or method.
+	:return: Module + qualified name.
+	:rtype: str
+	"""
+	return '{}.{}'.format(
+		getattr(receiver, '__module__', None),
+		getattr(receiver, '__qualname__', getattr(receiver, '__name__', repr(receiver)))
+	)
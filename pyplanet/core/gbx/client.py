@@ -2,7 +2,11 @@ import asyncio
 import logging
 import re
 
+from xmlrpc.client import Fault
+
+from pyplanet.core.gbx.planner import MulticallPlanner
 from pyplanet.core.gbx.query import Query, ScriptQuery
+from pyplanet.core.gbx.scheduler import get_priority
 from pyplanet.utils.functional import empty
 from .remote import GbxRemote
 
@@ -23,9 +27,19 @@ class GbxClient(GbxRemote):
 	MINIMUM_DEDICATED_VERSION = ['2018', '02', '09',
 								 '16', '00']
 
-	def __init__(self, *args, script_api_version=empty, **kwargs):
+	def __init__(self, *args, script_api_version=empty, auto_batch=False, **kwargs):
+		"""
+		Initiate the client, see :class:`pyplanet.core.gbx.remote.GbxRemote` for the arguments.
+
+		:param script_api_version: Script API version to use.
+		:param auto_batch: Collect the queries that are executed in the same event loop iteration into one multicall.
+		"""
 		super().__init__(*args, **kwargs)
 
+		self.planner = MulticallPlanner(self.MAX_REQUEST_SIZE, loop=self.event_loop)
+		self.auto_batch = auto_batch
+		self._batch = list()
+
 		self.script_api_version = self.SUPPORTED_SCRIPT_API_VERSIONS[len(self.SUPPORTED_SCRIPT_API_VERSIONS)-1]
 		if script_api_version != empty and isinstance(script_api_version, str):
 			self.script_api_version = script_api_version
@@ -33,6 +47,12 @@ class GbxClient(GbxRemote):
 		self.game = self.instance.game
 		self.refresh_task = None
 
+	@classmethod
+	def create_from_settings(cls, instance, conf):
+		client = super().create_from_settings(instance, conf)
+		client.auto_batch = bool(conf.get('AUTO_BATCH', False))
+		return client
+
 	def __call__(self, *args, **kwargs):
 		if len(args) <= 0:
 			return
@@ -65,70 +85,105 @@ class GbxClient(GbxRemote):
 		query = ScriptQuery(self, method, *args, encode_json=encode_json, response_id=response_id)
 		return await query.execute()
 
-	async def multicall(self, *queries):
+	async def multicall(self, *queries, priority=None):
 		"""
 		Run the queries given async. Will use one or more multicall(s), depends on content.
 
 		:param queries: Queries to execute in multicall.
+		:param priority: Outbound priority class of the multicall(s). Determined by the queries if not given.
 		:return: Results in tuple.
 		:rtype: tuple<any>
 		"""
 		if len(queries) == 0:
 			return tuple()
 
-		# If we got a list instead. unpack it.
-		# if len(queries) == 1 and isinstance(queries[0], collections.Iterable):
-		# 	queries = queries[0]
+		# The planner splits the queries into multicalls, limited by the request size and the amount of calls that the
+		# dedicated server can handle with a reasonable response time.
+		stacks = self.planner.plan([q for q in queries if isinstance(q, Query)])
+		multi_results = await asyncio.gather(*[self.execute_multicall(stack, priority=priority) for stack in stacks])
 
-		# We will try to put the maximum possible calls into one multicall, for this we need to calculate the lengths
-		# so we can stay under the maximum allowed package size.
-		current_length = 0
+		results = list()
+		for res in multi_results:
+			for row in res:
+				# Every row is a list with the result, except when we got a fault (struct).
+				if isinstance(row, list):
+					results += row
+				else:
+					results.append(row)
 
-		# Current stack holds the current multicall,
-		# will be rotated once the multicall reaches the maximum request size.
-		current_stack = list()
+		return results
 
-		# We will stack calls into multicalls. Structure of this list:
-		# multicalls = list(   list()   ) = The list contains lists with calls.
-		multicalls = list()
+	async def execute_multicall(self, queries, priority=None):
+		"""
+		Execute the prepared queries in a single multicall. The multicall waits for a free in-flight slot of the planner.
 
-		# Create the multicall(s)
-		for query in queries:
-			if not isinstance(query, Query):
-				continue
+		:param queries: Prepared queries.
+		:param priority: Outbound priority class. Determined by the queries if not given.
+		:return: Raw multicall result, a list with a row per query (list with result or fault struct).
+		:rtype: list
+		"""
+		if priority is None:
+			priority = min(q.priority if q.priority is not None else get_priority(q.method, q.args) for q in queries)
+		await self.scheduler.wait_writable(priority)
+		request_bytes = self.codec.dumps_multicall([q.packet for q in queries])
 
-			query.prepare()
-			if current_length + (query.length + 8) < self.MAX_REQUEST_SIZE:
-				current_stack.append(query)
-				current_length += (query.length + 8)
-			else:
-				multicalls.append(current_stack)
-				current_length = 0
-				current_stack = list()
-
-		# Append the last stack.
-		if len(current_stack) > 0:
-			multicalls.append(current_stack)
-
-		# Create multicall queries.
-		calls = list()
-		for mc in multicalls:
-			calls.append(
-				self.execute('system.multicall', [{'methodName': c.method, 'params': c.args} for c in mc])
-			)
+		await self.planner.acquire()
+		start = self.event_loop.time()
+		try:
+			return await self.execute_encoded(request_bytes, priority=priority)
+		finally:
+			self.planner.release()
+			self.planner.observe(len(queries), len(request_bytes), self.event_loop.time() - start)
 
-		multi_results = await asyncio.gather(*calls)
-		results = list()
-		for res in multi_results:
-			if isinstance(res, list) and len(res) > 0 and isinstance(res[0], list):
-				# When we have a list inside our list, we will unwrap that to our root results. This is mostly the case,
-				# except when we got error messages!
-				for row in res:
-					results += row
-			else:
-				results += res
+	async def batch(self, query):
+		"""
+		Execute the query in the auto batch. All queries that are batched in the same event loop iteration are sent in
+		one multicall.
 
-		return results
+		:param query: Query instance.
+		:return: Result of the query.
+		"""
+		future = self.event_loop.create_future()
+		self._batch.append((query, future))
+		if len(self._batch) == 1:
+			self.event_loop.call_soon(self._flush_batch)
+		return await future
+
+	def _flush_batch(self):
+		batch, self._batch = self._batch, list()
+		if len(batch) == 1:
+			query, future = batch[0]
+			task = self.event_loop.create_task(
+				self.execute(query.method, *query.args, timeout=query.timeout, priority=query.priority)
+			)
+			task.add_done_callback(lambda t: self._resolve_batch(batch, t, single=True))
+		else:
+			task = self.event_loop.create_task(self._execute_batch([query for query, _ in batch]))
+			task.add_done_callback(lambda t: self._resolve_batch(batch, t))
+
+	async def _execute_batch(self, queries):
+		stacks = self.planner.plan(queries)
+		results = await asyncio.gather(*[self.execute_multicall(stack) for stack in stacks])
+		return [row for res in results for row in res]
+
+	@staticmethod
+	def _resolve_batch(batch, task, single=False):
+		exception = task.exception() if not task.cancelled() else asyncio.CancelledError()
+		for idx, (query, future) in enumerate(batch):
+			if future.done():
+				continue
+			if exception:
+				future.set_exception(exception)
+			elif single:
+				future.set_result(task.result())
+			else:
+				row = task.result()[idx]
+				if isinstance(row, dict) and 'faultCode' in row:
+					future.set_exception(Fault(row['faultCode'], row.get('faultString', '')))
+				elif isinstance(row, list) and len(row) == 1:
+					future.set_result(row[0])
+				else:
+					future.set_result(row)
 
 	async def connect(self):
 		await super().connect()
@@ -0,0 +1,208 @@
+"""
+The codec module contains the (de)serializers for the XML-RPC payloads that are transferred over the GBXRemote 2
+protocol. The codec is pluggable, provide your own codec class path in the ``CODEC`` key of the ``DEDICATED`` setting.
+"""
+import importlib
+import re
+
+from xmlrpc.client import Marshaller, dumps, loads
+
+from pyplanet.core.exceptions import ImproperlyConfigured
+
+
+class BaseCodec:
+	"""
+	Base codec, describing the interface of a GBX XML-RPC codec.
+	"""
+
+	def dumps(self, args, method):
+		"""
+		Marshal the method call with the given arguments into the binary request body.
+
+		:param args: Arguments tuple.
+		:param method: Method name.
+		:return: Encoded request body.
+		:rtype: bytes
+		"""
+		raise NotImplementedError()
+
+	def dumps_call(self, args, method):
+		"""
+		Marshal the method call into the value of a ``system.multicall`` entry. The result can be cached and combined
+		with other entries by :meth:`dumps_multicall`.
+
+		:param args: Arguments tuple.
+		:param method: Method name.
+		:return: Encoded multicall entry.
+		:rtype: bytes
+		"""
+		raise NotImplementedError()
+
+	def dumps_multicall(self, calls):
+		"""
+		Combine the encoded multicall entries into the binary request body of a ``system.multicall`` call.
+
+		:param calls: List with encoded entries, see :meth:`dumps_call`.
+		:return: Encoded request body.
+		:rtype: bytes
+		"""
+		raise NotImplementedError()
+
+	def loads(self, body):
+		"""
+		Unmarshal the binary response or callback body. Raises :class:`xmlrpc.client.Fault` when the body contains
+		a fault response.
+
+		:param body: Body as bytes-like object (can be a memoryview that will be released after this call).
+		:return: Tuple with (params, method). Method is None for responses.
+		:rtype: tuple
+		"""
+		raise NotImplementedError()
+
+
+class StdlibCodec(BaseCodec):
+	"""
+	Codec that uses the Python standard library XML-RPC (expat) marshaller.
+	"""
+
+	MULTICALL_HEAD = (
+		b"<?xml version='1.0'?>\n<methodCall>\n<methodName>system.multicall</methodName>\n"
+		b"<params>\n<param>\n<value><array><data>\n"
+	)
+	MULTICALL_TAIL = b"</data></array></value>\n</param>\n</params>\n</methodCall>\n"
+
+	def dumps(self, args, method):
+		return dumps(args, methodname=method, allow_none=True).encode()
+
+	def dumps_call(self, args, method):
+		params = Marshaller(allow_none=True).dumps((dict(methodName=method, params=args),))
+		# Strip the params wrapper, only keep the value.
+		return params[len('<params>\n<param>\n'):-len('</param>\n</params>\n')].encode()
+
+	def dumps_multicall(self, calls):
+		return b''.join([self.MULTICALL_HEAD] + list(calls) + [self.MULTICALL_TAIL])
+
+	def loads(self, body):
+		return loads(body, use_builtin_types=True)
+
+
+class FastCodec(StdlibCodec):
+	"""
+	Codec with a streaming fast-path for method calls that only contain string (or string array) parameters, like the
+	``ManiaPlanet.ModeScriptCallbackArray`` callbacks that make up most of the traffic of a busy server. The body is
+	scanned in place without building an expat parse tree. Everything the fast-path doesn't understand is handed over
+	to the standard library codec.
+	"""
+
+	_HEAD = re.compile(rb'\s*(<\?xml[^>]*\?>)?\s*<methodCall>\s*<methodName>([^<]+)</methodName>\s*<params>\s*')
+	_PARAM_OPEN = re.compile(rb'<param>\s*<value>\s*')
+	_PARAM_CLOSE = re.compile(rb'</param>\s*')
+	_STRING = re.compile(rb'(?:<string>([^<]*)</string>|<string/>)\s*</value>\s*')
+	_ARRAY_OPEN = re.compile(rb'<array>\s*<data>\s*')
+	_ARRAY_VALUE = re.compile(rb'<value>\s*(?:<string>([^<]*)</string>|<string/>)\s*</value>\s*')
+	_ARRAY_CLOSE = re.compile(rb'</data>\s*</array>\s*</value>\s*')
+	_TAIL = re.compile(rb'</params>\s*</methodCall>\s*\Z')
+	_ENTITY = re.compile(r'&(#x[0-9a-fA-F]+|#[0-9]+|lt|gt|amp|quot|apos);')
+	_ENTITIES = dict(lt='<', gt='>', amp='&', quot='"', apos='\'')
+
+	def loads(self, body):
+		result = self.fast_loads(body)
+		if result is not None:
+			return result
+		return super().loads(body)
+
+	def fast_loads(self, body):
+		"""
+		Try to decode the body with the fast-path.
+
+		:param body: Body as bytes-like object.
+		:return: Tuple with (params, method) or None when the body isn't supported by the fast-path.
+		"""
+		match = self._HEAD.match(body)
+		if not match:
+			return None
+		declaration = match.group(1)
+		if declaration and b'encoding' in declaration and not re.search(rb'(?i)encoding=["\']utf-8["\']', declaration):
+			return None
+
+		method = match.group(2).decode()
+		params = list()
+		pos = match.end()
+
+		while True:
+			match = self._PARAM_OPEN.match(body, pos)
+			if not match:
+				break
+			pos = match.end()
+
+			match = self._STRING.match(body, pos)
+			if match:
+				params.append(self._text(match.group(1)))
+				pos = match.end()
+			else:
+				match = self._ARRAY_OPEN.match(body, pos)
+				if not match:
+					return None
+				pos = match.end()
+
+				values = list()
+				while True:
+					match = self._ARRAY_VALUE.match(body, pos)
+					if not match:
+						break
+					values.append(self._text(match.group(1)))
+					pos = match.end()
+
+				match = self._ARRAY_CLOSE.match(body, pos)
+				if not match:
+					return None
+				params.append(values)
+				pos = match.end()
+
+			match = self._PARAM_CLOSE.match(body, pos)
+			if not match:
+				return None
+			pos = match.end()
+
+		if not params or not self._TAIL.match(body, pos):
+			return None
+		return tuple(params), method
+
+	def _text(self, raw):
+		if not raw:
+			return ''
+		# Normalize line endings the same way the XML parser does.
+		if b'\r' in raw:
+			raw = raw.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+		text = raw.decode('utf-8')
+		if '&' in text:
+			text = self._ENTITY.sub(self._replace_entity, text)
+		return text
+
+	@classmethod
+	def _replace_entity(cls, match):
+		name = match.group(1)
+		if name[0] == '#':
+			return chr(int(name[2:], 16) if name[1] in 'xX' else int(name[1:]))
+		return cls._ENTITIES[name]
+
+
+def get_codec(codec=None):
+	"""
+	Get codec instance from the given codec instance, class or class path. Defaults to the :class:`FastCodec`.
+
+	:param codec: Codec instance, class or string with the full class path.
+	:return: Codec instance.
+	:rtype: pyplanet.core.gbx.codec.BaseCodec
+	"""
+	if codec is None:
+		return FastCodec()
+	if isinstance(codec, BaseCodec):
+		return codec
+	if isinstance(codec, str):
+		try:
+			codec_path, _, codec_cls_name = codec.rpartition('.')
+			codec = getattr(importlib.import_module(codec_path), codec_cls_name)
+		except (ImportError, AttributeError, ValueError):
+			raise ImproperlyConfigured('GBX codec \'{}\' could not be found!'.format(codec))
+	return codec()
@@ -0,0 +1,53 @@
+"""
+The JSON decoder is used to decode the payloads of the script callbacks. The fastest available library is used by
+default (``orjson``, ``ujson`` and the Python standard library, in that order). Provide the ``JSON_DECODER`` key in the
+``DEDICATED`` setting to force a decoder, with the library name or the full path of a ``loads`` function.
+"""
+import importlib
+import json
+
+from pyplanet.core.exceptions import ImproperlyConfigured
+
+DECODERS = ['orjson', 'ujson', 'json']
+
+
+def get_json_decoder(decoder=None):
+	"""
+	Get the JSON decode function.
+
+	:param decoder: Library name, path to the loads function or a callable. Defaults to the fastest available library.
+	:return: Function that decodes a JSON string.
+	:rtype: callable
+	"""
+	if callable(decoder):
+		return decoder
+	if decoder is None:
+		for name in DECODERS:
+			try:
+				return _get_library_decoder(name)
+			except ImportError:
+				continue
+	if decoder in DECODERS:
+		try:
+			return _get_library_decoder(decoder)
+		except ImportError:
+			raise ImproperlyConfigured('JSON decoder \'{}\' is not installed!'.format(decoder))
+	try:
+		module_path, _, function_name = decoder.rpartition('.')
+		return getattr(importlib.import_module(module_path), function_name)
+	except (ImportError, AttributeError, ValueError):
+		raise ImproperlyConfigured('JSON decoder \'{}\' could not be found!'.format(decoder))
+
+
+def _get_library_decoder(name):
+	if name == 'json':
+		return json.loads
+	library_loads = importlib.import_module(name).loads
+
+	def loads(data):
+		try:
+			return library_loads(data)
+		except ValueError:
+			# The libraries are more strict than the standard library (NaN for example), retry before giving up.
+			return json.loads(data)
+	return loads
@@ -0,0 +1,146 @@
+"""
+The multicall planner splits the prepared queries into ``system.multicall`` requests. The limits (bytes and calls per
+multicall) adapt to the observed response latency of the dedicated server, and the amount of multicalls that are
+waiting for a response at the same time is capped.
+"""
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class MulticallPlanner:
+	"""
+	Adaptive multicall planner.
+
+	The limits follow an additive increase, multiplicative decrease strategy: when a multicall is answered faster than
+	the target latency the limits grow, when it takes longer than the target the limits are halved (within the bounds).
+	"""
+
+	TARGET_LATENCY = 0.25
+	MAX_IN_FLIGHT = 4
+	MIN_CALLS = 10
+	MAX_CALLS = 2000
+	MIN_BYTES = 64 * 1024  # 64KB
+	CALL_OVERHEAD = 8
+
+	def __init__(self, max_request_size, loop=None, max_in_flight=None, target_latency=None):
+		"""
+		Initiate the planner.
+
+		:param max_request_size: Maximum size of a single request (hard limit of the dedicated server).
+		:param loop: Event loop.
+		:param max_in_flight: Maximum amount of multicalls waiting for a response.
+		:param target_latency: Target response latency in seconds.
+		"""
+		self.loop = loop or asyncio.get_event_loop()
+		self.max_request_size = max_request_size
+		self.max_in_flight = max_in_flight or self.MAX_IN_FLIGHT
+		self.target_latency = target_latency or self.TARGET_LATENCY
+
+		self.max_calls = self.MAX_CALLS
+		self.max_bytes = max_request_size
+		self.latency = None
+
+		self.in_flight = 0
+		self._slot_waiters = list()
+
+		self.metrics = dict(multicalls=0, calls=0, bytes=0, latency_max=0.0, slot_waits=0, shrinks=0)
+
+	def plan(self, queries):
+		"""
+		Split the queries into the stacks of the multicalls. The queries will be prepared (marshalled) if they are not
+		prepared yet.
+
+		:param queries: Query instances.
+		:return: List with lists of queries.
+		"""
+		stacks = list()
+		current_stack = list()
+		current_length = 0
+
+		for query in queries:
+			query.prepare()
+			length = query.length + self.CALL_OVERHEAD
+			if current_stack and (
+				current_length + length >= self.max_bytes or len(current_stack) >= self.max_calls
+			):
+				stacks.append(current_stack)
+				current_stack = list()
+				current_length = 0
+
+			current_stack.append(query)
+			current_length += length
+
+		if current_stack:
+			stacks.append(current_stack)
+		return stacks
+
+	async def acquire(self):
+		"""
+		Wait for a free in-flight slot.
+		"""
+		if self.in_flight >= self.max_in_flight:
+			self.metrics['slot_waits'] += 1
+		while self.in_flight >= self.max_in_flight:
+			waiter = self.loop.create_future()
+			self._slot_waiters.append(waiter)
+			try:
+				await waiter
+			except asyncio.CancelledError:
+				if waiter in self._slot_waiters:
+					self._slot_waiters.remove(waiter)
+				raise
+		self.in_flight += 1
+
+	def release(self):
+		"""
+		Release the in-flight slot and wake up the next waiter.
+		"""
+		self.in_flight -= 1
+		while self._slot_waiters:
+			waiter = self._slot_waiters.pop(0)
+			if not waiter.done():
+				waiter.set_result(None)
+				break
+
+	def observe(self, calls, size, latency):
+		"""
+		Observe the response latency of a multicall and adapt the limits.
+
+		:param calls: Amount of calls in the multicall.
+		:param size: Size of the request in bytes.
+		:param latency: Response latency in seconds.
+		"""
+		self.metrics['multicalls'] += 1
+		self.metrics['calls'] += calls
+		self.metrics['bytes'] += size
+		self.metrics['latency_max'] = max(self.metrics['latency_max'], latency)
+		self.latency = latency if self.latency is None else self.latency * 0.8 + latency * 0.2
+
+		if latency > self.target_latency and (calls > self.MIN_CALLS or size > self.MIN_BYTES):
+			# Only shrink when this multicall was actually limited by the current limits.
+			if calls >= self.max_calls // 2 or size >= self.max_bytes // 2:
+				self.max_calls = max(self.MIN_CALLS, min(self.max_calls, calls) // 2)
+				self.max_bytes = max(self.MIN_BYTES, min(self.max_bytes, size) // 2)
+				self.metrics['shrinks'] += 1
+				logger.debug('GBX: Multicall took {:.3f}s, limits lowered to {} calls, {} bytes.'.format(
+					latency, self.max_calls, self.max_bytes
+				))
+		elif latency < self.target_latency / 2 and self.latency < self.target_latency:
+			self.max_calls = min(self.MAX_CALLS, self.max_calls + self.MIN_CALLS)
+			self.max_bytes = min(self.max_request_size, self.max_bytes + self.MIN_BYTES)
+
+	def stats(self):
+		"""
+		Get the metrics and current limits of the planner.
+
+		:rtype: dict
+		"""
+		return dict(
+			max_calls=self.max_calls,
+			max_bytes=self.max_bytes,
+			in_flight=self.in_flight,
+			latency=self.latency or 0.0,
+			**self.metrics
+		)
@@ -0,0 +1,146 @@
+"""
+The GBXRemote 2 framing protocol, implemented on top of the asyncio transports.
+"""
+import asyncio
+import logging
+import struct
+
+from pyplanet.core.exceptions import TransportException
+
+logger = logging.getLogger(__name__)
+
+
+class GbxProtocol(asyncio.Protocol):
+	"""
+	The protocol buffers the incoming bytes in a single growing ``bytearray`` and slices complete frames out of it with
+	``memoryview`` objects, so the frame bodies are handed to the decoder without intermediate copies.
+
+	The frame handler is called synchronously with the handler number and a memoryview of the body. The view is released
+	right after the handler returns, so the handler should never keep a reference to it!
+
+	The flow control of the transport is exposed with the ``writing_paused`` flag and the ``resume_handler`` callable
+	that is called once the transport accepts writes again.
+	"""
+
+	HEADER = struct.Struct('<LL')
+
+	def __init__(self, frame_handler, loop=None):
+		"""
+		Initiate the protocol.
+
+		:param frame_handler: Callable that gets (handle_nr, body) for every complete frame.
+		:param loop: Event loop.
+		"""
+		self.frame_handler = frame_handler
+		self.loop = loop or asyncio.get_event_loop()
+
+		self.transport = None
+		self.buffer = bytearray()
+
+		self.writing_paused = False
+		self.resume_handler = None
+
+		self.handshake = self.loop.create_future()
+		self.closed = self.loop.create_future()
+
+	def connection_made(self, transport):
+		self.transport = transport
+
+	def connection_lost(self, exc):
+		if not self.handshake.done():
+			self.handshake.set_exception(exc or ConnectionResetError('Connection closed during handshake!'))
+		if not self.closed.done():
+			self.closed.set_result(exc)
+		self.transport = None
+
+	def pause_writing(self):
+		self.writing_paused = True
+
+	def resume_writing(self):
+		self.writing_paused = False
+		if self.resume_handler:
+			self.resume_handler()
+
+	def eof_received(self):
+		# Let the transport close itself, this will call connection_lost.
+		return False
+
+	def data_received(self, data):
+		self.buffer.extend(data)
+
+		if not self.handshake.done():
+			if not self.parse_handshake():
+				return
+
+		offset = 0
+		length = len(self.buffer)
+		with memoryview(self.buffer) as view:
+			while length - offset >= 8:
+				size, handle = self.HEADER.unpack_from(view, offset)
+				end = offset + 8 + size
+				if end > length:
+					break
+
+				body = view[offset + 8:end]
+				try:
+					self.frame_handler(handle, body)
+				except Exception as e:
+					logger.exception(e)
+				finally:
+					body.release()
+				offset = end
+
+		if offset:
+			self.compact(offset)
+
+	def parse_handshake(self):
+		"""
+		Parse the protocol handshake (size + protocol name) from the buffer.
+
+		:return: Boolean if the handshake has been completed.
+		"""
+		if len(self.buffer) < 4:
+			return False
+		size, = struct.unpack_from('<L', self.buffer)
+		if len(self.buffer) < 4 + size:
+			return False
+
+		header = bytes(self.buffer[4:4 + size])
+		self.compact(4 + size)
+
+		try:
+			header = header.decode()
+		except UnicodeDecodeError:
+			header = None
+		if header != 'GBXRemote 2':
+			self.handshake.set_exception(TransportException('Server is not a valid GBXRemote 2 server.'))
+			return False
+
+		self.handshake.set_result(header)
+		return True
+
+	def compact(self, offset):
+		"""
+		Remove the consumed bytes from the buffer.
+
+		:param offset: Number of bytes consumed.
+		"""
+		try:
+			del self.buffer[:offset]
+		except BufferError:
+			# A handler kept a reference to a frame view, we can't resize in place.
+			self.buffer = self.buffer[offset:]
+
+	def write(self, data):
+		"""
+		Write data to the transport.
+
+		:param data: Bytes.
+		"""
+		if not self.transport:
+			raise TransportException('Connection with the dedicated server is not available!')
+		self.transport.write(data)
+
+	def close(self):
+		if self.transport:
+			self.transport.close()
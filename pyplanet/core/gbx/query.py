@@ -1,13 +1,12 @@
 import asyncio
 import json
 import uuid
-from xmlrpc.client import dumps
 
 from pyplanet.core.exceptions import TransportException
 
 
 class Query:
-	def __init__(self, client, method, *args, timeout=45, **kwargs):
+	def __init__(self, client, method, *args, timeout=45, priority=None, **kwargs):
 		"""
 		Initiate the prepared query.
 
@@ -15,6 +14,7 @@ class Query:
 		:param method: Method name
 		:param args: Arguments
 		:param timeout: Timeout of the call.
+		:param priority: Outbound priority class, determined by the method if not given.
 		:type client: pyplanet.core.gbx.client.GbxClient
 		:type method: str:
 		"""
@@ -26,6 +26,7 @@ class Query:
 		self.method = method
 		self.args = args
 		self.timeout = timeout
+		self.priority = priority
 		self.result = None
 
 	async def execute(self):
@@ -35,7 +36,9 @@ class Query:
 		:return: Future with results.
 		:rtype: Future<any>
 		"""
-		return await self._client.execute(self.method, *self.args, timeout=self.timeout)
+		if getattr(self._client, 'auto_batch', False) and not self.method.startswith('system.'):
+			return await self._client.batch(self)
+		return await self._client.execute(self.method, *self.args, timeout=self.timeout, priority=self.priority)
 
 	def __await__(self):
 		"""
@@ -45,9 +48,12 @@ class Query:
 
 	def prepare(self):
 		"""
-		Prepare the query, marshall the payload, create binary data and calculate length (size).
+		Prepare the query, marshall the payload (as multicall entry), create binary data and calculate length (size).
+		The payload is cached, a query that is prepared again won't be marshalled twice.
 		"""
-		self.packet = dumps(self.args, methodname=self.method, allow_none=True).encode()
+		if self.packet is not None:
+			return
+		self.packet = self._client.codec.dumps_call(self.args, self.method)
 		self.length = len(self.packet)
 
 		if (self.length + 8) > self._client.MAX_REQUEST_SIZE:
@@ -63,7 +69,7 @@ class Query:
 
 class ScriptQuery(Query):
 
-	def __init__(self, client, method, *args, timeout=15, encode_json=True, response_id=True):
+	def __init__(self, client, method, *args, timeout=15, encode_json=True, response_id=True, priority=None):
 		"""
 		Initiate a Scripted Query.
 
@@ -73,6 +79,7 @@ class ScriptQuery(Query):
 		:param timeout: Timeout to wait for future result.
 		:param encode_json: Is body json? True by default.
 		:param response_id: Is request requiring response_id?
+		:param priority: Outbound priority class, determined by the method if not given.
 		:type client: pyplanet.core.gbx.client.GbxClient
 		"""
 		# Make sure we call the script stuff with TriggerModeScriptEventArray.
@@ -95,7 +102,7 @@ class ScriptQuery(Query):
 		if self.response_id:
 			gbx_args.append(str(self.response_id))
 
-		super().__init__(client, gbx_method, method, gbx_args, timeout=timeout)
+		super().__init__(client, gbx_method, method, gbx_args, timeout=timeout, priority=priority)
 
 	async def execute(self):
 		"""
@@ -110,7 +117,7 @@ class ScriptQuery(Query):
 			self._client.script_handlers[self.response_id] = future = asyncio.Future()
 
 		# Execute the call itself and register the callback script handler.
-		gbx_res = await self._client.execute(self.method, *self.args)
+		gbx_res = await self._client.execute(self.method, *self.args, priority=self.priority)
 
 		if self.response_id:
 			return await asyncio.wait_for(future, self.timeout)  # Timeout after 15 seconds!
@@ -0,0 +1,94 @@
+"""
+The recorder captures the raw GBX frames of the connection with the dedicated server to a compact (gzipped) file. The
+recording contains the callbacks, the requests and the responses, so it can be replayed against the fake server of
+:mod:`pyplanet.core.gbx.replay`.
+
+The file starts with a magic header, followed by the frames. Every frame has a header with the kind, the seconds since
+the start of the recording, the handler number and the size of the body, followed by the raw body.
+"""
+import collections
+import gzip
+import struct
+import time
+
+MAGIC = b'PYPLREC1'
+
+KIND_CALLBACK = 0
+KIND_REQUEST = 1
+KIND_RESPONSE = 2
+
+FRAME_HEADER = struct.Struct('<BdLL')
+
+Frame = collections.namedtuple('Frame', ['kind', 'time', 'handle', 'body'])
+
+
+class Recorder:
+	"""
+	Recorder of the GBX frames, see :meth:`pyplanet.core.gbx.remote.GbxRemote.start_recording`.
+	"""
+
+	def __init__(self, path, compress_level=6):
+		"""
+		Initiate the recorder.
+
+		:param path: Path of the recording file.
+		:param compress_level: Gzip compression level.
+		"""
+		self.path = path
+		self.compress_level = compress_level
+
+		self.file = None
+		self.start = None
+		self.frames = 0
+		self.bytes = 0
+
+	def open(self):
+		self.file = gzip.open(self.path, 'wb', compresslevel=self.compress_level)
+		self.file.write(MAGIC)
+		self.start = time.monotonic()
+		return self
+
+	def record(self, kind, handle, body, seconds=None):
+		"""
+		Record a single frame.
+
+		:param kind: Kind of the frame, ``KIND_CALLBACK``, ``KIND_REQUEST`` or ``KIND_RESPONSE``.
+		:param handle: Handler number.
+		:param body: Raw body (bytes or memoryview).
+		:param seconds: Seconds since the start of the recording, now by default. Used to create synthetic recordings.
+		"""
+		if self.file is None:
+			return
+		if seconds is None:
+			seconds = time.monotonic() - self.start
+		self.file.write(FRAME_HEADER.pack(kind, seconds, handle, len(body)))
+		self.file.write(body)
+		self.frames += 1
+		self.bytes += len(body)
+
+	def close(self):
+		if self.file is not None:
+			self.file.close()
+			self.file = None
+
+
+def read_recording(path):
+	"""
+	Read the frames of a recording.
+
+	:param path: Path of the recording file.
+	:return: Generator with the frames.
+	"""
+	with gzip.open(path, 'rb') as recording:
+		if recording.read(len(MAGIC)) != MAGIC:
+			raise ValueError('File \'{}\' is not a PyPlanet GBX recording!'.format(path))
+		while True:
+			header = recording.read(FRAME_HEADER.size)
+			if len(header) < FRAME_HEADER.size:
+				break
+			kind, seconds, handle, size = FRAME_HEADER.unpack(header)
+			body = recording.read(size)
+			if len(body) < size:
+				# Truncated recording (the controller has been killed while recording).
+				break
+			yield Frame(kind, seconds, handle, body)
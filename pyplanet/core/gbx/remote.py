@@ -2,15 +2,18 @@
 GBXRemote 2 client for python 3.5+ part of PyPlanet.
 """
 import asyncio
-import json
 import logging
-import struct
 
-from xmlrpc.client import dumps, loads, Fault
+from xmlrpc.client import Fault
 from xml.parsers.expat import ExpatError
 
 from pyplanet.core.exceptions import TransportException
 from pyplanet.core.events.manager import SignalManager
+from pyplanet.core.gbx.codec import get_codec
+from pyplanet.core.gbx.decoder import get_json_decoder
+from pyplanet.core.gbx.protocol import GbxProtocol
+from pyplanet.core.gbx.recorder import Recorder, KIND_CALLBACK, KIND_REQUEST, KIND_RESPONSE
+from pyplanet.core.gbx.scheduler import OutboundScheduler, get_priority
 from pyplanet.utils.log import handle_exception
 
 logger = logging.getLogger(__name__)
@@ -23,7 +26,10 @@ class GbxRemote:
 	MAX_REQUEST_SIZE  = 2000000  # 2MB
 	MAX_RESPONSE_SIZE = 4000000  # 4MB
 
-	def __init__(self, host, port, event_pool=None, user=None, password=None, api_version='2013-04-16', instance=None):
+	def __init__(
+		self, host, port, event_pool=None, user=None, password=None, api_version='2013-04-16', instance=None, codec=None,
+		json_decoder=None
+	):
 		"""
 		Initiate the GbxRemote client.
 
@@ -35,6 +41,9 @@ class GbxRemote:
 		:param api_version: API Version to use. In most cases you won't override the default because version changes
 							should be abstracted by the other core components.
 		:param instance: Instance of the app.
+		:param codec: Codec instance, class or class path to (de)serialize the XML-RPC payloads. Defaults to the
+					  :class:`pyplanet.core.gbx.codec.FastCodec`.
+		:param json_decoder: JSON decoder for the script callbacks, see :func:`pyplanet.core.gbx.decoder.get_json_decoder`.
 		:type host: str
 		:type port: str int
 		:type event_pool: asyncio.BaseEventPool
@@ -49,6 +58,8 @@ class GbxRemote:
 		self.password = password
 		self.api_version = api_version
 		self.instance = instance
+		self.codec = get_codec(codec)
+		self.json_loads = get_json_decoder(json_decoder)
 
 		self.dedicated_version = None
 		self.dedicated_build = None
@@ -56,14 +67,27 @@ class GbxRemote:
 		self.event_loop = event_pool or asyncio.get_event_loop()
 		self.gbx_methods = list()
 
+		# Amount of callbacks received from the dedicated server, reported in the heartbeats to the god process.
+		self.callbacks_received = 0
+
+		# Amount of payload tasks that are scheduled (and not done yet), and the peak amount, for the diagnostics.
+		self.payloads_pending = 0
+		self.payloads_pending_peak = 0
+
+		# Recorder of the frames, see start_recording. The recording starts at connect when the record file is given.
+		self.record_file = None
+		self.recorder = None
+
 		self.handlers = dict()
 		self.handler_nr = 0x80000000
 
 		self.script_handlers = dict()
 
-		self.reader = None
-		self.writer = None
+		self.protocol = None
+		self.transport = None
+		self.scheduler = OutboundScheduler(loop=self.event_loop)
 		self.loop_task = None
+		self._closing = False
 
 	@classmethod
 	def create_from_settings(cls, instance, conf):
@@ -76,10 +100,13 @@ class GbxRemote:
 		:return: Instance of XML-RPC GbxClient.
 		:rtype: pyplanet.core.gbx.client.GbxClient
 		"""
-		return cls(
+		remote = cls(
 			instance=instance,
-			host=conf['HOST'], port=conf['PORT'], user=conf['USER'], password=conf['PASSWORD']
+			host=conf['HOST'], port=conf['PORT'], user=conf['USER'], password=conf['PASSWORD'], codec=conf.get('CODEC', None),
+			json_decoder=conf.get('JSON_DECODER', None),
 		)
+		remote.record_file = conf.get('RECORD_FILE', None)
+		return remote
 
 	def get_next_handler(self):
 		handler = self.handler_nr
@@ -102,10 +129,10 @@ class GbxRemote:
 		max_retries = 10
 		while True:
 			try:
-				self.reader, self.writer = await asyncio.open_connection(
+				self.transport, self.protocol = await self.event_loop.create_connection(
+					lambda: GbxProtocol(self.handle_frame, loop=self.event_loop),
 					host=self.host,
 					port=self.port,
-					loop=self.event_loop,
 				)
 				break
 			except Exception as exc:
@@ -120,9 +147,13 @@ class GbxRemote:
 				))
 				await asyncio.sleep(2)
 
-		_, header = struct.unpack_from('<L11s', await self.reader.readexactly(15))
-		if header.decode() != 'GBXRemote 2':
-			raise TransportException('Server is not a valid GBXRemote 2 server.')
+		try:
+			await self.protocol.handshake
+		except Exception:
+			self.protocol.close()
+			raise
+		self._closing = False
+		self.scheduler.attach(self.protocol)
 		logger.debug('Dedicated connection established!')
 
 		# From now we need to start listening.
@@ -165,20 +196,45 @@ class GbxRemote:
 
 		logger.debug('Dedicated authenticated, API version set and callbacks enabled!')
 
+		# Only start recording after the authentication, the recording should never contain the credentials.
+		if self.record_file and not self.recorder:
+			self.start_recording(self.record_file)
+
 	async def disconnect(self):
 		"""
 		Stop the task of listening, destroy connections, reader and writer.
 		"""
+		self._closing = True
 		if self.loop_task:
 			self.loop_task.cancel()
-			del self.loop_task
-		if self.reader:
-			del self.reader
-		if self.writer:
-			self.writer.close()
-			del self.writer
-
-	async def execute(self, method, *args, timeout=45.0):
+			self.loop_task = None
+		self.scheduler.detach()
+		self.stop_recording()
+		if self.protocol:
+			self.protocol.close()
+			self.protocol = None
+			self.transport = None
+
+	def start_recording(self, path):
+		"""
+		Start recording the frames (callbacks, requests and responses) to the file, see
+		:mod:`pyplanet.core.gbx.recorder`.
+
+		:param path: Path of the recording file.
+		"""
+		self.stop_recording()
+		self.recorder = Recorder(path).open()
+		logger.info('Recording the GBX frames to \'{}\'.'.format(path))
+
+	def stop_recording(self):
+		if self.recorder:
+			self.recorder.close()
+			logger.info('Recorded {} GBX frames ({} bytes) to \'{}\'.'.format(
+				self.recorder.frames, self.recorder.bytes, self.recorder.path
+			))
+			self.recorder = None
+
+	async def execute(self, method, *args, timeout=45.0, priority=None):
 		"""
 		Query the dedicated server and return the results. This method is a coroutine and should be awaited on.
 		The result you get will be a tuple with data inside (the response payload).
@@ -186,12 +242,28 @@ class GbxRemote:
 		:param method: Server method.
 		:param args: Arguments.
 		:param timeout: Wait for x seconds until future is returned. Default is 45 seconds.
+		:param priority: Outbound priority class, see :mod:`pyplanet.core.gbx.scheduler`. Determined by the method
+						 when not given.
 		:type method: str
 		:type args: any
+		:type priority: int
 		:return: Tuple with response data (after awaiting).
 		:rtype: Future<tuple>
 		"""
-		request_bytes = dumps(args, methodname=method, allow_none=True).encode()
+		if priority is None:
+			priority = get_priority(method, args)
+		await self.scheduler.wait_writable(priority)
+		return await self.execute_encoded(self.codec.dumps(args, method), priority=priority, timeout=timeout)
+
+	async def execute_encoded(self, request_bytes, priority, timeout=45.0):
+		"""
+		Send the already encoded request body to the dedicated server and return the results.
+
+		:param request_bytes: Encoded request body.
+		:param priority: Outbound priority class.
+		:param timeout: Wait for x seconds until future is returned. Default is 45 seconds.
+		:return: Response data (after awaiting).
+		"""
 		length_bytes = len(request_bytes).to_bytes(4, byteorder='little')
 		handler = self.get_next_handler()
 
@@ -200,35 +272,24 @@ class GbxRemote:
 		# Create new future to be returned.
 		self.handlers[handler] = future = asyncio.Future()
 
-		# Send to server.
-		self.writer.write(length_bytes + handler_bytes + request_bytes)
+		if self.recorder:
+			self.recorder.record(KIND_REQUEST, handler, request_bytes)
+
+		# Queue for sending to the server.
+		self.scheduler.enqueue(length_bytes + handler_bytes + request_bytes, priority)
 
 		return await asyncio.wait_for(future, timeout)
 
 	async def listen(self):
 		"""
-		Listen to socket.
+		Listen to socket. The frames are read and decoded by the protocol, this coroutine will wait until the connection
+		with the dedicated server has been closed.
 		"""
 		try:
-			while True:
-				head = await self.reader.readexactly(8)
-				size, handle = struct.unpack_from('<LL', head)
-				body = await self.reader.readexactly(size)
-				data = method = fault = None
-
-				try:
-					data, method = loads(body, use_builtin_types=True)
-				except Fault as e:
-					fault = e
-				except ExpatError as e:
-					# See #121 for this solution.
-					handle_exception(exception=e, module_name=__name__, func_name='listen', extra_data={'body': body})
-					continue
-
-				if data and len(data) == 1:
-					data = data[0]
-
-				self.event_loop.create_task(self.handle_payload(handle, method, data, fault))
+			exc = await asyncio.shield(self.protocol.closed)
+			if self._closing:
+				return
+			raise exc or ConnectionResetError('Connection closed by the dedicated server.')
 		except ConnectionResetError as e:
 			logger.critical(
 				'Connection with the dedicated server has been closed, we will now close down the subprocess! {}'.format(str(e))
@@ -240,6 +301,39 @@ class GbxRemote:
 			handle_exception(exception=e, module_name=__name__, func_name='listen')
 			raise
 
+	def handle_frame(self, handle, body):
+		"""
+		Decode a frame received by the protocol and schedule the handling of the payload.
+
+		:param handle: Handler number.
+		:param body: Memoryview of the frame body, only valid during this call.
+		"""
+		data = method = fault = None
+
+		if self.recorder:
+			self.recorder.record(KIND_RESPONSE if handle & 0x80000000 else KIND_CALLBACK, handle, body)
+
+		try:
+			data, method = self.codec.loads(body)
+		except Fault as e:
+			fault = e
+		except ExpatError as e:
+			# See #121 for this solution.
+			handle_exception(exception=e, module_name=__name__, func_name='listen', extra_data={'body': bytes(body)})
+			return
+
+		if data and len(data) == 1:
+			data = data[0]
+
+		task = self.event_loop.create_task(self.handle_payload(handle, method, data, fault))
+		task.add_done_callback(self._payload_done)
+		self.payloads_pending += 1
+		if self.payloads_pending > self.payloads_pending_peak:
+			self.payloads_pending_peak = self.payloads_pending
+
+	def _payload_done(self, task):
+		self.payloads_pending -= 1
+
 	async def handle_payload(self, handle_nr, method=None, data=None, fault=None):
 		"""
 		Handle a callback/response payload or fault.
@@ -252,6 +346,7 @@ class GbxRemote:
 		if handle_nr in self.handlers:
 			await self.handle_response(handle_nr, method, data, fault)
 		elif method and data is not None:
+			self.callbacks_received += 1
 			if method == 'ManiaPlanet.ModeScriptCallbackArray':
 				await self.handle_scripted(handle_nr, method, data)
 			elif method == 'ManiaPlanet.ModeScriptCallback':
@@ -281,6 +376,20 @@ class GbxRemote:
 		if signal:
 			await signal.send_robust(data)
 
+	def is_script_response(self, raw):
+		"""
+		Check if the raw (undecoded) script callback could be the response of one of the pending scripted calls.
+
+		:param raw: Raw payload, string or list of strings.
+		:return: Boolean
+		"""
+		if not self.script_handlers:
+			return False
+		parts = raw if isinstance(raw, list) else [raw]
+		return any(
+			isinstance(part, str) and response_id in part for part in parts for response_id in self.script_handlers.keys()
+		)
+
 	async def handle_scripted(self, handle_nr, method, data):
 		# Unpack first.
 		method, raw = data
@@ -297,17 +406,22 @@ class GbxRemote:
 		except:
 			pass
 
+		# Only decode the payload when there is a receiver for the callback or when it could be a scripted response.
+		signal = SignalManager.get_callback('Script.{}'.format(method))
+		if not (signal and signal.has_listeners()) and not self.is_script_response(raw):
+			return
+
 		# Try to parse JSON, mostly the case.
 		try:
 			if isinstance(raw, list):
 				payload = dict()
 				for idx, part in enumerate(raw):
 					try:
-						payload.update(json.loads(part))
+						payload.update(self.json_loads(part))
 					except:
 						payload['raw_{}'.format(idx)] = part
 			else:
-				payload = json.loads(raw)
+				payload = self.json_loads(raw)
 		except Exception as e:
 			payload = raw
 
@@ -329,6 +443,5 @@ class GbxRemote:
 		# If not, we should just throw it as an ordinary callback.
 		logger.debug('GBX: Received scripted callback: {}: {}'.format(method, payload))
 
-		signal = SignalManager.get_callback('Script.{}'.format(method))
 		if signal:
 			await signal.send_robust(payload)
@@ -0,0 +1,454 @@
+"""
+Replay a GBX recording (see :mod:`pyplanet.core.gbx.recorder`) against a fake dedicated server, to reproduce the load
+of a real server offline and benchmark the controller (and apps) with it.
+
+The :class:`FakeServer` speaks the GBXRemote 2 protocol and answers the queries of the client with the responses from
+the recording. The :class:`ReplayHarness` replays the recorded callbacks through the fake server and measures the
+handling of the callbacks.
+"""
+import asyncio
+import collections
+import json
+import logging
+import math
+import struct
+import time
+import tracemalloc
+
+from xmlrpc.client import Fault, dumps, loads
+
+from pyplanet.core.gbx.recorder import KIND_CALLBACK, KIND_REQUEST, KIND_RESPONSE
+
+logger = logging.getLogger(__name__)
+
+SCRIPT_CALLBACKS = ('ManiaPlanet.ModeScriptCallbackArray', 'ManiaPlanet.ModeScriptCallback')
+
+
+class FakeServer:
+	"""
+	Fake dedicated server. The queries are answered with the recorded response of the same method with the same
+	parameters, the last recorded response of the method, a default response or ``True`` (in that order).
+
+	Scripted queries (``TriggerModeScriptEventArray`` with a response id) are answered with the recorded script response
+	callback, with the new response id.
+	"""
+	HEADER = struct.Struct('<LL')
+
+	# Responses to the queries of the connection and initialization of the client, used when they are not recorded.
+	DEFAULT_RESPONSES = {
+		'Authenticate': True,
+		'SetApiVersion': True,
+		'EnableCallbacks': True,
+		'SetModeScriptSettings': True,
+		'TriggerModeScriptEventArray': True,
+		'system.listMethods': [],
+		'GetVersion': dict(
+			Name='ManiaPlanet', TitleId='TMStadium@nadeo', Version='3.3.0', Build='2019-10-23_20_00', ApiVersion='2013-04-16'
+		),
+		'GetSystemInfo': dict(
+			IsDedicated=True, IsServer=True, PublishedIp='127.0.0.1', Port=2350, P2PPort=3450, TitleId='TMStadium@nadeo',
+			ServerLogin='fake', ServerPlayerId=0, ConnectionDownloadRate=102400, ConnectionUploadRate=102400,
+		),
+		'GetGameMode': 0,
+		'GetModeScriptSettings': dict(),
+		'GameDataDirectory': '/tmp/UserData/',
+		'GetMapsDirectory': '/tmp/UserData/Maps/',
+		'GetSkinsDirectory': '/tmp/UserData/Skins/',
+		'GetCurrentMapInfo': dict(Environnement='Stadium'),
+		'GetServerPassword': '',
+		'GetServerPasswordForSpectator': '',
+		'GetMaxPlayers': dict(CurrentValue=100, NextValue=100),
+		'GetMaxSpectators': dict(CurrentValue=32, NextValue=32),
+		'GetHideServer': 0,
+		'GetLadderServerLimits': dict(LadderServerLimitMin=0, LadderServerLimitMax=50000),
+		'GetDetailedPlayerInfo': dict(Login='fake', NickName='Fake server', Language='en', Path='World'),
+		'GetPlayerList': [],
+		'GetMapList': [],
+	}
+
+	def __init__(self, frames=None):
+		"""
+		Initiate the fake server.
+
+		:param frames: Frames of the recording, to answer the queries and to replay the callbacks.
+		"""
+		self.responses = dict()
+		self.last_responses = dict()
+		self.script_responses = dict()
+		self.callbacks = list()
+
+		self.requests = collections.Counter()
+		self.request_bytes = collections.Counter()
+		self.bytes_received = 0
+		self.bytes_sent = 0
+		self.unanswered = collections.Counter()
+
+		self.host = None
+		self.port = None
+		self.server = None
+		self.writer = None
+		self.connected = None
+
+		if frames:
+			self.load(frames)
+
+	def load(self, frames):
+		"""
+		Index the responses and collect the callbacks of the recording.
+
+		:param frames: Frames of the recording.
+		"""
+		pending = dict()
+		response_ids = dict()
+		for frame in frames:
+			if frame.kind == KIND_REQUEST:
+				params, method = loads(frame.body, use_builtin_types=True)
+				pending[frame.handle] = (method, params)
+				if method == 'TriggerModeScriptEventArray' and len(params) > 1 and params[1]:
+					response_ids[params[1][-1]] = params[0]
+
+			elif frame.kind == KIND_RESPONSE and frame.handle in pending:
+				method, params = pending.pop(frame.handle)
+				try:
+					value = loads(frame.body, use_builtin_types=True)[0][0]
+				except Fault as fault:
+					value = fault
+
+				if method == 'system.multicall' and isinstance(value, list):
+					for call, result in zip(params[0], value):
+						if isinstance(result, dict) and 'faultCode' in result:
+							result = Fault(result['faultCode'], result['faultString'])
+						elif isinstance(result, list) and result:
+							result = result[0]
+						self.set_response(call['methodName'], call['params'], result)
+				else:
+					self.set_response(method, params, value)
+
+			elif frame.kind == KIND_CALLBACK:
+				if b'responseid' in frame.body:
+					params, method = loads(frame.body, use_builtin_types=True)
+					response_id = self.get_response_id(method, params)
+					if response_id in response_ids:
+						self.script_responses[response_ids[response_id]] = (method, params, response_id)
+						continue
+				self.callbacks.append(frame)
+
+	def set_response(self, method, params, value):
+		self.responses[(method, repr(params))] = value
+		self.last_responses[method] = value
+
+	@staticmethod
+	def get_response_id(method, params):
+		if method not in SCRIPT_CALLBACKS or len(params) < 2:
+			return None
+		parts = params[1] if isinstance(params[1], list) else [params[1]]
+		for part in parts:
+			try:
+				payload = json.loads(part)
+			except (TypeError, ValueError):
+				continue
+			if isinstance(payload, dict) and payload.get('responseid'):
+				return payload['responseid']
+		return None
+
+	def answer(self, method, params):
+		"""
+		Get the answer to the query.
+
+		:param method: Method.
+		:param params: Parameters.
+		:return: Value or Fault.
+		"""
+		key = (method, repr(params))
+		if key in self.responses:
+			return self.responses[key]
+		if method in self.last_responses:
+			return self.last_responses[method]
+		if method in self.DEFAULT_RESPONSES:
+			return self.DEFAULT_RESPONSES[method]
+		self.unanswered[method] += 1
+		return True
+
+	async def start(self, host='127.0.0.1', port=0):
+		"""
+		Start listening.
+
+		:param host: Host.
+		:param port: Port, 0 for a free port.
+		"""
+		self.connected = asyncio.Event()
+		self.server = await asyncio.start_server(self.handle_connection, host, port)
+		self.host, self.port = self.server.sockets[0].getsockname()[:2]
+		return self
+
+	async def close(self):
+		if self.writer:
+			self.writer.close()
+			self.writer = None
+		if self.server:
+			self.server.close()
+			await self.server.wait_closed()
+			self.server = None
+
+	async def handle_connection(self, reader, writer):
+		self.writer = writer
+		handshake = b'GBXRemote 2'
+		writer.write(struct.pack('<L', len(handshake)) + handshake)
+		self.connected.set()
+
+		try:
+			while True:
+				header = await reader.readexactly(8)
+				size, handle = self.HEADER.unpack(header)
+				body = await reader.readexactly(size)
+				self.handle_request(handle, body)
+		except (asyncio.IncompleteReadError, ConnectionError):
+			pass
+
+	def handle_request(self, handle, body):
+		self.bytes_received += 8 + len(body)
+		params, method = loads(body, use_builtin_types=True)
+		self.requests[method] += 1
+		self.request_bytes[method] += len(body)
+
+		if method == 'system.multicall':
+			results = list()
+			for call in params[0]:
+				self.requests[call['methodName']] += 1
+				value = self.answer(call['methodName'], call['params'])
+				if isinstance(value, Fault):
+					results.append(dict(faultCode=value.faultCode, faultString=value.faultString))
+				else:
+					results.append([value])
+			response = dumps((results,), methodresponse=True, allow_none=True)
+		else:
+			value = self.answer(method, params)
+			if isinstance(value, Fault):
+				response = dumps(value, methodresponse=True)
+			else:
+				response = dumps((value,), methodresponse=True, allow_none=True)
+		self.send(handle, response.encode('utf-8'))
+
+		if method == 'TriggerModeScriptEventArray' and len(params) > 1 and params[1]:
+			self.send_script_response(params[0], params[1][-1])
+
+	def send_script_response(self, event, response_id):
+		if event not in self.script_responses:
+			return
+		method, params, recorded_id = self.script_responses[event]
+		if isinstance(params[1], list):
+			parts = [part.replace(recorded_id, response_id) for part in params[1]]
+		else:
+			parts = params[1].replace(recorded_id, response_id)
+		self.send(0, dumps((params[0], parts), method, allow_none=True).encode('utf-8'))
+
+	def send(self, handle, body):
+		"""
+		Send a frame to the client.
+
+		:param handle: Handler number.
+		:param body: Body bytes.
+		"""
+		if not self.writer:
+			return
+		self.writer.write(self.HEADER.pack(len(body), handle) + body)
+		self.bytes_sent += 8 + len(body)
+
+	async def drain(self):
+		if self.writer:
+			await self.writer.drain()
+
+
+def get_callback_name(method, data):
+	if method in SCRIPT_CALLBACKS and isinstance(data, (list, tuple)) and data:
+		return 'Script.{}'.format(data[0])
+	return method
+
+
+def percentile(values, percent):
+	"""
+	Get the percentile of the sorted values (nearest rank).
+
+	:param values: Sorted values.
+	:param percent: Percentile, between 0 and 100.
+	"""
+	if not values:
+		return 0.0
+	return values[min(len(values) - 1, max(0, math.ceil(percent / 100 * len(values)) - 1))]
+
+
+class ReplayHarness:
+	"""
+	Replay the recorded callbacks through the fake server to the connected client, and measure per callback (signal):
+
+	- The throughput (callbacks per second).
+	- The latency percentiles, from the moment the frame is received until the callback (and all its receivers) is handled.
+
+	And in total the bytes sent by the client (per method) and optionally the memory allocations.
+	"""
+
+	def __init__(self, client, server, speed=None, trace_allocations=False, timeout=60):
+		"""
+		Initiate the harness.
+
+		:param client: Connected GBX client.
+		:param server: Fake server the client is connected to.
+		:param speed: Replay speed (1 for real time, 10 for ten times faster), None for the maximum speed.
+		:param trace_allocations: Trace the memory allocations with tracemalloc (slows down the replay).
+		:param timeout: Seconds to wait for the handling of the callbacks after the replay.
+		:type client: pyplanet.core.gbx.client.GbxClient
+		:type server: pyplanet.core.gbx.replay.FakeServer
+		"""
+		self.client = client
+		self.server = server
+		self.speed = speed
+		self.trace_allocations = trace_allocations
+		self.timeout = timeout
+
+		self.latencies = collections.defaultdict(list)
+
+	def handle_payload(self, original):
+		latencies = self.latencies
+
+		async def measure(start, coro, name):
+			try:
+				return await coro
+			finally:
+				latencies[name].append(time.perf_counter() - start)
+
+		def handle_payload(handle_nr, method=None, data=None, fault=None):
+			# Called synchronously when the frame is received, the latency includes the waiting on the event loop.
+			start = time.perf_counter()
+			coro = original(handle_nr, method, data, fault)
+			if handle_nr & 0x80000000:
+				return coro
+			return measure(start, coro, get_callback_name(method, data))
+		return handle_payload
+
+	async def run(self):
+		"""
+		Replay the callbacks and wait until they are handled.
+
+		:return: Report, see :func:`format_report`.
+		:rtype: dict
+		"""
+		loop = asyncio.get_event_loop()
+		callbacks = self.server.callbacks
+		self.latencies.clear()
+
+		self.client.handle_payload = self.handle_payload(self.client.handle_payload)
+		requests = collections.Counter(self.server.requests)
+		request_bytes = collections.Counter(self.server.request_bytes)
+		bytes_received = self.server.bytes_received
+
+		if self.trace_allocations:
+			tracemalloc.start()
+			before = tracemalloc.take_snapshot()
+
+		start = time.perf_counter()
+		try:
+			first = callbacks[0].time if callbacks else 0
+			loop_start = loop.time()
+			for idx, frame in enumerate(callbacks):
+				if self.speed:
+					delay = (frame.time - first) / self.speed - (loop.time() - loop_start)
+					if delay > 0:
+						await self.server.drain()
+						await asyncio.sleep(delay)
+				self.server.send(frame.handle, frame.body)
+				if idx % 100 == 0:
+					await self.server.drain()
+			await self.server.drain()
+			await self.wait_handled(len(callbacks))
+			duration = time.perf_counter() - start
+		finally:
+			del self.client.handle_payload
+
+		allocations = None
+		if self.trace_allocations:
+			after = tracemalloc.take_snapshot()
+			current, peak = tracemalloc.get_traced_memory()
+			tracemalloc.stop()
+			stats = after.compare_to(before, 'lineno')
+			allocations = dict(
+				blocks=sum(stat.count_diff for stat in stats if stat.count_diff > 0),
+				bytes=sum(stat.size_diff for stat in stats if stat.size_diff > 0),
+				peak=peak,
+				top=[(str(stat.traceback), stat.size_diff, stat.count_diff) for stat in stats[:10]],
+			)
+
+		signals = dict()
+		for name, latencies in self.latencies.items():
+			latencies.sort()
+			signals[name] = dict(
+				count=len(latencies),
+				throughput=len(latencies) / duration if duration else 0.0,
+				p50=percentile(latencies, 50),
+				p95=percentile(latencies, 95),
+				p99=percentile(latencies, 99),
+				max=latencies[-1],
+			)
+
+		return dict(
+			callbacks=len(callbacks),
+			duration=duration,
+			speed=self.speed,
+			signals=signals,
+			bytes_sent=self.server.bytes_received - bytes_received,
+			requests=dict(
+				(method, (count - requests[method], self.server.request_bytes[method] - request_bytes[method]))
+				for method, count in self.server.requests.items() if count > requests[method]
+			),
+			unanswered=dict(self.server.unanswered),
+			allocations=allocations,
+		)
+
+	async def wait_handled(self, amount):
+		deadline = time.perf_counter() + self.timeout
+		while time.perf_counter() < deadline:
+			handled = sum(len(latencies) for latencies in self.latencies.values())
+			if handled >= amount and not self.client.payloads_pending:
+				return
+			await asyncio.sleep(0.01)
+		logger.warning('Not all replayed callbacks have been handled within {} seconds!'.format(self.timeout))
+
+
+def format_report(report):
+	"""
+	Format the report of the replay harness into a readable table.
+
+	:param report: Report.
+	:return: Text.
+	:rtype: str
+	"""
+	lines = [
+		'Replayed {} callbacks in {:.2f}s ({}, {:.0f} callbacks/s)'.format(
+			report['callbacks'], report['duration'], '{}x'.format(report['speed']) if report['speed'] else 'max speed',
+			report['callbacks'] / report['duration'] if report['duration'] else 0,
+		),
+		'',
+		'{:<48} {:>7} {:>10} {:>9} {:>9} {:>9} {:>9}'.format('callback', 'count', 'per sec', 'p50 ms', 'p95 ms', 'p99 ms', 'max ms'),
+	]
+	for name, stats in sorted(report['signals'].items(), key=lambda item: item[1]['count'], reverse=True):
+		lines.append('{:<48} {:>7} {:>10.1f} {:>9.3f} {:>9.3f} {:>9.3f} {:>9.3f}'.format(
+			name, stats['count'], stats['throughput'],
+			stats['p50'] * 1000, stats['p95'] * 1000, stats['p99'] * 1000, stats['max'] * 1000,
+		))
+
+	lines += ['', 'Sent {} bytes to the server:'.format(report['bytes_sent'])]
+	for method, (count, size) in sorted(report['requests'].items(), key=lambda item: item[1][1], reverse=True):
+		lines.append('  {:<46} {:>7} calls {:>10} bytes'.format(method, count, size))
+
+	if report['unanswered']:
+		lines.append('Queries without recorded response: {}'.format(', '.join(
+			'{} ({}x)'.format(method, count) for method, count in report['unanswered'].items()
+		)))
+
+	if report['allocations']:
+		allocations = report['allocations']
+		lines += ['', 'Allocated {} blocks, {} bytes (peak {} bytes). Top allocations:'.format(
+			allocations['blocks'], allocations['bytes'], allocations['peak'],
+		)]
+		for location, size, count in allocations['top']:
+			lines.append('  {:<60} {:>10} bytes {:>7} blocks'.format(location, size, count))
+	return '\n'.join(lines)
@@ -0,0 +1,221 @@
+"""
+The outbound scheduler holds the frames that are about to be written to the dedicated server. Frames are queued per
+priority class, so latency critical calls (kicks, chat) are never queued behind megabytes of manialink data.
+"""
+import asyncio
+import collections
+import logging
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_CONTROL = 0
+PRIORITY_CHAT = 1
+PRIORITY_UI = 2
+PRIORITY_BULK = 3
+
+PRIORITY_NAMES = {
+	PRIORITY_CONTROL: 'control',
+	PRIORITY_CHAT: 'chat',
+	PRIORITY_UI: 'ui',
+	PRIORITY_BULK: 'bulk',
+}
+
+METHOD_PRIORITIES = dict()
+METHOD_PRIORITIES.update({m: PRIORITY_CHAT for m in [
+	'ChatSend', 'ChatSendToLogin', 'ChatSendToId', 'ChatSendServerMessage', 'ChatSendServerMessageToLogin',
+	'ChatSendServerMessageToId', 'ChatSendServerMessageToLanguage', 'ChatForwardToLogin', 'SendNotice',
+	'SendNoticeToLogin', 'SendNoticeToId',
+]})
+METHOD_PRIORITIES.update({m: PRIORITY_UI for m in [
+	'SendDisplayManialinkPage', 'SendDisplayManialinkPageToLogin', 'SendDisplayManialinkPageToId',
+	'SendHideManialinkPage', 'SendHideManialinkPageToLogin', 'SendHideManialinkPageToId',
+]})
+METHOD_PRIORITIES.update({m: PRIORITY_BULK for m in [
+	'WriteFile', 'AddMapList', 'InsertMapList', 'RemoveMapList', 'ChooseNextMapList', 'SaveMatchSettings',
+	'LoadMatchSettings', 'AppendPlaylistFromMatchSettings', 'InsertPlaylistFromMatchSettings', 'SaveBestGhostsReplay',
+	'SaveCurrentReplay',
+]})
+
+SCRIPT_UI_PREFIXES = ('Maniaplanet.UI.', 'Trackmania.UI.', 'Shootmania.UI.', 'Common.UIModules.')
+
+
+def get_priority(method, args=None):
+	"""
+	Get the priority class of the given method call.
+
+	:param method: Method name.
+	:param args: Arguments of the call.
+	:return: Priority class.
+	:rtype: int
+	"""
+	if method == 'system.multicall':
+		calls = args[0] if args and isinstance(args[0], list) else list()
+		priorities = [get_priority(c.get('methodName'), c.get('params')) for c in calls if isinstance(c, dict)]
+		return min(priorities) if priorities else PRIORITY_CONTROL
+	if method == 'TriggerModeScriptEventArray':
+		if args and isinstance(args[0], str) and args[0].startswith(SCRIPT_UI_PREFIXES):
+			return PRIORITY_UI
+		return PRIORITY_CONTROL
+	return METHOD_PRIORITIES.get(method, PRIORITY_CONTROL)
+
+
+class OutboundScheduler:
+	"""
+	Priority aware outbound write scheduler with backpressure.
+
+	Frames are only written to the transport while the transport buffer is under its (small) high-water mark. Everything
+	above that is held in the priority queues of the scheduler, and written as soon as the transport resumes. When the
+	amount of queued bytes exceeds the high-water mark of the scheduler, callers of the UI and bulk priority classes
+	have to wait until the queue has been drained to the low-water mark.
+	"""
+
+	HIGH_WATER = 1024 * 1024  # 1MB
+	LOW_WATER = 256 * 1024  # 256KB
+	TRANSPORT_HIGH_WATER = 64 * 1024  # 64KB
+	BULK_SIZE = 256 * 1024  # 256KB
+
+	def __init__(self, loop=None, high_water=None, low_water=None):
+		"""
+		Initiate the scheduler.
+
+		:param loop: Event loop.
+		:param high_water: Queued bytes before callers of UI and bulk priority classes have to await the drain.
+		:param low_water: Queued bytes to release the waiting callers.
+		"""
+		self.loop = loop or asyncio.get_event_loop()
+		self.high_water = high_water or self.HIGH_WATER
+		self.low_water = low_water or self.LOW_WATER
+
+		self.protocol = None
+		self.queues = {priority: collections.deque() for priority in PRIORITY_NAMES.keys()}
+		self.queued_bytes = 0
+		self._drain_waiters = list()
+
+		self.metrics = {priority: dict(
+			frames=0, bytes=0, wait_total=0.0, wait_max=0.0, depth_max=0, backpressure_waits=0,
+		) for priority in PRIORITY_NAMES.keys()}
+
+	def attach(self, protocol):
+		"""
+		Attach the scheduler to the (new) protocol connection.
+
+		:param protocol: Protocol instance.
+		:type protocol: pyplanet.core.gbx.protocol.GbxProtocol
+		"""
+		self.clear()
+		self.protocol = protocol
+		self.protocol.resume_handler = self.flush
+		if self.protocol.transport:
+			self.protocol.transport.set_write_buffer_limits(high=self.TRANSPORT_HIGH_WATER)
+
+	def detach(self):
+		"""
+		Detach from the protocol connection and clear the queues.
+		"""
+		if self.protocol:
+			self.protocol.resume_handler = None
+		self.protocol = None
+		self.clear()
+
+	def clear(self):
+		for queue in self.queues.values():
+			queue.clear()
+		self.queued_bytes = 0
+		self._release_waiters()
+
+	@property
+	def depth(self):
+		"""
+		Number of queued frames (all priority classes).
+		"""
+		return sum(len(q) for q in self.queues.values())
+
+	async def wait_writable(self, priority):
+		"""
+		Wait until the caller can enqueue frames of the given priority class. Control and chat are never delayed.
+
+		:param priority: Priority class.
+		"""
+		if priority < PRIORITY_UI or self.queued_bytes < self.high_water:
+			return
+
+		start = self.loop.time()
+		self.metrics[priority]['backpressure_waits'] += 1
+		while self.queued_bytes >= self.high_water and self.protocol:
+			waiter = self.loop.create_future()
+			self._drain_waiters.append(waiter)
+			await waiter
+		logger.debug('GBX: Waited {:.3f}s for the outbound queue to drain ({} priority).'.format(
+			self.loop.time() - start, PRIORITY_NAMES[priority]
+		))
+
+	def enqueue(self, data, priority=PRIORITY_CONTROL):
+		"""
+		Queue the frame and write as much as the transport accepts.
+
+		:param data: Full frame data (header + body).
+		:param priority: Priority class.
+		"""
+		if priority == PRIORITY_UI and len(data) > self.BULK_SIZE:
+			priority = PRIORITY_BULK
+
+		queue = self.queues[priority]
+		queue.append((data, self.loop.time()))
+		self.queued_bytes += len(data)
+		if len(queue) > self.metrics[priority]['depth_max']:
+			self.metrics[priority]['depth_max'] = len(queue)
+
+		self.flush()
+
+	def flush(self):
+		"""
+		Write the queued frames in order of priority, until the transport asks us to pause.
+		"""
+		if not self.protocol:
+			return
+
+		now = self.loop.time()
+		for priority, queue in self.queues.items():
+			while queue:
+				if self.protocol.writing_paused:
+					return self._release_waiters()
+				data, queued_at = queue.popleft()
+				self.queued_bytes -= len(data)
+
+				metrics = self.metrics[priority]
+				metrics['frames'] += 1
+				metrics['bytes'] += len(data)
+				metrics['wait_total'] += now - queued_at
+				metrics['wait_max'] = max(metrics['wait_max'], now - queued_at)
+
+				self.protocol.write(data)
+		self._release_waiters()
+
+	def _release_waiters(self):
+		if self.queued_bytes > self.low_water and self.protocol:
+			return
+		waiters, self._drain_waiters = self._drain_waiters, list()
+		for waiter in waiters:
+			if not waiter.done():
+				waiter.set_result(None)
+
+	def stats(self):
+		"""
+		Get the metrics of the scheduler.
+
+		:return: Dictionary with the total queue depth and bytes, and the metrics per priority class name.
+		:rtype: dict
+		"""
+		return dict(
+			depth=self.depth,
+			queued_bytes=self.queued_bytes,
+			priorities={PRIORITY_NAMES[priority]: dict(
+				depth=len(self.queues[priority]),
+				frames=metrics['frames'],
+				bytes=metrics['bytes'],
+				wait_avg=metrics['wait_total'] / metrics['frames'] if metrics['frames'] else 0.0,
+				wait_max=metrics['wait_max'],
+				depth_max=metrics['depth_max'],
+				backpressure_waits=metrics['backpressure_waits'],
+			) for priority, metrics in self.metrics.items()}
+		)
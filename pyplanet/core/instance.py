@@ -23,7 +23,7 @@ from pyplanet.core.gbx import GbxClient
 from pyplanet.core.exceptions import ImproperlyConfigured
 from pyplanet.core.storage.storage import Storage
 from pyplanet.core.ui import GlobalUIManager
-from pyplanet.utils import memleak, releases
+from pyplanet.utils import diagnostics, memleak, releases
 
 from pyplanet.contrib.map import MapManager
 from pyplanet.contrib.player import PlayerManager
@@ -104,6 +104,11 @@ class Instance:
 			# Start memleak checker.
 			memleak.checker.start()
 
+			# Start event loop diagnostics.
+			diagnostics.monitor.start(
+				self, threshold=settings.DIAGNOSTICS_SLOW_THRESHOLD, summary_interval=settings.DIAGNOSTICS_SUMMARY_INTERVAL,
+			)
+
 			# Initiate instance.
 			self.loop.run_until_complete(self._start())
 
@@ -162,6 +167,7 @@ class Instance:
 		await self.db.connect()				# Connect and initial state.
 		await self.apps.discover() 			# Discover apps models.
 		await self.db.initiate() 			# Execute migrations and initial tasks.
+		await self.db.writer.start()		# Start the write-behind queue.
 		await self.apps.check(True)    		# Check for incompatible apps and remove them.
 		await self.apps.init()				# Initiate apps
 		await self.ui_manager.on_start()    # Initiate UI manager.
@@ -194,7 +200,11 @@ class Instance:
 		"""
 		The stop coroutine is executed when the process exits with the SIGINT signal.
 		"""
-		await self.apps.stop()
+		try:
+			await self.apps.stop()
+		finally:
+			# Always flush the queued writes, also when one of the apps fails to stop.
+			await self.db.writer.stop()
 
 	async def print_header(self):  # pragma: no cover
 		await self.chat.execute(
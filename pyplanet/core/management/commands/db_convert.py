@@ -1,3 +1,5 @@
+import os
+
 from getpass import getpass
 
 from pyplanet.contrib.converter import get_converter
@@ -33,17 +35,37 @@ class Command(BaseCommand):
 			help='Source database table prefix. Leave empty for using no prefix or the default one by the source type.',
 			default=None,
 		)
+		parser.add_argument(
+			'--chunk-size', help='Amount of rows converted and inserted at once.', type=int, default=None,
+		)
+		parser.add_argument(
+			'--checkpoint-file',
+			help='File to keep the progress in. An interrupted conversion resumes from this file when started again. '
+				 'Defaults to db_convert_<source-format>_<source-db-name>.json in the current directory.',
+			default=None,
+		)
+		parser.add_argument(
+			'--restart', help='Ignore the checkpoint file and start the conversion from the beginning.',
+			action='store_true', default=False,
+		)
 
 	def handle(self, *args, **options):
 		if options['source_db_password'] is None:
 			options['source_db_password'] = getpass('Database Password: ')
 
+		checkpoint_file = options['checkpoint_file'] or 'db_convert_{}_{}.json'.format(
+			options['source_format'], options['source_db_name']
+		)
+		if options['restart'] and os.path.exists(checkpoint_file):
+			os.remove(checkpoint_file)
+
 		instance = Controller.prepare(options['pool']).instance
 		converter = get_converter(
 			options['source_format'], instance=instance, db_name=options['source_db_name'],
 			db_type=options['source_db_type'], db_user=options['source_db_username'],
 			db_port=options['source_db_port'], db_password=options['source_db_password'],
-			db_host=options['source_db_host'], prefix=options['source_db_prefix']
+			db_host=options['source_db_host'], prefix=options['source_db_prefix'],
+			chunk_size=options['chunk_size'], checkpoint_file=checkpoint_file,
 		)
 
 		instance.loop.run_until_complete(self.convert(instance, converter))
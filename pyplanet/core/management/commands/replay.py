@@ -0,0 +1,73 @@
+from pyplanet.conf import settings
+from pyplanet.core import Controller
+from pyplanet.core.gbx.recorder import read_recording
+from pyplanet.core.gbx.replay import FakeServer, ReplayHarness, format_report
+from pyplanet.core.management import BaseCommand, CommandError
+
+
+class Command(BaseCommand):  # pragma: no cover
+	help = (
+		'Replay a recorded GBX callback stream against a fake dedicated server and report the handling performance. '
+		'The apps write the replayed callbacks into the database, so the replay requires a separate database.'
+	)
+
+	requires_migrations_checks = True
+	requires_system_checks = True
+
+	arg_pool_required = True
+	arg_settings_required = True
+
+	def add_arguments(self, parser):
+		parser.add_argument('recording', help='Recording file, see the RECORD_FILE option of the dedicated settings.')
+		parser.add_argument(
+			'--database', required=True,
+			help=(
+				'Name of the database to replay into, replacing the NAME of the pool database. Never use the production '
+				'database, the apps write the replayed callbacks (players, records, karma) into it.'
+			),
+		)
+		parser.add_argument(
+			'--speed', default='max',
+			help='Replay speed, 1 for the recorded speed, 10 for ten times faster or max (default) for the maximum speed.',
+		)
+		parser.add_argument(
+			'--allocations', help='Trace the memory allocations (slows down the replay).', action='store_true', default=False,
+		)
+		parser.add_argument(
+			'--timeout', help='Seconds to wait for the handling of the callbacks after the replay.', type=float, default=60,
+		)
+
+	def handle(self, *args, **options):
+		speed = None if options['speed'] == 'max' else float(options['speed'])
+
+		# Point the instance at the replay database, the instance creates the database connection from the settings.
+		database = settings.DATABASES[options['pool']]
+		if options['database'] == database['NAME']:
+			raise CommandError(
+				'The replay database \'{}\' is the configured database of the pool! Use a separate (test) database.'
+				.format(options['database'])
+			)
+		settings.DATABASES = dict(settings.DATABASES, **{options['pool']: dict(database, NAME=options['database'])})
+
+		instance = Controller.prepare(options['pool']).instance
+		instance.loop.run_until_complete(self.replay(instance, options['recording'], speed, options))
+
+	async def replay(self, instance, recording, speed, options):
+		server = await FakeServer(read_recording(recording)).start()
+		print('Loaded {} callbacks from \'{}\', starting the instance...'.format(len(server.callbacks), recording))
+
+		# Connect the instance to the fake server, without recording the replay.
+		instance.gbx.host, instance.gbx.port = server.host, server.port
+		instance.gbx.record_file = None
+		try:
+			await instance._start()
+
+			harness = ReplayHarness(
+				instance.gbx, server, speed=speed, trace_allocations=options['allocations'], timeout=options['timeout'],
+			)
+			report = await harness.run()
+			print(format_report(report))
+		finally:
+			await instance._stop()
+			await instance.gbx.disconnect()
+			await server.close()
@@ -1,9 +1,12 @@
 import asyncio
+import collections
+import hashlib
 import logging
 
 from xmlrpc.client import Fault
 
 from pyplanet.apps.core.maniaplanet.models import Player
+from pyplanet.core.gbx.scheduler import PRIORITY_BULK
 from pyplanet.core.ui.ui_properties import UIProperties
 from pyplanet.utils.log import handle_exception
 
@@ -11,6 +14,9 @@ logger = logging.getLogger(__name__)
 
 
 class _BaseUIManager:
+	SEND_INTERVAL = 0.25
+	SEND_INTERVAL_MAX = 2.0
+
 	def __init__(self, instance):
 		"""
 		Initiate manager.
@@ -20,33 +26,144 @@ class _BaseUIManager:
 		"""
 		self.instance = instance
 		self.manialinks = dict()
-		self.send_queue = list()
+
+		# The relaxed updates are queued by key (manialink + target), a newer update replaces the queued one.
+		self.send_queue = collections.OrderedDict()
+		self._send_queue_since = None
+		self._send_queue_event = asyncio.Event()
+		self._last_flush_duration = 0.0
+
+		# Digests of the last manialink bodies sent, per manialink id and per login (None for global sends).
+		self.sent_digests = dict()
+		self.stats = dict(sent=0, sent_bytes=0, skipped=0, skipped_bytes=0, collapsed=0, coalesced=0, flushes=0)
 
 	async def on_start(self):
 		asyncio.ensure_future(self.send_loop())
 
 	async def send_loop(self):
+		"""
+		The send loop pushes out the relaxed updates. The loop sleeps until the deadline of the oldest queued update, so
+		every update is sent within the (adaptive) send interval.
+		"""
+		loop = asyncio.get_event_loop()
 		while True:
-			await asyncio.sleep(0.25)
-			if len(self.send_queue) == 0:
-				continue
-
-			# Copy send queue and clear the global one
-			queue = self.send_queue.copy()
-			self.send_queue.clear()
-
-			# Process and push out the queue.
 			try:
-				await self.instance.gbx.multicall(*queue)
-			except Fault as e:
-				if 'Login unknown' in str(e):
-					return
-				logger.exception(e)
-				handle_exception(exception=e, module_name=__name__, func_name='send_loop')
+				await self._send_queue_event.wait()
+				delay = self._send_queue_since + self.get_send_interval() - loop.time()
+				if delay > 0:
+					await asyncio.sleep(delay)
+				await self.flush_send_queue()
+			except asyncio.CancelledError:
+				raise
 			except Exception as e:
 				logger.exception(e)
 				handle_exception(exception=e, module_name=__name__, func_name='send_loop')
 
+	def get_send_interval(self):
+		"""
+		Get the interval of the relaxed updates. The interval grows when the previous flush took long or when the outbound
+		queue of the dedicated connection is filling up, so busy servers get fewer but larger updates.
+
+		:return: Interval in seconds.
+		"""
+		load = self._last_flush_duration / self.SEND_INTERVAL
+		scheduler = getattr(self.instance.gbx, 'scheduler', None)
+		if scheduler:
+			load = max(load, scheduler.queued_bytes / scheduler.low_water)
+		return min(self.SEND_INTERVAL_MAX, self.SEND_INTERVAL * max(1.0, load))
+
+	def queue_relaxed(self, manialink, queries):
+		"""
+		Queue the queries of a relaxed update. Queries replace the queued queries for the same manialink and target.
+
+		:param manialink: ManiaLink instance.
+		:param queries: Queries to queue.
+		"""
+		for query in queries:
+			if query.method == 'SendDisplayManialinkPage':
+				# A global update replaces all the queued updates of the manialink.
+				for key in [k for k in self.send_queue.keys() if k[0] == manialink.id and k[1] == 'display']:
+					del self.send_queue[key]
+					self.stats['coalesced'] += 1
+				key = (manialink.id, 'display', None)
+			elif query.method == 'SendDisplayManialinkPageToLogin':
+				key = (manialink.id, 'display', query.args[0])
+			else:
+				key = (manialink.id, query.method, repr(query.args))
+
+			if self.send_queue.pop(key, None) is not None:
+				self.stats['coalesced'] += 1
+			self.send_queue[key] = query
+
+		if self.send_queue and self._send_queue_since is None:
+			self._send_queue_since = asyncio.get_event_loop().time()
+			self._send_queue_event.set()
+
+	async def flush_send_queue(self):
+		"""
+		Send all the queued relaxed updates now. The gbx client splits the queries into multicalls that respect the
+		maximum request size.
+		"""
+		queries = [(key[0], query) for key, query in self.send_queue.items()]
+		self.send_queue.clear()
+		self._send_queue_since = None
+		self._send_queue_event.clear()
+		if not queries:
+			return
+
+		loop = asyncio.get_event_loop()
+		start = loop.time()
+		try:
+			await self.execute_queries(queries, priority=PRIORITY_BULK)
+		except Fault as e:
+			# Ignore login unknown (player just left), the other updates will continue.
+			if 'Login unknown' not in str(e):
+				logger.exception(e)
+				handle_exception(exception=e, module_name=__name__, func_name='flush_send_queue')
+		finally:
+			self._last_flush_duration = loop.time() - start
+			self.stats['flushes'] += 1
+
+	async def execute_queries(self, queries, priority=None):
+		"""
+		Execute the queries in multicall(s) and handle the faulted display calls. The multicall doesn't raise for a
+		faulted call, and a call to several logins faults completely when one of the players just left. The digests of the
+		faulted calls are forgotten and the calls to several logins are retried for the players that are still online,
+		one call per login.
+
+		:param queries: List with tuples of the manialink id and the query.
+		:param priority: Outbound priority class of the multicall(s).
+		"""
+		results = await self.instance.gbx.multicall(*[query for _, query in queries], priority=priority)
+
+		retries = list()
+		for (manialink_id, query), result in zip(queries, results):
+			if not isinstance(result, dict) or 'faultCode' not in result:
+				continue
+			if 'Login unknown' not in result.get('faultString', ''):
+				logger.warning('Call {} of manialink {} failed: {}'.format(
+					query.method, manialink_id, result.get('faultString', result['faultCode'])
+				))
+
+			if query.method == 'SendDisplayManialinkPageToLogin':
+				logins = query.args[0].split(',')
+				self.forget_digests(manialink_id, logins)
+				if len(logins) > 1:
+					online = self.instance.player_manager.online_logins
+					retries.extend(
+						(manialink_id, self.instance.gbx(query.method, login, *query.args[1:]))
+						for login in logins if login in online
+					)
+			elif query.method == 'SendDisplayManialinkPage':
+				self.forget_digests(manialink_id)
+
+		if not retries:
+			return
+		results = await self.instance.gbx.multicall(*[query for _, query in retries], priority=priority)
+		for (manialink_id, query), result in zip(retries, results):
+			if isinstance(result, dict) and 'faultCode' in result:
+				self.forget_digests(manialink_id, query.args[:1])
+
 	def get_manialink_by_id(self, identifier):
 		"""
 		Get Manialink instance by ManiaLink identifier.
@@ -60,9 +177,75 @@ class _BaseUIManager:
 			return self.manialinks[identifier]
 		return None
 
+	@staticmethod
+	def get_digest(body):
+		return hashlib.blake2b(body.encode(), digest_size=16).digest()
+
+	def should_deduplicate(self, manialink):
+		"""
+		Check if sends of the manialink can be skipped when the body didn't change. Manialinks that disappear by
+		themselves (timeout or hide on click) are always send.
+
+		:param manialink: ManiaLink instance.
+		:return: Boolean
+		"""
+		return getattr(manialink, 'deduplicate', True) and not manialink.timeout and not manialink.hide_click
+
+	def filter_changed_logins(self, manialink, logins, digest, size):
+		"""
+		Filter the logins that don't have the body (digest) displayed yet and remember the digest for them.
+
+		:param manialink: ManiaLink instance.
+		:param logins: Logins to send the body to.
+		:param digest: Digest of the body.
+		:param size: Size of the body.
+		:return: List of logins that should get the body.
+		"""
+		digests = self.sent_digests.setdefault(manialink.id, dict())
+		global_digest = digests.pop(None, None)
+		changed = list()
+		for login in logins:
+			if digests.get(login, global_digest) == digest:
+				self.stats['skipped'] += 1
+				self.stats['skipped_bytes'] += size
+				continue
+			changed.append(login)
+
+		# The global digest is no longer valid, the players that didn't get a personal send still have it.
+		if global_digest is not None:
+			for player in self.instance.player_manager.online:
+				digests.setdefault(player.login, global_digest)
+		for login in changed:
+			digests[login] = digest
+		return changed
+
+	def forget_digests(self, manialink_id=None, logins=None):
+		"""
+		Forget the digests of the sent manialinks, so the next send will be send anyway.
+
+		:param manialink_id: Manialink id, None for all manialinks.
+		:param logins: Only forget for the logins given (and the global sends), None for all.
+		"""
+		if manialink_id is None:
+			targets = list(self.sent_digests.values())
+		else:
+			targets = [self.sent_digests[manialink_id]] if manialink_id in self.sent_digests else list()
+
+		for digests in targets:
+			if logins is None:
+				digests.clear()
+				continue
+			digests.pop(None, None)
+			for login in logins:
+				digests.pop(login, None)
+
+		if manialink_id is not None and logins is None:
+			self.sent_digests.pop(manialink_id, None)
+
 	async def send(self, manialink, players=None, **kwargs):
 		"""
-		Send manialink to player(s).
+		Send manialink to player(s). Sends are skipped for the players that already got the exact same body displayed,
+		players that get the same body are combined into one call.
 
 		:param manialink: ManiaLink instance.
 		:param players: Player instances or logins to post to. None to globally send.
@@ -80,27 +263,38 @@ class _BaseUIManager:
 		if manialink.id not in self.manialinks:
 			self.manialinks[manialink.id] = manialink
 
+		deduplicate = self.should_deduplicate(manialink)
 		is_global = await manialink.is_global()
 		if not is_global:
-			for login in for_logins:
-				if login not in manialink.player_data:
-					continue
-
-				if await manialink.get_template() and not manialink.body:
-					body = await manialink.render(player_login=login)
-				elif manialink.body:
-					body = manialink.body
-				else:
-					raise Exception('Manialink has no body or template defined!')
+			# Group the logins by rendered body.
+			bodies = dict()
+			render_logins = [login for login in for_logins if login in manialink.player_data]
+			if not render_logins:
+				rendered = list()
+			elif await manialink.get_template() and not manialink.body:
+				rendered = await manialink.render_many(render_logins)
+			elif manialink.body:
+				rendered = [manialink.body] * len(render_logins)
+			else:
+				raise Exception('Manialink has no body or template defined!')
 
+			for login, body in zip(render_logins, rendered):
 				# Add manialink tag to body.
 				body = '<manialink version="{}" id="{}" name="{}">{}</manialink>'.format(
 					manialink.version, manialink.id, manialink.id, body
 				)
+				bodies.setdefault(body, list()).append(login)
+
+			for body, logins in bodies.items():
+				if deduplicate:
+					logins = self.filter_changed_logins(manialink, logins, self.get_digest(body), len(body))
+				if not logins:
+					continue
 
 				# Prepare query
+				self.stats['collapsed'] += len(logins) - 1
 				queries.append(self.instance.gbx(
-					'SendDisplayManialinkPageToLogin', login, body, manialink.timeout, manialink.hide_click
+					'SendDisplayManialinkPageToLogin', ','.join(logins), body, manialink.timeout, manialink.hide_click
 				))
 
 		else:
@@ -119,16 +313,36 @@ class _BaseUIManager:
 
 			# Add normal queries.
 			if for_logins and len(for_logins) > 0:
-				for login in for_logins:
+				logins = for_logins
+				if deduplicate:
+					logins = self.filter_changed_logins(manialink, logins, self.get_digest(body), len(body))
+				if logins:
 					# Prepare query
+					self.stats['collapsed'] += len(logins) - 1
 					queries.append(self.instance.gbx(
-						'SendDisplayManialinkPageToLogin', login, body, manialink.timeout, manialink.hide_click
+						'SendDisplayManialinkPageToLogin', ','.join(logins), body, manialink.timeout, manialink.hide_click
 					))
 			else:
-				# Prepare query
-				queries.append(self.instance.gbx(
-					'SendDisplayManialinkPage', body, manialink.timeout, manialink.hide_click
-				))
+				digests = self.sent_digests.setdefault(manialink.id, dict())
+				digest = self.get_digest(body) if deduplicate else None
+				if deduplicate and len(digests) == 1 and digests.get(None) == digest:
+					self.stats['skipped'] += 1
+					self.stats['skipped_bytes'] += len(body)
+				else:
+					digests.clear()
+					if deduplicate:
+						digests[None] = digest
+
+					# Prepare query
+					queries.append(self.instance.gbx(
+						'SendDisplayManialinkPage', body, manialink.timeout, manialink.hide_click
+					))
+
+		# Nothing changed, nothing to send.
+		if not queries:
+			return
+		self.stats['sent'] += len(queries)
+		self.stats['sent_bytes'] += sum(len(q.args[-3]) for q in queries)
 
 		# Hide ALT menus (shootmania).
 		if self.instance.game.game == 'sm' and manialink.disable_alt_menu:
@@ -145,16 +359,20 @@ class _BaseUIManager:
 
 		# It the manialink wants rate limitting with the relaxed updating feature (mostly used for widgets), add to send queue
 		if getattr(manialink, 'relaxed_updating', False):
-			self.send_queue.extend(queries)
+			self.queue_relaxed(manialink, queries)
 			return
 
 		# Execute calls, ignore login unknown (player just left).
 		try:
-			await self.instance.gbx.multicall(*queries)
+			await self.execute_queries([(manialink.id, query) for query in queries])
 		except Fault as e:
+			self.forget_digests(manialink.id, for_logins if for_logins else None)
 			if 'Login unknown' in str(e):
 				return
 			raise
+		except Exception:
+			self.forget_digests(manialink.id, for_logins if for_logins else None)
+			raise
 
 	async def hide(self, manialink, logins=None):
 		"""
@@ -165,6 +383,7 @@ class _BaseUIManager:
 		:type manialink: pyplanet.core.ui.components.manialink._ManiaLink
 		"""
 		body = '<manialink id="{}"></manialink>'.format(manialink.id)
+		self.forget_digests(manialink.id, logins if logins else None)
 		queries = list()
 		if logins and len(logins) > 0:
 			queries.append(
@@ -187,7 +406,7 @@ class _BaseUIManager:
 
 		# It the manialink wants rate limitting with the relaxed updating feature (mostly used for widgets), add to send queue
 		if getattr(manialink, 'relaxed_updating', False):
-			self.send_queue.extend(queries)
+			self.queue_relaxed(manialink, queries)
 			return
 
 		# Execute queries.
@@ -196,6 +415,7 @@ class _BaseUIManager:
 	async def destroy(self, manialink, logins=None):
 		if manialink.id in self.manialinks:
 			del self.manialinks[manialink.id]
+		self.forget_digests(manialink.id)
 		return await self.hide(manialink, logins)
 
 
@@ -209,11 +429,36 @@ class GlobalUIManager(_BaseUIManager):
 		await super().on_start()
 		await self.properties.on_start()
 
+		# New or reconnecting players don't have any of the previous send manialinks.
+		self.instance.signals.listen('maniaplanet:player_connect', self.player_changed)
+		self.instance.signals.listen('maniaplanet:player_disconnect', self.player_changed)
+
 		# Start app ui managers.
 		await asyncio.gather(*[
 			m.on_start() for m in self.app_managers.values()
 		])
 
+	def player_changed(self, player, **kwargs):
+		"""
+		Forget the digests of the manialinks sent to the player, and of the global sends.
+		"""
+		for manager in [self] + list(self.app_managers.values()):
+			manager.forget_digests(logins=[player.login])
+
+	def get_stats(self):
+		"""
+		Get the send statistics of the global and all app UI managers.
+
+		:return: Dictionary with the amount of sent and skipped calls and bytes, and the amount of calls saved by
+				 combining logins.
+		:rtype: dict
+		"""
+		stats = dict(self.stats)
+		for manager in self.app_managers.values():
+			for key, value in manager.stats.items():
+				stats[key] += value
+		return stats
+
 	def get_manialink_by_id(self, identifier):
 		"""
 		Get Manialink instance by ManiaLink identifier. (From all apps ui managers as well).
@@ -14,7 +14,7 @@ logger = logging.getLogger(__name__)
 class _ManiaLink:
 	def __init__(
 		self, manager=None, id=None, version='3', body=None, template=None, timeout=0, hide_click=False, data=None,
-		player_data=None, disable_alt_menu=False, throw_exceptions=False, relaxed_updating=False,
+		player_data=None, disable_alt_menu=False, throw_exceptions=False, relaxed_updating=False, deduplicate=True,
 	):
 		"""
 		Create manialink (USE THE MANAGER CREATE, DONT INIT DIRECTLY!
@@ -31,6 +31,8 @@ class _ManiaLink:
 		a global manialink instead of per person.
 		:param throw_exceptions: Throw exceptions during handling and executing of action handlers.
 		:param relaxed_updating: Relaxed updating will rate limit the amount of updates send to clients.
+		:param deduplicate: Skip sending the manialink to players that already have the exact same body displayed.
+		Disable this when the manialink can be hidden on the client side and should be reset by displaying again.
 		:type manager: pyplanet.core.ui.AppUIManager
 		:type template: pyplanet.core.ui.template.Template
 		:type id: str
@@ -49,6 +51,7 @@ class _ManiaLink:
 		self.throw_exceptions = False
 		self.disable_alt_menu = bool(disable_alt_menu)
 		self.relaxed_updating = relaxed_updating
+		self.deduplicate = deduplicate
 
 		self.receivers = dict()
 		self._is_global_shown = False
@@ -73,6 +76,25 @@ class _ManiaLink:
 		:type template: pyplanet.core.ui.template.Template
 		:return: Body, rendered manialink + script.
 		"""
+		template, player_data = await self._prepare_render(data, player_data, template)
+		return await template.render(**self.get_render_payload(player_login, player_data))
+
+	async def render_many(self, player_logins, data=None, player_data=None, template=None):
+		"""
+		Render template for multiple players. The player variants are rendered concurrently in the render pool when the
+		pool is enabled and the batch is big enough.
+
+		:param player_logins: List with player logins to render for.
+		:param data: Data to append.
+		:param player_data: Data to append.
+		:param template: Template instance to use.
+		:type template: pyplanet.core.ui.template.Template
+		:return: List with the bodies, in order of the player logins.
+		"""
+		template, player_data = await self._prepare_render(data, player_data, template)
+		return await template.render_many([self.get_render_payload(login, player_data) for login in player_logins])
+
+	async def _prepare_render(self, data=None, player_data=None, template=None):
 		if data and isinstance(data, dict):
 			self.data.update(data)
 		if not player_data:
@@ -83,7 +105,16 @@ class _ManiaLink:
 			template = await self.get_template()
 		if not isinstance(template, Template):
 			raise Exception('Can\'t render, no template is given!')
+		return template, player_data
+
+	def get_render_payload(self, player_login=None, player_data=None):
+		"""
+		Get the data to render the template with.
 
+		:param player_login: Player login, set to None for the global data.
+		:param player_data: Player specific data.
+		:return: Dictionary with render data.
+		"""
 		# PyPlanet Global data.
 		global_data = dict(
 			_game=self.manager.instance.game,
@@ -94,11 +125,9 @@ class _ManiaLink:
 		# Combine data (global + user specific).
 		payload_data = global_data
 		payload_data.update(self.data.copy())
-		if player_login:
+		if player_login and player_data:
 			payload_data.update(player_data.get(player_login, dict()))
-
-		# Render and save in content.
-		return await template.render(**payload_data)
+		return payload_data
 
 	async def display(self, player_logins=None, **kwargs):
 		"""
@@ -1,3 +1,7 @@
+import asyncio
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
 from jinja2 import Environment, select_autoescape
 
 from pyplanet.conf import settings
@@ -11,6 +15,7 @@ async def load_template(file):
 class _EnvironmentManager:
 	def __init__(self):
 		self._environment = None
+		self._templates = dict()
 
 	@property
 	def environment(self):
@@ -23,9 +28,96 @@ class _EnvironmentManager:
 			)
 		return self._environment
 
+	def get_template(self, name):
+		"""
+		Get the compiled template. Templates are compiled once and cached for the whole process. When the environment
+		auto reloads (debug mode), Jinja2 will check the template source for changes instead.
+
+		:param name: Template name.
+		:return: Compiled Jinja2 template.
+		"""
+		if self.environment.auto_reload:
+			return self.environment.get_template(name)
+		try:
+			return self._templates[name]
+		except KeyError:
+			self._templates[name] = template = self.environment.get_template(name)
+			return template
+
+	def clear(self):
+		"""
+		Clear the compiled template cache.
+		"""
+		self._templates.clear()
+
 EnvironmentManager = _EnvironmentManager()
 
 
+class _RenderPool:
+	"""
+	The render pool renders the player variants of a manialink concurrently in worker threads, so big per-player
+	batches don't block the event loop. The pool is disabled by default (``UI_RENDER_WORKERS`` is ``0``), batches
+	smaller than ``UI_RENDER_THRESHOLD`` are always rendered on the event loop.
+
+	.. warning::
+
+		The worker threads run the templates in their own event loop. Don't provide coroutines or objects that depend on
+		the main event loop in the render data of views that could be rendered in the pool!
+	"""
+
+	def __init__(self):
+		self._executor = None
+		self._local = threading.local()
+
+	@property
+	def workers(self):
+		return settings.UI_RENDER_WORKERS or 0
+
+	@property
+	def threshold(self):
+		return settings.UI_RENDER_THRESHOLD or 0
+
+	@property
+	def executor(self):
+		if not self._executor:
+			self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='render')
+		return self._executor
+
+	async def render(self, template, payloads):
+		"""
+		Render the template for all the given payloads.
+
+		:param template: Template instance.
+		:param payloads: List with the render data dictionaries.
+		:type template: pyplanet.core.ui.template.Template
+		:return: List with the bodies, in order of the payloads.
+		"""
+		if not self.workers or len(payloads) < max(self.threshold, 2):
+			return [await template.render(**payload) for payload in payloads]
+
+		# Split in one chunk per worker to keep the overhead of the handover low.
+		size = -(-len(payloads) // self.workers)
+		loop = asyncio.get_event_loop()
+		results = await asyncio.gather(*[
+			loop.run_in_executor(self.executor, self._render_chunk, template.template, payloads[idx:idx + size])
+			for idx in range(0, len(payloads), size)
+		])
+		return [body for chunk in results for body in chunk]
+
+	def _render_chunk(self, template, payloads):
+		loop = getattr(self._local, 'loop', None)
+		if not loop:
+			self._local.loop = loop = asyncio.new_event_loop()
+		return [loop.run_until_complete(template.render_async(**payload)) for payload in payloads]
+
+	def shutdown(self):
+		if self._executor:
+			self._executor.shutdown(wait=False)
+			self._executor = None
+
+RenderPool = _RenderPool()
+
+
 class Template:
 	"""
 	Template class manages the template file source and the rendering of it.
@@ -45,7 +137,16 @@ class Template:
 	def __init__(self, file):
 		self.file = file
 		self.env = EnvironmentManager.environment
-		self.template = self.env.get_template(file)
+		self.template = EnvironmentManager.get_template(file)
 
 	async def render(self, **data):
 		return await self.template.render_async(**data)
+
+	async def render_many(self, payloads):
+		"""
+		Render the template for multiple payloads (player variants). Uses the render pool when enabled.
+
+		:param payloads: List with the render data dictionaries.
+		:return: List with the bodies, in order of the payloads.
+		"""
+		return await RenderPool.render(self, payloads)
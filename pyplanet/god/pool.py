@@ -1,12 +1,13 @@
 import os
-import time
 import logging
 import multiprocessing
 
 from logging.handlers import QueueListener
 
+from pyplanet.conf import settings
 from pyplanet.utils.livereload import LiveReload
 from pyplanet.god import process
+from pyplanet.god.supervisor import Supervisor
 
 logger = logging.getLogger(__name__)
 
@@ -27,6 +28,9 @@ class EnvironmentPool:
 		self.pool = dict()
 		self.max_restarts = max_restarts
 		self.options = options or dict()
+		self.supervisor = Supervisor(
+			interval=settings.SUPERVISOR_HEARTBEAT_INTERVAL or 5, lag_threshold=settings.SUPERVISOR_LAG_THRESHOLD,
+		)
 
 		self.dog_path = os.curdir
 		self.dog_handler = LiveReload(self)
@@ -55,10 +59,15 @@ class EnvironmentPool:
 		Populate the pool instance processes, (prepares the processes).
 		"""
 		for name in self.names:
-			self.pool[name] = process.InstanceProcess(queue=self.queue, environment_name=name, options=self.options)
+			self.pool[name] = self.create_process(name)
 			self._restarts[name] = 0
 		return self
 
+	def create_process(self, name):
+		return process.InstanceProcess(
+			queue=self.queue, environment_name=name, options=self.options, supervisor=self.supervisor.register(name),
+		)
+
 	def start(self):
 		"""
 		Start all processes.
@@ -66,6 +75,9 @@ class EnvironmentPool:
 		for name, proc in self.pool.items():
 			proc.start()
 
+		if settings.SUPERVISOR_STATUS_PORT:
+			self.supervisor.serve(settings.SUPERVISOR_STATUS_PORT)
+
 	def shutdown(self):
 		"""
 		Shutdown all processes.
@@ -76,6 +88,7 @@ class EnvironmentPool:
 				proc.shutdown()
 			else:
 				proc.graceful()
+		self.supervisor.close()
 		# self.dog_observer.stop()
 
 	def restart(self, name=None):
@@ -85,7 +98,7 @@ class EnvironmentPool:
 		:param name: Name or none for all pools.
 		"""
 		if name:
-			self.pool[name] = process.InstanceProcess(queue=self.queue, environment_name=name)
+			self.pool[name] = self.create_process(name)
 			self._restarts[name] += 1
 			self.pool[name].start()
 		else:
@@ -99,6 +112,12 @@ class EnvironmentPool:
 		logger.debug('Starting watchdog... watching {} instances'.format(len(self.pool)))
 
 		while True:
+			# Kill the instances that stopped responding, the restart (within the maximum restarts) is handled below.
+			for name in self.supervisor.get_hung():
+				logger.critical('The instance \'{}\' is not responding. We will kill the instance!'.format(name))
+				self.supervisor.unregister(name)
+				self.pool[name].kill()
+
 			num_alive = 0
 			for name, proc in self.pool.items():
 				if proc.did_die:
@@ -122,4 +141,5 @@ class EnvironmentPool:
 				logger.critical('All instances died. Quitting now...')
 				exit(1)
 
-			time.sleep(2)
+			# Wait for the heartbeats of the instances.
+			self.supervisor.poll(timeout=2)
@@ -4,16 +4,19 @@ import multiprocessing
 from colorlog import ColoredFormatter
 
 
-def _run(name, queue, options):
+def _run(name, queue, options, supervisor=None):
 	"""
 	The actual process that runs the separate controller instance.
 
 	:param name: name of the process
 	:param queue: Queue of the binding parent.
 	:param options: Custom Options
+	:param supervisor: Sending end of the supervisor pipe, for the heartbeats.
 	:type name: str
 	"""
+	from pyplanet.conf import settings
 	from pyplanet.core.instance import Controller
+	from pyplanet.god.supervisor import Heartbeat
 	from pyplanet.utils.log import initiate_logger, QueueHandler
 	import logging
 
@@ -46,6 +49,10 @@ def _run(name, queue, options):
 	instance = Controller.prepare(name).instance
 	instance._queue = queue
 
+	# Send the heartbeats to the god process.
+	if supervisor is not None:
+		Heartbeat(instance, supervisor, interval=settings.SUPERVISOR_HEARTBEAT_INTERVAL or 5).start()
+
 	# Start and loop instance.
 	instance.start()
 
@@ -60,7 +67,7 @@ class InstanceProcess:
 
 	"""
 
-	def __init__(self, queue, environment_name='default', pool=None, options=None):
+	def __init__(self, queue, environment_name='default', pool=None, options=None, supervisor=None):
 		"""
 		Create an environment process of the controller itself.
 
@@ -68,14 +75,17 @@ class InstanceProcess:
 		:param environment_name: Name of environment.
 		:param pool: Pool.
 		:param options: Custom options.
+		:param supervisor: Sending end of the supervisor pipe.
 		:type queue: multiprocessing.Queue
 		:type environment_name: str
 		:type pool: multiprocessing.Pool
 		:type options: dict
+		:type supervisor: multiprocessing.connection.Connection
 		"""
 		self.queue = queue
 		self.name = environment_name
 		self.options = options or dict()
+		self.supervisor = supervisor
 
 		self.max_restarts = 1
 		self.restarts = 0
@@ -84,6 +94,7 @@ class InstanceProcess:
 			name=self.name,
 			queue=self.queue,
 			options=self.options,
+			supervisor=supervisor,
 		))
 
 		self.__last_state = True
@@ -124,7 +135,11 @@ class InstanceProcess:
 		"""
 		Start the process.
 		"""
-		return self.process.start()
+		result = self.process.start()
+		# The process has its own end of the supervisor pipe now.
+		if self.supervisor is not None:
+			self.supervisor.close()
+		return result
 
 	def shutdown(self):
 		"""
@@ -136,6 +151,18 @@ class InstanceProcess:
 			pass
 		return None
 
+	def kill(self, timeout=5):
+		"""
+		Terminate the process and wait for it, kill the process when it didn't exit within the timeout.
+
+		:param timeout: Seconds to wait after terminating.
+		"""
+		self.shutdown()
+		self.process.join(timeout=timeout)
+		if self.process.is_alive() and hasattr(self.process, 'kill'):
+			self.process.kill()
+			self.process.join(timeout=timeout)
+
 	def graceful(self):
 		"""
 		Graceful shutdown the process.
@@ -0,0 +1,262 @@
+"""
+The supervisor is the health channel between the instance processes and the god process. Every instance sends a
+heartbeat with its health metrics over a pipe, the god process aggregates the heartbeats, restarts the instances that
+stopped responding and can serve the aggregate on a local status endpoint.
+"""
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from multiprocessing.connection import wait
+
+logger = logging.getLogger(__name__)
+
+
+def get_rss():
+	"""
+	Get the resident set size (memory usage) of the current process.
+
+	:return: Bytes or None when unknown.
+	:rtype: int
+	"""
+	try:
+		with open('/proc/self/statm', 'r') as statm:
+			return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+	except (OSError, ValueError, IndexError, AttributeError):
+		pass
+	try:
+		import resource
+		# Peak usage in kilobytes (Linux), only used when the current usage is unknown.
+		return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+	except ImportError:  # pragma: no cover
+		return None
+
+
+class Heartbeat:
+	"""
+	Heartbeat of the instance process, sends the health metrics to the god process every ``interval`` seconds:
+
+	- ``lag``: Seconds the event loop was late to run the heartbeat callback.
+	- ``callbacks_per_second``: Callbacks received from the dedicated server per second since the last heartbeat.
+	- ``rss``: Resident set size (memory) in bytes.
+	- ``tasks``: Amount of open (not done) tasks on the event loop.
+
+	A blocked event loop doesn't send heartbeats, which is noticed by the god process.
+	"""
+
+	def __init__(self, instance, connection, interval=5):
+		"""
+		Initiate the heartbeat.
+
+		:param instance: Instance.
+		:param connection: Sending end of the supervisor pipe.
+		:param interval: Seconds between the heartbeats.
+		:type instance: pyplanet.core.instance.Instance
+		:type connection: multiprocessing.connection.Connection
+		"""
+		self.instance = instance
+		self.connection = connection
+		self.interval = interval
+
+		self._expected = None
+		self._last_beat = None
+		self._last_callbacks = 0
+
+	def start(self):
+		self._last_beat = time.monotonic()
+		self._expected = self._last_beat + self.interval
+		self.instance.loop.call_later(self.interval, self.beat)
+
+	def beat(self):
+		now = time.monotonic()
+		lag = max(now - self._expected, 0.0)
+
+		callbacks = getattr(self.instance.gbx, 'callbacks_received', 0)
+		elapsed = now - self._last_beat
+		callbacks_per_second = (callbacks - self._last_callbacks) / elapsed if elapsed > 0 else 0.0
+		self._last_beat = now
+		self._last_callbacks = callbacks
+
+		try:
+			self.connection.send(dict(
+				pid=os.getpid(),
+				lag=lag,
+				callbacks=callbacks,
+				callbacks_per_second=callbacks_per_second,
+				rss=get_rss(),
+				tasks=self.get_task_count(),
+			))
+		except (OSError, EOFError):
+			# The god process is gone, stop beating.
+			logger.warning('Supervisor pipe has been closed, stopping the heartbeat.')
+			return
+
+		self._expected = now + self.interval
+		self.instance.loop.call_later(self.interval, self.beat)
+
+	def get_task_count(self):
+		loop = self.instance.loop
+		if hasattr(asyncio, 'all_tasks'):
+			tasks = asyncio.all_tasks(loop)
+		else:  # pragma: no cover
+			tasks = asyncio.Task.all_tasks(loop)
+		return sum(1 for task in tasks if not task.done())
+
+
+class Supervisor:
+	"""
+	The supervisor collects the heartbeats of the instances in the god process.
+
+	An instance is hung when it didn't send a heartbeat, or reported an event loop lag, for more than ``lag_threshold``
+	seconds. Instances are only checked after their first heartbeat.
+	"""
+
+	def __init__(self, interval=5, lag_threshold=0):
+		"""
+		Initiate the supervisor.
+
+		:param interval: Seconds between the heartbeats of the instances.
+		:param lag_threshold: Seconds of lag (or silence) after which the instance is hung. 0 or None to disable (default).
+		"""
+		self.interval = interval
+		self.lag_threshold = lag_threshold
+
+		self.connections = dict()
+		self.heartbeats = dict()
+		self.server = None
+
+		self._lock = threading.Lock()
+
+	def register(self, name):
+		"""
+		Register a (new) process of the instance, the former process channel is closed.
+
+		:param name: Name of the instance.
+		:return: Sending end of the pipe, for the instance process.
+		:rtype: multiprocessing.connection.Connection
+		"""
+		self.unregister(name)
+		receiver, sender = multiprocessing.Pipe(duplex=False)
+		self.connections[name] = receiver
+		return sender
+
+	def unregister(self, name):
+		connection = self.connections.pop(name, None)
+		if connection is not None:
+			connection.close()
+		with self._lock:
+			self.heartbeats.pop(name, None)
+
+	def poll(self, timeout=None):
+		"""
+		Wait (at most the timeout) for heartbeats and receive them.
+
+		:param timeout: Seconds to wait, None to wait until a heartbeat arrives.
+		"""
+		names = dict((connection, name) for name, connection in self.connections.items())
+		if not names:
+			time.sleep(timeout or 0)
+			return
+
+		for connection in wait(list(names.keys()), timeout):
+			name = names[connection]
+			try:
+				while connection.poll():
+					self.receive(name, connection.recv())
+			except (OSError, EOFError):
+				# The process exited, the death of the process is handled by the watchdog.
+				self.unregister(name)
+
+	def receive(self, name, heartbeat):
+		heartbeat['received_at'] = time.time()
+		heartbeat['received'] = time.monotonic()
+		with self._lock:
+			former = self.heartbeats.get(name)
+			heartbeat['max_lag'] = max(heartbeat['lag'], former['max_lag'] if former else 0.0)
+			self.heartbeats[name] = heartbeat
+
+	def get_hung(self):
+		"""
+		Get the names of the hung instances.
+
+		:return: List with names.
+		:rtype: list
+		"""
+		if not self.lag_threshold:
+			return list()
+
+		now = time.monotonic()
+		hung = list()
+		with self._lock:
+			for name, heartbeat in self.heartbeats.items():
+				silence = now - heartbeat['received'] - self.interval
+				if silence > self.lag_threshold or heartbeat['lag'] > self.lag_threshold:
+					hung.append(name)
+		return hung
+
+	def status(self):
+		"""
+		Get the aggregated status of all instances.
+
+		:return: Dictionary with the status per instance and the totals.
+		:rtype: dict
+		"""
+		now = time.monotonic()
+		with self._lock:
+			instances = dict()
+			for name, heartbeat in self.heartbeats.items():
+				instance = dict((key, value) for key, value in heartbeat.items() if key != 'received')
+				instance['age'] = now - heartbeat['received']
+				instances[name] = instance
+
+		return dict(
+			instances=instances,
+			total=dict(
+				instances=len(instances),
+				rss=sum(instance['rss'] or 0 for instance in instances.values()),
+				tasks=sum(instance['tasks'] for instance in instances.values()),
+				callbacks_per_second=sum(instance['callbacks_per_second'] for instance in instances.values()),
+				max_lag=max((instance['lag'] for instance in instances.values()), default=0.0),
+			),
+			lag_threshold=self.lag_threshold,
+			interval=self.interval,
+		)
+
+	def serve(self, port, host='127.0.0.1'):
+		"""
+		Serve the aggregated status as JSON over HTTP, in a background thread.
+
+		:param port: Port to listen on.
+		:param host: Host to listen on, local only by default.
+		"""
+		supervisor = self
+
+		class StatusHandler(BaseHTTPRequestHandler):
+			def do_GET(self):
+				body = json.dumps(supervisor.status()).encode('utf-8')
+				self.send_response(200)
+				self.send_header('Content-Type', 'application/json')
+				self.send_header('Content-Length', str(len(body)))
+				self.end_headers()
+				self.wfile.write(body)
+
+			def log_message(self, *args):
+				pass
+
+		self.server = HTTPServer((host, port), StatusHandler)
+		thread = threading.Thread(target=self.server.serve_forever, name='supervisor-status', daemon=True)
+		thread.start()
+		logger.info('Serving the instance status on http://{}:{}/'.format(host, self.server.server_port))
+
+	def close(self):
+		if self.server:
+			self.server.shutdown()
+			self.server.server_close()
+			self.server = None
+		for name in list(self.connections.keys()):
+			self.unregister(name)
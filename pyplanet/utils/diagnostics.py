@@ -0,0 +1,305 @@
+"""
+Runtime diagnostics of the event loop. The monitor measures the event loop lag continuously and traces the callbacks
+(and task steps) that block the event loop for longer than the threshold, to find out which app is slowing down the
+controller.
+"""
+import asyncio
+import collections
+import logging
+import sys
+import sysconfig
+import threading
+import time
+import traceback
+
+from pyplanet.core.events.dispatcher import Signal, current_signal
+from pyplanet.core.events.timing import LatencyHistogram, receiver_name
+
+logger = logging.getLogger(__name__)
+
+STDLIB_PATH = sysconfig.get_paths()['stdlib']
+
+
+class _LoopMonitor:
+	"""
+	The loop monitor is started from the instance and consists of:
+
+	- A probe that is scheduled every ``PROBE_INTERVAL`` seconds and measures how late it's executed (the lag).
+	- A tracer of the callbacks that run longer than the threshold, with the coroutine, the signal being processed and
+	  a stack sample, taken by a sampler thread while the callback blocks the loop.
+	- A periodic summary in the log.
+	"""
+	PROBE_INTERVAL = 0.5
+	MAX_SLOW_CALLBACKS = 50
+
+	def __init__(self):
+		self.instance = None
+		self.loop = None
+		self.threshold = 0.1
+		self.summary_interval = 300
+
+		self.lag = LatencyHistogram('event_loop_lag')
+		self.last_lag = 0.0
+		self.slow_callbacks = collections.deque(maxlen=self.MAX_SLOW_CALLBACKS)
+		self.offenders = dict()
+
+		self._running = None
+		self._sample = None
+		self._original_run = None
+		self._loop_thread = None
+		self._sampler = None
+		self._stopped = threading.Event()
+		self._expected = None
+
+	@property
+	def is_started(self):
+		return self._original_run is not None
+
+	def start(self, instance=None, threshold=None, summary_interval=None):
+		"""
+		Start the monitor on the event loop of the instance (or the current event loop).
+
+		:param instance: Instance, to report the pending payloads of the dedicated server connection.
+		:param threshold: Seconds a callback may block the event loop before it's traced. 0 to disable the tracing.
+		:param summary_interval: Seconds between the summaries in the log. 0 to disable the summaries.
+		:type instance: pyplanet.core.instance.Instance
+		"""
+		if self.is_started:
+			return
+
+		self.instance = instance
+		self.loop = instance.loop if instance else asyncio.get_event_loop()
+		if threshold is not None:
+			self.threshold = threshold
+		if summary_interval is not None:
+			self.summary_interval = summary_interval
+
+		self._expected = time.monotonic() + self.PROBE_INTERVAL
+		self.loop.call_later(self.PROBE_INTERVAL, self.probe)
+		if self.summary_interval:
+			self.loop.call_later(self.summary_interval, self.log_summary)
+
+		self._original_run = asyncio.events.Handle._run
+		if self.threshold:
+			self._loop_thread = threading.get_ident()
+			self._stopped.clear()
+			self._sampler = threading.Thread(target=self._sample_loop, name='diagnostics-sampler', daemon=True)
+			self._sampler.start()
+
+			monitor = self
+			original_run = self._original_run
+			perf_counter = time.perf_counter
+
+			def _run(handle):
+				start = perf_counter()
+				running = monitor._running = (handle, start)
+				try:
+					original_run(handle)
+				finally:
+					monitor._running = None
+					duration = perf_counter() - start
+					if duration >= monitor.threshold:
+						monitor.record(running, duration)
+			asyncio.events.Handle._run = _run
+
+	def stop(self):
+		if not self.is_started:
+			return
+		asyncio.events.Handle._run = self._original_run
+		self._original_run = None
+		self._stopped.set()
+		self._sampler = None
+
+	def probe(self):
+		now = time.monotonic()
+		self.last_lag = max(now - self._expected, 0.0)
+		self.lag.add(self.last_lag)
+
+		if self.is_started:
+			self._expected = now + self.PROBE_INTERVAL
+			self.loop.call_later(self.PROBE_INTERVAL, self.probe)
+
+	def record(self, running, duration):
+		"""
+		Record a slow callback.
+
+		:param running: Tuple with the handle and the start time.
+		:param duration: Seconds the callback was running.
+		"""
+		handle = running[0]
+		name, location = self.describe(handle)
+		signal = self.get_signal(handle)
+
+		stack = None
+		sample = self._sample
+		if sample and sample[0] is running:
+			stack = sample[1]
+			location = self.get_location(stack) or location
+			# The signal can be finished (and unmarked) at the end of the callback, the sample was taken while blocking.
+			signal = signal or sample[2]
+
+		self.slow_callbacks.append(dict(
+			time=time.time(), duration=duration, name=name, signal=signal, location=location, stack=stack,
+		))
+
+		key = (name, signal)
+		if key not in self.offenders:
+			self.offenders[key] = LatencyHistogram(name)
+		self.offenders[key].add(duration)
+
+		logger.debug('Callback {} blocked the event loop for {:.3f}s (signal: {}, at: {})'.format(
+			name, duration, signal, location
+		))
+
+	@staticmethod
+	def describe(handle):
+		"""
+		Get the name and source location of the callback of the handle. For task steps this is the coroutine of the task,
+		or the receiver for signal receivers.
+
+		:param handle: Event loop handle.
+		:return: Tuple with the name and location.
+		"""
+		callback = getattr(handle, '_callback', None)
+		task = getattr(callback, '__self__', None)
+		if isinstance(task, asyncio.Task):
+			coro = task.get_coro() if hasattr(task, 'get_coro') else task._coro
+			frame = getattr(coro, 'cr_frame', None)
+			if frame is not None and frame.f_code is Signal.execute_receiver.__code__ and 'receiver' in frame.f_locals:
+				receiver = frame.f_locals['receiver']
+				code = getattr(receiver, '__code__', None)
+				return receiver_name(receiver), '{}:{}'.format(code.co_filename, code.co_firstlineno) if code else None
+
+			code = getattr(coro, 'cr_code', None) or getattr(coro, 'gi_code', None)
+			name = getattr(coro, '__qualname__', None) or repr(coro)
+			return name, '{}:{}'.format(code.co_filename, code.co_firstlineno) if code else None
+
+		code = getattr(callback, '__code__', None)
+		return receiver_name(callback), '{}:{}'.format(code.co_filename, code.co_firstlineno) if code else None
+
+	@staticmethod
+	def get_signal(handle):
+		context = getattr(handle, '_context', None)
+		if context is None or current_signal is None:
+			return None
+		signal = context.get(current_signal)
+		if signal is None:
+			return None
+		return '{}:{}'.format(signal.namespace, signal.code)
+
+	@staticmethod
+	def get_location(stack):
+		# The innermost frame that isn't part of the standard library, mostly the app code that blocks the loop.
+		for frame in reversed(stack):
+			if not frame.filename.startswith(STDLIB_PATH) and frame.filename != __file__:
+				return '{}:{}'.format(frame.filename, frame.lineno)
+		return None
+
+	def _sample_loop(self):
+		interval = max(self.threshold / 2, 0.01)
+		while not self._stopped.wait(interval):
+			running = self._running
+			if running is None or (self._sample and self._sample[0] is running):
+				continue
+			if time.perf_counter() - running[1] < self.threshold:
+				continue
+			frame = sys._current_frames().get(self._loop_thread)
+			if frame is None:
+				continue
+			try:
+				self._sample = (running, traceback.extract_stack(frame, limit=30), self.get_signal(running[0]))
+			except Exception:  # pragma: no cover
+				pass
+
+	def get_payloads(self):
+		gbx = getattr(self.instance, 'gbx', None)
+		return getattr(gbx, 'payloads_pending', 0), getattr(gbx, 'payloads_pending_peak', 0)
+
+	def summary(self):
+		"""
+		Get the summary of the diagnostics since the last summary.
+
+		:return: Dictionary with the lag statistics, the pending payload tasks and the slow callbacks.
+		:rtype: dict
+		"""
+		pending, pending_peak = self.get_payloads()
+		offenders = sorted(self.offenders.items(), key=lambda item: item[1].total, reverse=True)
+		return dict(
+			lag=dict(
+				last=self.last_lag,
+				avg=self.lag.total / self.lag.count if self.lag.count else 0.0,
+				p95=self.lag.percentile(95),
+				max=self.lag.max,
+			),
+			payloads_pending=pending,
+			payloads_pending_peak=pending_peak,
+			slow_callbacks=sum(histogram.count for histogram in self.offenders.values()),
+			offenders=[
+				dict(name=name, signal=signal, count=histogram.count, total=histogram.total, max=histogram.max)
+				for (name, signal), histogram in offenders
+			],
+		)
+
+	def format_summary(self, limit=3):
+		"""
+		Format the summary into a single line.
+
+		:param limit: Amount of offenders to include.
+		:return: Summary.
+		:rtype: str
+		"""
+		summary = self.summary()
+		message = (
+			'Event loop lag: {last:.3f}s (avg {avg:.3f}s, p95 {p95:.3f}s, max {max:.3f}s), '
+			.format(**summary['lag'])
+		)
+		message += 'pending payloads: {} (peak {}), slow callbacks: {}'.format(
+			summary['payloads_pending'], summary['payloads_pending_peak'], summary['slow_callbacks']
+		)
+		if summary['offenders']:
+			message += ', slowest: ' + ', '.join(
+				'{} ({}x, max {:.3f}s{})'.format(
+					offender['name'], offender['count'], offender['max'],
+					', {}'.format(offender['signal']) if offender['signal'] else '',
+				)
+				for offender in summary['offenders'][:limit]
+			)
+		return message
+
+	def format_report(self):
+		"""
+		Format the report with the summary and the recent slow callbacks, including the stack samples.
+
+		:return: Report.
+		:rtype: str
+		"""
+		lines = [self.format_summary(limit=10)]
+		for entry in self.slow_callbacks:
+			lines.append('{} blocked the event loop for {:.3f}s at {} (signal: {}, location: {})'.format(
+				entry['name'], entry['duration'], time.strftime('%H:%M:%S', time.localtime(entry['time'])),
+				entry['signal'], entry['location'],
+			))
+			if entry['stack']:
+				lines.extend(line.rstrip() for line in traceback.format_list(entry['stack']))
+		return '\n'.join(lines)
+
+	def reset(self):
+		self.lag.reset()
+		self.offenders.clear()
+		gbx = getattr(self.instance, 'gbx', None)
+		if gbx is not None:
+			gbx.payloads_pending_peak = gbx.payloads_pending
+
+	def log_summary(self):
+		if not self.is_started:
+			return
+		self.loop.call_later(self.summary_interval, self.log_summary)
+
+		if self.offenders:
+			logger.warning(self.format_summary())
+		else:
+			logger.info(self.format_summary())
+		self.reset()
+
+
+monitor = _LoopMonitor()
@@ -0,0 +1,116 @@
+"""
+The frame is the column oriented representation of the data of the :class:`pyplanet.views.generics.list.ManualListView`.
+"""
+from pyplanet.utils import style
+
+
+class Frame:
+	"""
+	Column oriented frame of the rows of a manual list.
+
+	The search columns (lowercase and optionally style stripped) and the sort permutations are computed once, the first
+	time they are needed, and cached for the lifetime of the frame. When the search text extends the previous search text,
+	only the rows of the previous result are searched again.
+	"""
+
+	def __init__(self, rows):
+		"""
+		Initiate the frame.
+
+		:param rows: List with dictionaries.
+		"""
+		self.rows = rows
+		self.size = len(rows)
+
+		self._search_columns = dict()
+		self._sort_permutations = dict()
+		self._last_search = None
+
+	def is_frame_of(self, rows):
+		"""
+		Check if the frame is (still) the frame of the given rows.
+
+		:param rows: List with dictionaries.
+		:return: Boolean.
+		"""
+		return rows is self.rows and len(rows) == self.size
+
+	def get_search_column(self, index, strip_styles=False):
+		"""
+		Get the lowercase (and optionally style stripped) values of the column. Empty values are None.
+
+		:param index: Index of the column.
+		:param strip_styles: Strip the styles of the values.
+		:return: List with the values.
+		"""
+		key = (index, bool(strip_styles))
+		if key not in self._search_columns:
+			if strip_styles:
+				column = [style.style_strip(str(row[index]).lower()) if row[index] else None for row in self.rows]
+			else:
+				column = [str(row[index]).lower() if row[index] else None for row in self.rows]
+			self._search_columns[key] = column
+		return self._search_columns[key]
+
+	def search(self, text, columns):
+		"""
+		Get the positions of the rows where one of the columns contains the text.
+
+		:param text: Search text.
+		:param columns: List with tuples of the column index and whether to strip the styles.
+		:return: List with the positions of the matching rows, in order.
+		"""
+		text = text.lower()
+		columns = tuple((index, bool(strip_styles)) for index, strip_styles in columns)
+
+		# Narrow the previous result when the new text contains the previous text.
+		candidates = range(self.size)
+		if self._last_search:
+			last_text, last_columns, last_positions = self._last_search
+			if last_columns == columns and last_text in text:
+				candidates = last_positions
+
+		values = [self.get_search_column(index, strip_styles) for index, strip_styles in columns]
+		positions = [
+			position for position in candidates
+			if any(column[position] is not None and text in column[position] for column in values)
+		]
+		self._last_search = (text, columns, positions)
+		return positions
+
+	def get_sort_permutation(self, index, reverse=False):
+		"""
+		Get the positions of all rows, sorted on the column. Empty (None) values are sorted last (or first when reversed).
+
+		:param index: Index of the column.
+		:param reverse: Sort descending.
+		:return: List with the positions.
+		"""
+		key = (index, bool(reverse))
+		if key not in self._sort_permutations:
+			self._sort_permutations[key] = sorted(
+				range(self.size), key=lambda p: (self.rows[p][index] is None, self.rows[p][index]), reverse=bool(reverse)
+			)
+		return self._sort_permutations[key]
+
+	def select(self, positions=None, sort_index=None, reverse=False):
+		"""
+		Get the rows on the positions, optionally sorted on a column.
+
+		:param positions: Positions of the rows (in order), or None for all rows.
+		:param sort_index: Index of the column to sort on, or None to keep the order.
+		:param reverse: Sort descending.
+		:return: List with the rows.
+		"""
+		if sort_index is None:
+			if positions is None:
+				return list(self.rows)
+			return [self.rows[p] for p in positions]
+
+		permutation = self.get_sort_permutation(sort_index, reverse)
+		if positions is None:
+			return [self.rows[p] for p in permutation]
+		mask = bytearray(self.size)
+		for p in positions:
+			mask[p] = 1
+		return [self.rows[p] for p in permutation if mask[p]]
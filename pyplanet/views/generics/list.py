@@ -1,14 +1,15 @@
+import collections
 import math
 import re
 import logging
+import time
 
 from asyncio import iscoroutinefunction
 from peewee import Field
 
-from pyplanet.utils import style
-
 from pyplanet.apps.core.maniaplanet.models import Player
 from pyplanet.core.db import Model
+from pyplanet.views.generics.frame import Frame
 from pyplanet.views.template import TemplateView
 
 logger = logging.getLogger(__name__)
@@ -53,10 +54,28 @@ class ListView(TemplateView):
 			async def action_delete(self, player, values, instance, **kwargs):
 				print('Delete value: {}'.format(instance))
 
+	For large tables, set ``pagination`` to ``'keyset'``. The pages are then fetched by seeking from the last row of the
+	previous page (on the sort column and the primary key) instead of using ``OFFSET``. Jumps to pages that were not
+	visited yet fall back to ``OFFSET``. The keyset pagination requires the sort columns to be non-nullable.
+
+	The total count is cached for ``count_cache_ttl`` seconds, and invalidated when the model is written.
+
+	The searchable fields use ``LIKE '%text%'`` by default. Set ``'search_mode': 'prefix'`` on the field to use
+	``LIKE 'text%'`` (which can use an index), or give a callable that receives the model field and the search text and
+	returns the expression (for example a full-text ``MATCH`` on a full-text index).
 	"""
 	query = None
 	model = None
 
+	pagination = 'offset'
+	"""Pagination mode of the list, ``offset`` or ``keyset``."""
+
+	count_cache_ttl = 30
+	"""Seconds the total count of the query is cached. Set to 0 to disable."""
+
+	_count_cache = collections.OrderedDict()
+	_count_cache_size = 256
+
 	title = None
 	icon_style = None
 	icon_substyle = None
@@ -80,6 +99,10 @@ class ListView(TemplateView):
 		self.count = 0
 		self.objects = list()
 
+		# The keyset cursors (last row of every visited page) and the state they belong to.
+		self._cursors = dict()
+		self._cursors_state = None
+
 		self.num_per_page = 20
 
 		self.provide_search = True
@@ -276,27 +299,127 @@ class ListView(TemplateView):
 	async def apply_filter(self, query):
 		if not self.search_text:
 			return query
-		for field in self.fields:
+		for field in await self.get_fields():
 			if 'searching' in field and field['searching']:
-				query = query.orwhere(getattr(self.model, field['index']).contains(self.search_text))
+				column = getattr(self.model, field['index'])
+				search_mode = field.get('search_mode', 'contains')
+				if callable(search_mode):
+					query = query.orwhere(search_mode(column, self.search_text))
+				elif search_mode == 'prefix':
+					query = query.orwhere(column.startswith(self.search_text))
+				else:
+					query = query.orwhere(column.contains(self.search_text))
 		return query
 
+	def get_sort_column(self):
+		"""
+		Get the model field of the current sorting.
+
+		:return: Model field or None.
+		"""
+		if isinstance(self.sort_field, Field):
+			return self.sort_field
+		if isinstance(self.sort_field, dict) and self.model is not None:
+			column = getattr(self.model, self.sort_field['index'], None)
+			if isinstance(column, Field):
+				return column
+		return None
+
 	async def apply_ordering(self, query):
+		column = self.get_sort_column()
+		if self.pagination == 'keyset':
+			# The primary key makes the ordering unique, needed to seek.
+			primary_key = self.model._meta.primary_key
+			if column is None:
+				return query.order_by(primary_key)
+			if self.sort_order:
+				return query.order_by(column, primary_key)
+			return query.order_by(-column, -primary_key)
+
+		if column is not None:
+			return query.order_by(column if self.sort_order else -column)
 		if not self.order:
 			return query
 		return query.order_by(self.order)
 
+	async def get_count(self, query):
+		"""
+		Get the total count of the (filtered) query. The count is cached for ``count_cache_ttl`` seconds and until the
+		model is written.
+
+		:param query: Query.
+		:return: Count.
+		:rtype: int
+		"""
+		if not self.count_cache_ttl:
+			return await self.model.objects.count(query)
+
+		sql, params = query.sql()
+		key = (self.model, sql, tuple(params))
+		cached = self._count_cache.get(key)
+		if cached and cached[1] == self.model.get_write_version() and time.monotonic() - cached[2] < self.count_cache_ttl:
+			return cached[0]
+
+		count = await self.model.objects.count(query)
+		self._count_cache[key] = (count, self.model.get_write_version(), time.monotonic())
+		self._count_cache.move_to_end(key)
+		while len(self._count_cache) > self._count_cache_size:
+			self._count_cache.popitem(last=False)
+		return count
+
 	async def apply_pagination(self, query):
 		# Get count before pagination.
-		self.count = await self.model.objects.count(query)
+		self.count = await self.get_count(query)
+
+		if self.pagination == 'keyset':
+			if self.page == 1:
+				return query.limit(self.num_per_page)
+			if self.page - 1 in self._cursors:
+				return query.where(self.get_seek_expression(*self._cursors[self.page - 1])).limit(self.num_per_page)
 		return query.paginate(self.page, self.num_per_page)
 
+	def get_seek_expression(self, sort_value, primary_key_value):
+		"""
+		Get the expression to seek to the rows after the given row.
+
+		:param sort_value: Value of the sort column of the row.
+		:param primary_key_value: Primary key of the row.
+		:return: Expression.
+		"""
+		column = self.get_sort_column()
+		primary_key = self.model._meta.primary_key
+		if column is None:
+			return primary_key > primary_key_value
+		if self.sort_order:
+			return (column > sort_value) | ((column == sort_value) & (primary_key > primary_key_value))
+		return (column < sort_value) | ((column == sort_value) & (primary_key < primary_key_value))
+
+	def _check_cursors(self):
+		# The cursors are only valid for the same search and sorting.
+		column = self.get_sort_column()
+		state = (self.search_text, column.name if column is not None else None, self.sort_order)
+		if state != self._cursors_state:
+			self._cursors = dict()
+			self._cursors_state = state
+
+	def _remember_cursor(self):
+		if not self.objects:
+			return
+		last = self.objects[-1]
+		column = self.get_sort_column()
+		self._cursors[self.page] = (getattr(last, column.name) if column is not None else None, last._get_pk_value())
+
 	async def get_object_data(self):
+		if self.pagination == 'keyset':
+			self._check_cursors()
+
 		query = await self.get_query()
 		query = await self.apply_filter(query)
 		query = await self.apply_ordering(query)
 		query = await self.apply_pagination(query)
 		self.objects = list(await self.model.execute(query))
+		if self.pagination == 'keyset':
+			self._remember_cursor()
 		return {
 			'objects': self.objects,
 			'search': self.search_text,
@@ -423,6 +546,7 @@ class ManualListView(ListView):
 	def __init__(self, data=None, *args, **kwargs):
 		super().__init__(*args, **kwargs)
 		self.objects_raw = data
+		self._frame = None
 
 	async def get_data(self):
 		"""
@@ -432,13 +556,32 @@ class ManualListView(ListView):
 			raise NotImplementedError
 		return self.objects_raw
 
+	def get_frame(self, data):
+		"""
+		Get the (cached) column oriented frame of the data. The frame is rebuilt when the data is another list or its size
+		changed. Call :meth:`reset_frame` after changing the rows in place.
+
+		:param data: Data returned by :meth:`get_data`.
+		:return: Frame.
+		:rtype: pyplanet.views.generics.frame.Frame
+		"""
+		if self._frame is None or not self._frame.is_frame_of(data):
+			self._frame = Frame(data)
+		return self._frame
+
+	def reset_frame(self):
+		"""
+		Drop the cached frame, the search columns and sort orders are computed again on the next display.
+		"""
+		self._frame = None
+
 	async def get_object_data(self):
-		frame = await self.get_data()
-		frame = await self.apply_filter(frame)
-		frame = await self.apply_ordering(frame)
-		self.count = len(frame)
-		frame = await self.apply_pagination(frame)
-		self.objects = frame
+		frame = self.get_frame(await self.get_data())
+		positions = await self.apply_filter(frame)
+		rows = await self.apply_ordering(frame, positions)
+		self.count = len(rows)
+		rows = await self.apply_pagination(rows)
+		self.objects = rows
 		return {
 			'objects': self.objects,
 			'search': self.search_text,
@@ -447,28 +590,33 @@ class ManualListView(ListView):
 		}
 
 	async def apply_filter(self, frame):
+		"""
+		Search the frame.
+
+		:param frame: Frame.
+		:return: Positions of the matching rows, or None for all rows.
+		"""
 		if not self.search_text:
-			return frame
-		query = list()
-		for field in await self.get_fields():
-			if 'searching' in field and field['searching']:
-				if 'search_strip_styles' in field and field['search_strip_styles']:
-					query.append(
-						[self.search_text.lower() in style.style_strip(str(x).lower()) if x else False for x in (x[field['index']] for x in frame)]
-					)
-				else:
-					query.append(
-						[self.search_text.lower() in str(x).lower() if x else False for x in (x[field['index']] for x in frame)]
-					)
-		if query:
-			query = [any(e) for e in zip(*query)]
-			return [e for i, e in enumerate(frame) if query[i]]
-		return frame
-
-	async def apply_ordering(self, frame):
+			return None
+		columns = [
+			(field['index'], field.get('search_strip_styles', False))
+			for field in await self.get_fields() if field.get('searching')
+		]
+		if not columns:
+			return None
+		return frame.search(self.search_text, columns)
+
+	async def apply_ordering(self, frame, positions=None):
+		"""
+		Get the rows of the frame in the current ordering.
+
+		:param frame: Frame.
+		:param positions: Positions of the matching rows, or None for all rows.
+		:return: List with the rows.
+		"""
 		if self.sort_field:
-			frame = sorted(frame, key=lambda e: (e[self.sort_field['index']] is None, e[self.sort_field['index']]), reverse=not bool(self.sort_order))
-		return frame
+			return frame.select(positions, self.sort_field['index'], reverse=not bool(self.sort_order))
+		return frame.select(positions)
 
 	async def apply_pagination(self, frame):
 		return frame[(self.page - 1) * self.num_per_page:self.page * self.num_per_page]
@@ -1,6 +1,8 @@
 import asyncio
 import logging
 
+from markupsafe import Markup
+
 from pyplanet.apps.core.maniaplanet.models import Player
 from pyplanet.core import Controller
 from pyplanet.core.ui.template import load_template
@@ -23,6 +25,10 @@ class TemplateView(View):
 										Return dict with the data dict for the specific login (player).
 	:method get_template(): Return the template instance from Jinja2. You mostly should not override this method.
 
+	Views with player specific data can use the fragment rendering mode by setting ``fragment_template_name``. The main
+	template is rendered once with the global context data and should contain ``{{ player_fragment }}`` at the place of
+	the player specific part. Only the (small) fragment template is rendered for every player, with the player data.
+
 	As alternative you can manipulate the instance.data and instance.player_data too.
 
 	**Properties that are useful to change**:
@@ -31,6 +37,7 @@ class TemplateView(View):
 	:prop player_data: Player context data. Dict with player as key.
 	:prop hide_click: Should the manialink disappear after clicking a button/text.
 	:prop timeout: Timeout to hide manialink in seconds.
+	:prop fragment_template_name: Template name of the player fragment, None to render the whole template per player.
 
 	**Example usage:**
 
@@ -55,6 +62,9 @@ class TemplateView(View):
 	"""
 
 	template_name = None
+	fragment_template_name = None
+
+	FRAGMENT_MARKER = '<!--pyplanet:player_fragment-->'
 
 	async def get_context_data(self):
 		"""
@@ -105,12 +115,47 @@ class TemplateView(View):
 		:param player_login: Render data only for player, set to None to globally render (and ignore player_data).
 		:return: Body, rendered manialink + script.
 		"""
+		if self.fragment_template_name:
+			return (await self.render_many([player_login], **kwargs))[0]
+
 		kwargs['data'] = await self.get_context_data()
 		kwargs['player_login'] = player_login
 		kwargs['player_data'] = self.player_data # Should already been read by display().
 		kwargs['template'] = await self.get_template()
 		return await super().render(*args, **kwargs)
 
+	async def render_many(self, player_logins, **kwargs):
+		"""
+		Render template for multiple players. The context data and template are only retrieved once for all players.
+
+		:param player_logins: List with player logins to render for.
+		:return: List with the bodies, in order of the player logins.
+		"""
+		kwargs['data'] = await self.get_context_data()
+		kwargs['player_data'] = self.player_data
+		kwargs['template'] = await self.get_template()
+		if self.fragment_template_name:
+			return await self.render_fragments(player_logins, **kwargs)
+		return await super().render_many(player_logins, **kwargs)
+
+	async def render_fragments(self, player_logins, data=None, player_data=None, template=None):
+		"""
+		Render the main template once and only the fragment template for every player.
+
+		:param player_logins: List with player logins to render for.
+		:return: List with the bodies, in order of the player logins.
+		"""
+		template, player_data = await self._prepare_render(data, player_data, template)
+		payload = self.get_render_payload(None, player_data)
+		payload['player_fragment'] = Markup(self.FRAGMENT_MARKER)
+		head, marker, tail = (await template.render(**payload)).partition(self.FRAGMENT_MARKER)
+		if not marker:
+			raise Exception('Template \'{}\' has no player_fragment placeholder!'.format(self.template_name))
+
+		fragment = await load_template(self.fragment_template_name)
+		fragments = await fragment.render_many([self.get_render_payload(login, player_data) for login in player_logins])
+		return [head + body + tail for body in fragments]
+
 	async def display(self, player_logins=None, **kwargs):
 		"""
 		Display the manialink. Will also render if no body is given. Will show per player or global. depending on
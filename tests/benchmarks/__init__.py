@@ -0,0 +1,4 @@
+"""
+Micro-benchmarks for the hot paths of PyPlanet. These are not collected as tests, run them directly, for example:
+``python -m tests.benchmarks.gbx_codec``.
+"""
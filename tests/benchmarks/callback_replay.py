@@ -0,0 +1,82 @@
+"""
+Replay the recorded script callbacks of a 100 player map (``fixtures/script_callbacks.json``) through the fake dedicated
+server to a GBX client, and report the throughput and latency per callback, the bytes sent and the allocations.
+
+The fixture is converted into a synthetic recording first (one callback every 10ms). The receivers only count the
+callbacks, so the benchmark measures the transport, the decoding and the dispatching. Use the ``replay`` management
+command to replay a real recording against a complete instance with the apps.
+
+Usage: python -m tests.benchmarks.callback_replay [speed|max] [--allocations]
+"""
+import asyncio
+import json
+import os
+import sys
+import tempfile
+
+from xmlrpc.client import dumps
+
+from pyplanet.core.events.dispatcher import Signal
+from pyplanet.core.events.manager import SignalManager
+from pyplanet.core.gbx.recorder import KIND_CALLBACK, Recorder, read_recording
+from pyplanet.core.gbx.remote import GbxRemote
+from pyplanet.core.gbx.replay import FakeServer, ReplayHarness, format_report
+
+FIXTURE = os.path.join(os.path.dirname(__file__), 'fixtures', 'script_callbacks.json')
+
+
+def create_recording(path, interval=0.01):
+	with open(FIXTURE) as fixture:
+		events = json.load(fixture)
+
+	recorder = Recorder(path).open()
+	for idx, (method, raw) in enumerate(events):
+		body = dumps((method, raw), 'ManiaPlanet.ModeScriptCallbackArray').encode('utf-8')
+		recorder.record(KIND_CALLBACK, 0, body, seconds=idx * interval)
+	recorder.close()
+	return set(method for method, _ in events)
+
+
+async def replay(path, methods, speed, trace_allocations):
+	received = dict()
+
+	async def receiver(*args, **kwargs):
+		received[kwargs.get('signal')] = received.get(kwargs.get('signal'), 0) + 1
+
+	for method in methods:
+		signal = Signal(code='Script.{}'.format(method), namespace='benchmark')
+		signal.register(receiver, weak=False)
+		SignalManager.register_signal(signal, callback=True)
+
+	server = await FakeServer(read_recording(path)).start()
+	client = GbxRemote(server.host, server.port, user='SuperAdmin', password='SuperAdmin')
+	await client.connect()
+	try:
+		report = await ReplayHarness(client, server, speed=speed, trace_allocations=trace_allocations).run()
+	finally:
+		await client.disconnect()
+		await server.close()
+	return report
+
+
+def run(speed=None, trace_allocations=False):
+	with tempfile.TemporaryDirectory() as directory:
+		path = os.path.join(directory, 'script_callbacks.rec')
+		methods = create_recording(path)
+		print('Recording: {} bytes'.format(os.path.getsize(path)))
+
+		loop = asyncio.new_event_loop()
+		asyncio.set_event_loop(loop)
+		try:
+			report = loop.run_until_complete(replay(path, methods, speed, trace_allocations))
+		finally:
+			loop.close()
+	print(format_report(report))
+
+
+if __name__ == '__main__':
+	arguments = [argument for argument in sys.argv[1:] if not argument.startswith('--')]
+	run(
+		speed=None if not arguments or arguments[0] == 'max' else float(arguments[0]),
+		trace_allocations='--allocations' in sys.argv,
+	)
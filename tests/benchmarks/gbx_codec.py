@@ -0,0 +1,55 @@
+"""
+Compare the XML-RPC decoding speed of the standard library codec with the fast-path codec.
+"""
+import json
+import timeit
+
+from xmlrpc.client import dumps
+
+from pyplanet.core.gbx.codec import FastCodec, StdlibCodec
+
+
+def waypoint_payload(nr):
+	return dumps(('Trackmania.Event.WayPoint', [json.dumps(dict(
+		time=123456 + nr, login='player-{}'.format(nr), accountid='00000000-0000-0000-0000-{:012d}'.format(nr),
+		racetime=34567 + nr, laptime=34567 + nr, stuntsscore=0, checkpointinrace=nr % 20, checkpointinlap=nr % 20,
+		isendrace=False, isendlap=False, isinfinitelaps=False, isindependentlaps=False, curracecheckpoints=list(range(nr % 20)),
+		curlapcheckpoints=list(range(nr % 20)), blockid='#{}'.format(nr), speed=512.123, distance=1024.5,
+	))]), methodname='ManiaPlanet.ModeScriptCallbackArray').encode()
+
+
+def scores_payload(players=100):
+	return dumps(('Trackmania.Scores', [json.dumps(dict(
+		responseid='', section='PreEndRound', useteams=False, winnerteam=-1, winnerplayer='player-1',
+		teams=list(), players=[dict(
+			login='player-{}'.format(nr), accountid='{:036d}'.format(nr), name='$f00Player &amp; {}'.format(nr), team=-1,
+			rank=nr, roundpoints=10, mappoints=nr * 2, matchpoints=nr, bestracetime=50000 + nr,
+			bestracecheckpoints=list(range(20)), bestlaptime=50000 + nr, bestlapcheckpoints=list(range(20)),
+			prevracetime=50000 + nr, prevracecheckpoints=list(range(20)),
+		) for nr in range(players)]
+	))]), methodname='ManiaPlanet.ModeScriptCallbackArray').encode()
+
+
+def run(number=2000):
+	payloads = dict(
+		waypoint=[waypoint_payload(nr) for nr in range(100)],
+		scores=[scores_payload()],
+	)
+	codecs = dict(stdlib=StdlibCodec(), fast=FastCodec())
+
+	for payload_name, bodies in payloads.items():
+		results = dict()
+		for codec_name, codec in codecs.items():
+			def decode():
+				for body in bodies:
+					codec.loads(memoryview(body))
+			total = min(timeit.repeat(decode, number=max(1, number // len(bodies)), repeat=3))
+			results[codec_name] = total / (max(1, number // len(bodies)) * len(bodies)) * 1000000
+
+		print('{:<10} size: {:>8} bytes, stdlib: {:>8.2f} us/frame, fast: {:>8.2f} us/frame, speedup: {:.1f}x'.format(
+			payload_name, len(bodies[0]), results['stdlib'], results['fast'], results['stdlib'] / results['fast']
+		))
+
+
+if __name__ == '__main__':
+	run()
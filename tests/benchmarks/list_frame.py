@@ -0,0 +1,60 @@
+"""
+Measure the searching and sorting of the manual list view frame on a synthetic map list of 20k rows (typing a search
+text and sorting), compared with the former list based implementation.
+"""
+import timeit
+
+from pyplanet.utils import style
+from pyplanet.views.generics.frame import Frame
+
+
+def create_rows(size):
+	return [dict(
+		id=idx, name='$o$fff{}$z Map {}'.format(['Alpha', 'Beta', 'Gamma', 'Delta'][idx % 4], idx),
+		author='Author {}'.format(idx % 300), karma=idx % 101,
+	) for idx in range(size)]
+
+
+def legacy_search(rows, text, columns, sort_index):
+	# The former implementation (one boolean list per column, stripping the styles on every search, full sort).
+	query = list()
+	for index, strip in columns:
+		if strip:
+			query.append([text.lower() in style.style_strip(str(x).lower()) if x else False for x in (x[index] for x in rows)])
+		else:
+			query.append([text.lower() in str(x).lower() if x else False for x in (x[index] for x in rows)])
+	query = [any(e) for e in zip(*query)]
+	rows = [e for i, e in enumerate(rows) if query[i]]
+	return sorted(rows, key=lambda e: (e[sort_index] is None, e[sort_index]))
+
+
+def frame_search(frame, text, columns, sort_index):
+	return frame.select(frame.search(text, columns), sort_index)
+
+
+def run(size=20000, texts=('a', 'al', 'alp', 'alph', 'alpha', 'alpha m', 'alpha map')):
+	rows = create_rows(size)
+	columns = [('name', True), ('author', False)]
+
+	frame = Frame(rows)
+	for text in texts:
+		assert frame_search(frame, text, columns, 'karma') == legacy_search(rows, text, columns, 'karma')
+
+	def typing_frame():
+		frame = Frame(rows)
+		for text in texts:
+			frame_search(frame, text, columns, 'karma')
+
+	def typing_legacy():
+		for text in texts:
+			legacy_search(rows, text, columns, 'karma')
+
+	print('{} rows, {} keystrokes: frame {:>8.1f} ms, legacy {:>8.1f} ms'.format(
+		size, len(texts),
+		min(timeit.repeat(typing_frame, number=1, repeat=3)) * 1000,
+		min(timeit.repeat(typing_legacy, number=1, repeat=3)) * 1000,
+	))
+
+
+if __name__ == '__main__':
+	run()
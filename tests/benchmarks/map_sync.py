@@ -0,0 +1,69 @@
+"""
+Measure the map list synchronisation of the map manager (diff with the known maps and ordering) with synthetic map lists
+of 10k and 50k maps, compared with the former list based implementation.
+"""
+import timeit
+
+from pyplanet.contrib.map.manager import MapManager
+
+
+class FakeMap:
+	def __init__(self, details):
+		self.uid = details['UId']
+		self.file = details['FileName']
+		self.name = details['Name']
+		self.author_nickname = details['AuthorNickname']
+		self.mx_id = None
+
+
+def create_list(size):
+	return [dict(
+		UId='uid{:08d}'.format(idx), FileName='Campaign/Map{}.Map.Gbx'.format(idx), Name='Map {}'.format(idx),
+		Author='author', AuthorNickname='Author', Environnement='Stadium', GoldTime=30000, CopperPrice=100,
+		MapType='Race', MapStyle='',
+	) for idx in range(size)]
+
+
+def legacy_sync(raw_list, maps):
+	# The former implementation (list membership tests, scans and ordering by list index).
+	db_uids = [m.uid for m in maps]
+	diff = [x for x in raw_list if x['UId'] not in db_uids]
+	for existing_map in [m for m in maps if m.author_nickname is None or len(m.author_nickname) == 0]:
+		details = [m for m in raw_list if m['UId'] == existing_map.uid][0]
+		maps = [m for m in maps if m.uid != details['UId']]
+		maps.append(existing_map)
+	ordered_uids = [m['UId'] for m in raw_list]
+	return diff, sorted(set(maps), key=lambda m: ordered_uids.index(m.uid) if m.uid in ordered_uids else -1)
+
+
+def indexed_sync(manager, raw_list, maps):
+	known = dict((m.uid, m) for m in maps)
+	missing, changed = manager._diff_list(raw_list, known)
+	return missing, manager._order_maps(raw_list, known)
+
+
+def run(sizes=(10000, 50000), legacy_limit=10000):
+	manager = MapManager(None)
+
+	for size in sizes:
+		raw_list = create_list(size)
+		# 95% of the maps are known, 1% of the known maps have no author nickname yet.
+		maps = [FakeMap(details) for details in raw_list[:int(size * 0.95)]]
+		for existing_map in maps[::100]:
+			existing_map.author_nickname = None
+
+		missing, ordered = indexed_sync(manager, raw_list, maps)
+		assert len(missing) == size - len(maps) and len(ordered) == len(maps)
+
+		indexed = min(timeit.repeat(lambda: indexed_sync(manager, raw_list, maps), number=1, repeat=3))
+		if size <= legacy_limit:
+			legacy_missing, legacy_ordered = legacy_sync(raw_list, maps)
+			assert [m.uid for m in legacy_ordered] == [m.uid for m in ordered] and legacy_missing == missing
+			legacy = '{:>10.1f} ms'.format(timeit.timeit(lambda: legacy_sync(raw_list, maps), number=1) * 1000)
+		else:
+			legacy = '{:>13}'.format('skipped')
+		print('{:>6} maps: indexed {:>8.1f} ms, legacy {}'.format(size, indexed * 1000, legacy))
+
+
+if __name__ == '__main__':
+	run()
@@ -0,0 +1,58 @@
+"""
+Measure the parse cost per script callback with the available JSON decoders, using the recorded callback payloads of a
+100 player map (``fixtures/script_callbacks.json``, a list with the method and the raw payload parts per callback).
+"""
+import collections
+import json
+import os
+import timeit
+
+from pyplanet.core.gbx.decoder import DECODERS, get_json_decoder
+from pyplanet.core.exceptions import ImproperlyConfigured
+
+FIXTURE = os.path.join(os.path.dirname(__file__), 'fixtures', 'script_callbacks.json')
+
+
+def load_events():
+	with open(FIXTURE) as fixture:
+		return json.load(fixture)
+
+
+def parse(loads, raw):
+	# Same decoding as the scripted callback handler of the gbx remote.
+	payload = dict()
+	for idx, part in enumerate(raw):
+		try:
+			payload.update(loads(part))
+		except:
+			payload['raw_{}'.format(idx)] = part
+	return payload
+
+
+def run(repeat=5):
+	events = load_events()
+	by_method = collections.OrderedDict()
+	for method, raw in events:
+		by_method.setdefault(method, list()).append(raw)
+
+	decoders = collections.OrderedDict()
+	for name in DECODERS:
+		try:
+			decoders[name] = get_json_decoder(name)
+		except ImproperlyConfigured:
+			print('{} is not installed, skipping.'.format(name))
+
+	print('{:<32} {:>7} {:>9}  {}'.format('method', 'events', 'bytes', '  '.join('{:>10}'.format(n) for n in decoders)))
+	for method, payloads in by_method.items():
+		size = sum(len(part) for raw in payloads for part in raw) // len(payloads)
+		results = list()
+		for loads in decoders.values():
+			total = min(timeit.repeat(lambda: [parse(loads, raw) for raw in payloads], number=10, repeat=repeat))
+			results.append(total / (10 * len(payloads)) * 1000000)
+		print('{:<32} {:>7} {:>9}  {}'.format(
+			method, len(payloads), size, '  '.join('{:>7.2f} us'.format(r) for r in results)
+		))
+
+
+if __name__ == '__main__':
+	run()
@@ -0,0 +1,82 @@
+"""
+Compare the render time of a per-player widget (sector times) for 100 players, rendering the whole template for every
+player versus rendering the shared part once and only the player fragment per player.
+"""
+import asyncio
+import os
+import time
+
+from types import SimpleNamespace
+
+from jinja2 import Environment, FileSystemLoader, PackageLoader, select_autoescape
+from markupsafe import Markup
+
+from pyplanet.core.ui.loader import _PyPlanetLoader
+from pyplanet.views.template import TemplateView
+
+import pyplanet.apps.contrib.sector_times
+
+
+def get_environment():
+	return Environment(
+		enable_async=True,
+		loader=_PyPlanetLoader(mapping={
+			'core.views': PackageLoader('pyplanet.views', 'templates'),
+			'sector_times': FileSystemLoader(os.path.join(
+				os.path.dirname(pyplanet.apps.contrib.sector_times.__file__), 'templates'
+			)),
+		}),
+		autoescape=select_autoescape(['html', 'xml', 'Txt', 'txt', 'ml', 'ms', 'script.txt', 'Script.Txt']),
+	)
+
+
+async def render_full(env, data, player_data):
+	# Render the whole template for every player (the fragment is included, to get exactly the same bodies).
+	template = env.get_template('sector_times/sector_times.xml')
+	fragment = env.get_template('sector_times/sector_times_player.xml')
+	bodies = list()
+	for login in player_data.keys():
+		payload = dict(data, **player_data[login])
+		payload['player_fragment'] = Markup(await fragment.render_async(**payload))
+		bodies.append(await template.render_async(**payload))
+	return bodies
+
+
+async def render_fragments(env, data, player_data):
+	template = env.get_template('sector_times/sector_times.xml')
+	fragment = env.get_template('sector_times/sector_times_player.xml')
+	shared = await template.render_async(**dict(data, player_fragment=Markup(TemplateView.FRAGMENT_MARKER)))
+	head, _, tail = shared.partition(TemplateView.FRAGMENT_MARKER)
+	return [
+		head + await fragment.render_async(**dict(data, **player_data[login])) + tail for login in player_data.keys()
+	]
+
+
+async def run(players=100, repeat=5):
+	env = get_environment()
+	data = dict(
+		_game=SimpleNamespace(game='tm'), id='pyplanet__widgets_sector_times', widget_x=20, widget_y=-70, z_index=None,
+		distraction_hide=True, size_x=None, size_y=None, hover_color='3341', icon_x=0.5, title=None, open_action=False,
+		content_pos_x=2, content_pos_y=-5,
+	)
+	player_data = {'player-{}'.format(nr): dict(
+		record_sector_times=','.join(str(cp * 1000 + nr) for cp in range(20)), record_time=20000 + nr, record_source='Local',
+	) for nr in range(players)}
+
+	results = dict()
+	for name, method in [('full', render_full), ('fragments', render_fragments)]:
+		timings = list()
+		for _ in range(repeat):
+			start = time.perf_counter()
+			bodies = await method(env, data, player_data)
+			timings.append(time.perf_counter() - start)
+		results[name] = (min(timings), bodies)
+
+	assert results['full'][1] == results['fragments'][1]
+	print('{} players, full: {:.2f} ms, fragments: {:.2f} ms, speedup: {:.1f}x'.format(
+		players, results['full'][0] * 1000, results['fragments'][0] * 1000, results['full'][0] / results['fragments'][0]
+	))
+
+
+if __name__ == '__main__':
+	asyncio.get_event_loop().run_until_complete(run())
@@ -0,0 +1,61 @@
+import asyncio
+import datetime
+
+import asynctest
+
+from pyplanet.apps.core.maniaplanet.models import Player
+from pyplanet.core import Controller
+
+
+class TestPlayerManager(asynctest.TestCase):
+	async def test_bulk_update(self):
+		instance = Controller.prepare(name='default').instance
+		manager = instance.player_manager
+		now = datetime.datetime.now()
+
+		players = [
+			Player(id=1, login='player1', nickname='Old1', last_ip='1.1.1.1', level=Player.LEVEL_PLAYER),
+			Player(id=2, login='player2', nickname='Old2', last_ip='2.2.2.2', level=Player.LEVEL_ADMIN),
+		]
+		rows = dict(
+			player1=dict(login='player1', nickname='New1', last_ip='1.1.1.2', level=Player.LEVEL_MASTER),
+			player2=dict(login='player2', nickname='New2', last_ip='2.2.2.3', level=Player.LEVEL_PLAYER),
+		)
+
+		queries = list()
+
+		async def execute(query):
+			queries.append(query)
+
+		with asynctest.patch.object(Player, 'execute', execute):
+			await manager._bulk_update_players(players, rows, now)
+
+		# The known players are updated with a single update statement.
+		assert len(queries) == 1
+		sql, params = queries[0].sql()
+		assert sql.startswith('UPDATE') and sql.count('CASE') == 3
+		assert 'New1' in params and 'New2' in params and '2.2.2.3' in params
+
+		# Only the owners are raised in level.
+		assert players[0].nickname == 'New1' and players[0].level == Player.LEVEL_MASTER
+		assert players[1].nickname == 'New2' and players[1].level == Player.LEVEL_ADMIN
+		assert players[0].last_seen == now
+
+	async def test_batched_connects(self):
+		instance = Controller.prepare(name='default').instance
+		manager = instance.player_manager
+		batches = list()
+
+		async def handle_connects(logins):
+			batches.append(logins)
+			return dict((login, login.upper()) for login in logins if login != 'left')
+
+		with asynctest.patch.object(manager, 'handle_connects', handle_connects):
+			results = await asyncio.gather(*[
+				manager.handle_connect(login) for login in ['player1', 'player2', 'left']
+			])
+
+		# The connects of the same event loop iteration are handled in one batch.
+		assert batches == [['player1', 'player2', 'left']]
+		assert results == ['PLAYER1', 'PLAYER2', None]
+		assert not manager._pending_connects
@@ -43,6 +43,29 @@ class TestCallbacks(asynctest.TestCase):
 		assert self.got_glue == 0
 		assert self.got_handle == 2
 
+	async def test_has_listeners(self):
+		from pyplanet.core.events.callback import handle_generic
+		test1 = Callback(
+			call='Script.SampleCall',
+			code='sample_script_call',
+			namespace='tests',
+			target=handle_generic
+		)
+
+		# The glue to the destination callback doesn't count as listener.
+		assert not test1.raw_signal.has_listeners()
+		test1.register(self.async_listener)
+		assert test1.raw_signal.has_listeners()
+
+		# Callbacks with their own processor always have listeners.
+		test2 = Callback(
+			call='Script.SampleCall2',
+			code='sample_script_call2',
+			namespace='tests',
+			target=self.handle_sample
+		)
+		assert test2.raw_signal.has_listeners()
+
 	####################################################################################################################
 
 	def sync_listener(self, *args, **kwargs):
@@ -0,0 +1,92 @@
+import json
+import os
+import tempfile
+
+import asynctest
+
+from peewee import DeleteQuery, InsertQuery, SelectQuery
+
+from pyplanet.apps.contrib.karma.models import Karma, KarmaSummary
+from pyplanet.contrib.converter.base import BaseConverter
+from pyplanet.core import Controller
+
+
+class FakeConverter(BaseConverter):
+	"""
+	Converter with an in-memory source table, that fails after the given amount of chunks to simulate an interruption.
+	"""
+	def __init__(self, source, fail_after=None, **kwargs):
+		super().__init__(Controller.prepare(name='default').instance, 'mysql', 'localhost', 'source', chunk_size=2, **kwargs)
+		self.source = source
+		self.fail_after = fail_after
+
+	def stream(self, query, skip=0):
+		rows = self.source[skip:]
+		for idx in range(0, len(rows), self.chunk_size):
+			if self.fail_after is not None and idx // self.chunk_size == self.fail_after:
+				raise ConnectionError('Lost connection to the source database')
+			yield rows[idx:idx + self.chunk_size]
+
+
+class FakeDatabase:
+	"""
+	Records the executed queries, and answers the selects with the existing keys.
+	"""
+	def __init__(self, existing=None):
+		self.existing = list(existing or list())
+		self.inserted = list()
+		self.deleted = list()
+
+	async def execute(self, query):
+		if isinstance(query, SelectQuery):
+			return list(self.existing)
+		if isinstance(query, InsertQuery):
+			rows = list(query._rows)
+			self.inserted.extend(rows)
+			self.existing.extend((row['map'], row['player']) for row in rows)
+		elif isinstance(query, DeleteQuery):
+			self.deleted.append(query.model_class)
+
+
+class TestConverter(asynctest.TestCase):
+	async def test_insert_rows(self):
+		database = FakeDatabase(existing=[(1, 1)])
+		converter = FakeConverter([])
+
+		with asynctest.patch.object(Karma, 'execute', database.execute), \
+				asynctest.patch.object(KarmaSummary, 'execute', database.execute):
+			inserted = await converter.insert_rows(Karma, [
+				dict(map=1, player=1, score=1), dict(map=1, player=2, score=1), dict(map=1, player=2, score=-1),
+				dict(map=2, player=1, score=-1),
+			], unique=['map', 'player'])
+
+		# The existing and duplicated rows are skipped, the summaries of the maps are recalculated.
+		assert inserted == 2
+		assert [(row['map'], row['player'], row['score']) for row in database.inserted] == [(1, 2, 1), (2, 1, -1)]
+		assert all(row['created_at'] and row['updated_at'] for row in database.inserted)
+		assert database.deleted == [KarmaSummary]
+
+	async def test_resume(self):
+		source = [dict(uid=uid, login=login) for uid in (1, 2, 3) for login in (1, 2)]
+		convert = lambda row: dict(map=row['uid'], player=row['login'], score=1)
+		database = FakeDatabase()
+
+		with tempfile.TemporaryDirectory() as directory, \
+				asynctest.patch.object(Karma, 'execute', database.execute), \
+				asynctest.patch.object(KarmaSummary, 'execute', database.execute):
+			checkpoint_file = os.path.join(directory, 'checkpoint.json')
+
+			# The conversion is interrupted after the second chunk.
+			converter = FakeConverter(source, fail_after=2, checkpoint_file=checkpoint_file)
+			with self.assertRaises(ConnectionError):
+				await converter.migrate_rows('karma', '', Karma, convert, unique=['map', 'player'])
+			with open(checkpoint_file) as checkpoint:
+				assert json.load(checkpoint) == dict(karma=4)
+
+			# The next conversion continues after the last converted chunk.
+			converter = FakeConverter(source, checkpoint_file=checkpoint_file)
+			converter.load_checkpoint()
+			assert await converter.migrate_rows('karma', '', Karma, convert, unique=['map', 'player']) == 2
+			assert await converter.migrate_rows('karma', '', Karma, convert, unique=['map', 'player']) == 0
+
+		assert [(row['map'], row['player']) for row in database.inserted] == [(row['uid'], row['login']) for row in source]
@@ -58,3 +58,23 @@ class TestMigrations(asynctest.TestCase):
 		with instance.db.allow_sync():
 			await instance.db.migrator.migrate()
 		assert len(instance.db.migrator.pass_migrations) == 0
+
+
+class TestWriteVersions(asynctest.TestCase):
+
+	async def test_write_versions(self):
+		from pyplanet.apps.core.maniaplanet.models import Player
+
+		instance = Controller.prepare(name='default').instance
+		await instance.db.connect()
+		await instance.apps.discover()
+		await instance.db.initiate()
+
+		# Selects, including the raw selects, don't change the write version.
+		version = Player.get_write_version()
+		await Player.execute(Player.select().where(Player.login == 'test_write_versions'))
+		await Player.execute(Player.raw('SELECT * FROM {} WHERE 1 = 0'.format(Player._meta.db_table)))
+		assert Player.get_write_version() == version
+
+		await Player.execute(Player.update(level=0).where(Player.login == 'test_write_versions'))
+		assert Player.get_write_version() == version + 1
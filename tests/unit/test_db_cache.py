@@ -0,0 +1,49 @@
+import asyncio
+
+from pyplanet.core.db.cache import QueryCache
+
+
+class FakeModel:
+	version = 0
+
+	@classmethod
+	def get_write_version(cls):
+		return cls.version
+
+
+def test_read_through_and_invalidation():
+	cache = QueryCache()
+	namespace = cache.namespace('test', ttl=60, max_size=2, models=[FakeModel])
+	assert cache.namespace('test') is namespace
+	fetches = list()
+
+	async def fetch_value(key):
+		async def fetch():
+			fetches.append(key)
+			await asyncio.sleep(0)
+			return key * 2
+		return await namespace.get_or_fetch(key, fetch)
+
+	async def run():
+		# Concurrent misses share the fetch.
+		assert await asyncio.gather(fetch_value(1), fetch_value(1)) == [2, 2]
+		assert await fetch_value(1) == 2
+		assert fetches == [1]
+
+		# Writes to the model invalidate the entries.
+		FakeModel.version += 1
+		assert await fetch_value(1) == 2
+		assert fetches == [1, 1]
+
+		# Least recently used entries are evicted.
+		await fetch_value(2)
+		await fetch_value(3)
+		assert len(namespace) == 2 and namespace.evictions == 1
+
+		await namespace.on_signal()
+		assert len(namespace) == 0
+
+	asyncio.get_event_loop().run_until_complete(run())
+
+	stats = cache.stats()['test']
+	assert stats['hits'] == 1 and stats['misses'] == 5 and stats['invalidations'] == 1
@@ -0,0 +1,38 @@
+import time
+
+from pyplanet.core.db.identity import IdentityMap
+
+
+def test_lru_eviction_and_pinning():
+	cache = IdentityMap(max_size=2, ttl=None)
+	cache['a'] = 'A'
+	cache['b'] = 'B'
+	cache.pin('a')
+	cache['c'] = 'C'
+	cache['d'] = 'D'
+
+	# Pinned entries don't count towards the limit and are never evicted.
+	assert 'a' in cache and 'b' not in cache
+	assert cache.get('c') == 'C'
+	cache['e'] = 'E'
+	assert 'd' not in cache and 'c' in cache
+
+	cache.unpin('a')
+	assert 'c' not in cache and cache['a'] == 'A'
+	assert cache.get('b') is None
+
+	stats = cache.stats()
+	assert stats['evictions'] == 3
+	assert stats['hits'] == 1 and stats['misses'] == 1
+
+
+def test_ttl_eviction():
+	cache = IdentityMap(max_size=10, ttl=0.01)
+	cache['a'] = 'A'
+	cache['b'] = 'B'
+	cache.pin('b')
+	time.sleep(0.02)
+	assert cache.get('a') is None
+	assert cache.get('b') == 'B'
+	cache['c'] = 'C'
+	assert 'a' not in cache and len(cache) == 2
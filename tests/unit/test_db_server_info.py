@@ -0,0 +1,11 @@
+from pyplanet.core.db.server_info import ServerInfo
+
+
+def test_supports_window_functions():
+	info = ServerInfo(None, None)
+	for server_type, version, expected in [
+		('mysql', '5.7.31', False), ('mysql', '8.0.21', True), ('mariadb', '10.1.48', False),
+		('mariadb', '10.5.8', True), ('postgresql', '12.4', True), (None, None, False), ('mysql', 'unknown', False),
+	]:
+		info.type, info.version = server_type, version
+		assert info.supports_window_functions is expected
@@ -0,0 +1,66 @@
+import asyncio
+
+from pyplanet.core.db.writer import WriteBehindQueue
+
+
+class FakeDatabase:
+	engine = object()
+
+
+class FakeModel:
+	statements = list()
+	fail = False
+
+	@classmethod
+	def insert_many(cls, rows):
+		return list(rows)
+
+	@classmethod
+	async def execute(cls, query):
+		if cls.fail:
+			raise Exception('Database is gone!')
+		cls.statements.append(query)
+
+
+class FakeInstance:
+	def __init__(self, pk=None):
+		self.pk = pk
+		self.saved = 0
+
+	def _get_pk_value(self):
+		return self.pk
+
+	async def save(self):
+		self.saved += 1
+
+
+def test_batched_inserts_and_coalesced_saves():
+	queue = WriteBehindQueue(FakeDatabase(), max_size=1000, max_batch=2)
+	for score in range(5):
+		queue.insert(FakeModel, score=score)
+
+	record = FakeInstance(pk=1)
+	new_record = FakeInstance()
+	for _ in range(3):
+		queue.save(record)
+		queue.save(new_record)
+	assert queue.depth == 7
+
+	asyncio.get_event_loop().run_until_complete(queue.flush())
+
+	assert [len(statement) for statement in FakeModel.statements] == [2, 2, 1]
+	assert record.saved == 1 and new_record.saved == 1
+	assert queue.stats()['depth'] == 0 and queue.stats()['rows'] == 7
+
+
+def test_failed_flush_is_retried():
+	queue = WriteBehindQueue(FakeDatabase(), max_size=1000)
+	FakeModel.statements = list()
+	FakeModel.fail = True
+	queue.insert(FakeModel, score=1)
+	asyncio.get_event_loop().run_until_complete(queue.flush())
+	assert queue.depth == 1 and queue.stats()['failures'] == 1
+
+	FakeModel.fail = False
+	asyncio.get_event_loop().run_until_complete(queue.stop())
+	assert queue.depth == 0 and FakeModel.statements == [[dict(score=1)]]
@@ -0,0 +1,103 @@
+import asyncio
+import json
+
+from xmlrpc.client import dumps, loads, Fault
+
+from pyplanet.core.exceptions import ImproperlyConfigured
+from pyplanet.core.gbx.codec import FastCodec, StdlibCodec, get_codec
+from pyplanet.core.gbx.decoder import get_json_decoder
+from pyplanet.core.gbx.protocol import GbxProtocol
+
+
+def build_callback_array(method, *parts):
+	return dumps((method, list(parts)), methodname='ManiaPlanet.ModeScriptCallbackArray').encode()
+
+
+def test_fast_decoding_callback_array():
+	codec = FastCodec()
+	payload = json.dumps(dict(login='test<&>', nickname='$f00Tést "quoted"', racetime=1234, checkpointinrace=2))
+	body = build_callback_array('Trackmania.Event.WayPoint', payload)
+
+	assert codec.fast_loads(body) is not None
+	assert codec.loads(body) == loads(body, use_builtin_types=True)
+	assert codec.loads(memoryview(bytearray(body))) == loads(body, use_builtin_types=True)
+
+
+def test_fast_decoding_empty_and_multiple():
+	codec = FastCodec()
+	body = build_callback_array('Maniaplanet.StartMap_Start', '', '{"count": 1}', '{"valid": true}')
+	assert codec.fast_loads(body) is not None
+	assert codec.loads(body) == loads(body, use_builtin_types=True)
+
+	body = dumps(('Trackmania.Event.WayPoint', 'line\r\nbreak'), methodname='ManiaPlanet.ModeScriptCallback').encode()
+	assert codec.loads(body) == loads(body, use_builtin_types=True)
+
+
+def test_fallback_decoding():
+	codec = FastCodec()
+
+	# Non string parameters.
+	body = dumps((1, 'login', 'message', False), methodname='ManiaPlanet.PlayerChat').encode()
+	assert codec.fast_loads(body) is None
+	assert codec.loads(body) == loads(body, use_builtin_types=True)
+
+	# Responses.
+	body = dumps((dict(Version='1', Build='2'),), methodresponse=True).encode()
+	assert codec.fast_loads(body) is None
+	assert codec.loads(body) == loads(body, use_builtin_types=True)
+
+	# Faults.
+	body = dumps(Fault(-1000, 'Login unknown.')).encode()
+	try:
+		codec.loads(body)
+		assert False
+	except Fault as e:
+		assert e.faultString == 'Login unknown.'
+
+
+def test_multicall_encoding():
+	codec = FastCodec()
+	calls = [
+		('SendDisplayManialinkPageToLogin', ('login', '<manialink id="a&b"/>', 0, False)),
+		('GetPlayerList', (-1, 0)),
+		('TriggerModeScriptEventArray', ('Trackmania.GetScores', ['abc'])),
+	]
+	body = codec.dumps_multicall([codec.dumps_call(args, method) for method, args in calls])
+	expected = dumps(([dict(methodName=method, params=args) for method, args in calls],), methodname='system.multicall')
+	assert body == expected.encode()
+
+
+def test_codec_loading():
+	assert isinstance(get_codec(), FastCodec)
+	assert isinstance(get_codec('pyplanet.core.gbx.codec.StdlibCodec'), StdlibCodec)
+	assert isinstance(get_codec(StdlibCodec), StdlibCodec)
+
+
+def test_json_decoder_loading():
+	assert get_json_decoder('json') is json.loads
+	assert get_json_decoder('json.loads') is json.loads
+	assert get_json_decoder()('{"login": "a", "racetime": 1}') == dict(login='a', racetime=1)
+	try:
+		get_json_decoder('unknown.module.loads')
+		assert False
+	except ImproperlyConfigured:
+		pass
+
+
+def test_protocol_framing():
+	loop = asyncio.new_event_loop()
+	frames = list()
+	protocol = GbxProtocol(lambda handle, body: frames.append((handle, bytes(body))), loop=loop)
+
+	stream = bytearray(len(b'GBXRemote 2').to_bytes(4, 'little') + b'GBXRemote 2')
+	for handle, body in [(0x80000000, b'first'), (12, b''), (13, b'x' * 5000)]:
+		stream += len(body).to_bytes(4, 'little') + handle.to_bytes(4, 'little') + body
+
+	# Feed in small chunks to test partial frames.
+	for pos in range(0, len(stream), 7):
+		protocol.data_received(bytes(stream[pos:pos + 7]))
+
+	assert protocol.handshake.result() == 'GBXRemote 2'
+	assert frames == [(0x80000000, b'first'), (12, b''), (13, b'x' * 5000)]
+	assert len(protocol.buffer) == 0
+	loop.close()
@@ -0,0 +1,66 @@
+import asyncio
+
+from types import SimpleNamespace
+
+from pyplanet.core.gbx.planner import MulticallPlanner
+
+
+class FakeQuery:
+	def __init__(self, length):
+		self.length = length
+		self.prepared = 0
+
+	def prepare(self):
+		self.prepared += 1
+
+
+def test_plan_limits():
+	loop = asyncio.new_event_loop()
+	planner = MulticallPlanner(1000, loop=loop)
+
+	stacks = planner.plan([FakeQuery(300) for _ in range(10)])
+	assert [len(stack) for stack in stacks] == [3, 3, 3, 1]
+
+	planner.max_calls = 2
+	stacks = planner.plan([FakeQuery(10) for _ in range(5)])
+	assert [len(stack) for stack in stacks] == [2, 2, 1]
+	loop.close()
+
+
+def test_adaptive_limits():
+	loop = asyncio.new_event_loop()
+	planner = MulticallPlanner(2000000, loop=loop, target_latency=0.1)
+
+	planner.observe(calls=1000, size=1000000, latency=0.5)
+	assert planner.max_calls == 500
+	assert planner.max_bytes == 500000
+
+	for _ in range(10):
+		planner.observe(calls=10, size=1000, latency=0.001)
+	assert planner.max_calls > 500
+	assert planner.max_bytes > 500000
+	assert planner.stats()['multicalls'] == 11
+	loop.close()
+
+
+def test_in_flight_cap():
+	loop = asyncio.new_event_loop()
+	planner = MulticallPlanner(1000, loop=loop, max_in_flight=2)
+	state = SimpleNamespace(max_in_flight=0)
+
+	async def call():
+		await planner.acquire()
+		try:
+			state.max_in_flight = max(state.max_in_flight, planner.in_flight)
+			await asyncio.sleep(0.01)
+		finally:
+			planner.release()
+
+	async def run():
+		await asyncio.gather(*[call() for _ in range(6)])
+
+	loop.run_until_complete(run())
+	assert state.max_in_flight == 2
+	assert planner.in_flight == 0
+	assert planner.metrics['slot_waits'] > 0
+	loop.close()
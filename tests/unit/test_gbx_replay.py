@@ -0,0 +1,142 @@
+import asyncio
+import gzip
+import os
+import tempfile
+
+from xmlrpc.client import Fault, dumps, loads
+
+from pyplanet.core.events.dispatcher import Signal
+from pyplanet.core.events.manager import SignalManager
+from pyplanet.core.gbx.recorder import KIND_CALLBACK, KIND_REQUEST, KIND_RESPONSE, Frame, Recorder, read_recording
+from pyplanet.core.gbx.remote import GbxRemote
+from pyplanet.core.gbx.replay import FakeServer, ReplayHarness, format_report, percentile
+
+
+class FakeWriter:
+	def __init__(self):
+		self.frames = list()
+
+	def write(self, data):
+		self.frames.append((int.from_bytes(data[4:8], 'little'), loads(data[8:], use_builtin_types=True)))
+
+
+def request(handle, method, *params):
+	return Frame(KIND_REQUEST, 0.0, handle, dumps(params, method).encode('utf-8'))
+
+
+def response(handle, value):
+	return Frame(KIND_RESPONSE, 0.0, handle, dumps((value,), methodresponse=True).encode('utf-8'))
+
+
+def script_callback(name, *parts):
+	return Frame(KIND_CALLBACK, 1.0, 0, dumps((name, list(parts)), 'ManiaPlanet.ModeScriptCallbackArray').encode('utf-8'))
+
+
+def test_recording_roundtrip():
+	with tempfile.TemporaryDirectory() as directory:
+		path = os.path.join(directory, 'test.rec')
+		recorder = Recorder(path).open()
+		recorder.record(KIND_CALLBACK, 0, b'<callback/>', seconds=0.5)
+		recorder.record(KIND_REQUEST, 0x80000000, memoryview(b'<request/>'))
+		recorder.close()
+
+		frames = list(read_recording(path))
+		assert [(f.kind, f.handle, f.body) for f in frames] == [
+			(KIND_CALLBACK, 0, b'<callback/>'), (KIND_REQUEST, 0x80000000, b'<request/>'),
+		]
+		assert frames[0].time == 0.5
+
+		# A truncated recording is read until the last complete frame.
+		with gzip.open(path, 'rb') as recording:
+			data = recording.read()
+		with gzip.open(path, 'wb') as recording:
+			recording.write(data[:-3])
+		assert len(list(read_recording(path))) == 1
+
+
+def test_fake_server_answers():
+	server = FakeServer([
+		request(0x80000000, 'GetPlayerList', -1, 0),
+		response(0x80000000, [dict(Login='player1')]),
+		request(0x80000001, 'system.multicall', [
+			dict(methodName='GetMaxPlayers', params=[]), dict(methodName='GetPlayerInfo', params=['nobody']),
+		]),
+		response(0x80000001, [[dict(CurrentValue=100)], dict(faultCode=-1000, faultString='Unknown player')]),
+		request(0x80000002, 'TriggerModeScriptEventArray', 'Trackmania.GetScores', ['old-id']),
+		response(0x80000002, True),
+		script_callback('Trackmania.Scores', '{"responseid": "old-id", "players": []}'),
+		script_callback('Trackmania.Event.WayPoint', '{"login": "player1"}'),
+	])
+	assert len(server.callbacks) == 1
+
+	assert server.answer('GetPlayerList', (-1, 0)) == [dict(Login='player1')]
+	assert server.answer('GetMaxPlayers', []) == dict(CurrentValue=100)
+	assert isinstance(server.answer('GetPlayerInfo', ['nobody']), Fault)
+	assert server.answer('SendDisplayManialinkPageToLogin', ('player1', '<manialink/>', 0, False)) is True
+	assert server.unanswered['SendDisplayManialinkPageToLogin'] == 1
+
+	server.writer = FakeWriter()
+	body = dumps(('Trackmania.GetScores', ['new-id']), 'TriggerModeScriptEventArray').encode('utf-8')
+	server.handle_request(0x80000010, body)
+	(handle, result), (callback_handle, callback) = server.writer.frames
+	assert handle == 0x80000010 and result[0] == (True,)
+	assert callback[1] == 'ManiaPlanet.ModeScriptCallbackArray'
+	assert callback[0] == ('Trackmania.Scores', ['{"responseid": "new-id", "players": []}'])
+	assert server.bytes_received == 8 + len(body)
+
+
+def test_percentile():
+	values = list(range(1, 101))
+	assert percentile(values, 50) == 50
+	assert percentile(values, 99) == 99
+	assert percentile(values, 100) == 100
+	assert percentile([], 50) == 0.0
+
+
+def test_record_and_replay():
+	received = list()
+
+	async def receiver(*args, **kwargs):
+		received.append(kwargs)
+
+	signal = Signal(code='Script.Test.Event', namespace='test')
+	signal.register(receiver, weak=False)
+	SignalManager.register_signal(signal, callback=True)
+
+	async def scenario(path):
+		# Record the callbacks received from the (fake) server.
+		source = await FakeServer([script_callback('Test.Event', '{"value": %d}' % idx) for idx in range(20)]).start()
+		client = GbxRemote(source.host, source.port, user='SuperAdmin', password='SuperAdmin')
+		client.record_file = path
+		await client.connect()
+		await ReplayHarness(client, source).run()
+		await client.disconnect()
+		await source.close()
+
+		# The credentials are never recorded.
+		assert not any(b'SuperAdmin' in frame.body for frame in read_recording(path))
+
+		# Replay the recording.
+		server = await FakeServer(read_recording(path)).start()
+		client = GbxRemote(server.host, server.port, user='SuperAdmin', password='SuperAdmin')
+		await client.connect()
+		report = await ReplayHarness(client, server, speed=100).run()
+		await client.disconnect()
+		await server.close()
+		return report
+
+	previous_loop = asyncio.get_event_loop()
+	loop = asyncio.new_event_loop()
+	asyncio.set_event_loop(loop)
+	try:
+		with tempfile.TemporaryDirectory() as directory:
+			report = loop.run_until_complete(scenario(os.path.join(directory, 'test.rec')))
+	finally:
+		loop.close()
+		asyncio.set_event_loop(previous_loop)
+		SignalManager.callbacks.pop('Script.Test.Event', None)
+
+	assert len(received) == 40
+	assert report['callbacks'] == 20
+	assert report['signals']['Script.Test.Event']['count'] == 20
+	assert 'Script.Test.Event' in format_report(report)
@@ -0,0 +1,67 @@
+import asyncio
+
+from pyplanet.core.gbx.scheduler import (
+	OutboundScheduler, get_priority, PRIORITY_CONTROL, PRIORITY_CHAT, PRIORITY_UI, PRIORITY_BULK
+)
+
+
+class FakeProtocol:
+	def __init__(self):
+		self.transport = None
+		self.writing_paused = False
+		self.resume_handler = None
+		self.written = list()
+
+	def write(self, data):
+		self.written.append(data)
+
+
+def test_priorities():
+	assert get_priority('Kick', ('login',)) == PRIORITY_CONTROL
+	assert get_priority('GetPlayerList', (-1, 0)) == PRIORITY_CONTROL
+	assert get_priority('ChatSendServerMessage', ('Hello',)) == PRIORITY_CHAT
+	assert get_priority('SendDisplayManialinkPageToLogin', ('login', '<manialink/>', 0, False)) == PRIORITY_UI
+	assert get_priority('TriggerModeScriptEventArray', ('Trackmania.UI.SetProperties', [])) == PRIORITY_UI
+	assert get_priority('TriggerModeScriptEventArray', ('Trackmania.ForceEndRound', [])) == PRIORITY_CONTROL
+	assert get_priority('WriteFile', ('file', b'')) == PRIORITY_BULK
+	assert get_priority('system.multicall', ([
+		dict(methodName='SendDisplayManialinkPage', params=['', 0, False]),
+		dict(methodName='ChatSendServerMessage', params=['Hello']),
+	],)) == PRIORITY_CHAT
+
+
+def test_ordering_and_backpressure():
+	loop = asyncio.new_event_loop()
+	scheduler = OutboundScheduler(loop=loop, high_water=100, low_water=10)
+	protocol = FakeProtocol()
+	scheduler.attach(protocol)
+
+	# Written directly when the transport is not paused.
+	scheduler.enqueue(b'direct', PRIORITY_UI)
+	assert protocol.written == [b'direct']
+
+	# Queued when paused, and written in priority order when resumed.
+	protocol.writing_paused = True
+	scheduler.enqueue(b'b' * 60, PRIORITY_BULK)
+	scheduler.enqueue(b'u' * 60, PRIORITY_UI)
+	scheduler.enqueue(b'chat', PRIORITY_CHAT)
+	scheduler.enqueue(b'kick', PRIORITY_CONTROL)
+	assert scheduler.depth == 4
+	assert scheduler.queued_bytes == 128
+
+	# Bulk callers should wait, control callers not.
+	loop.run_until_complete(scheduler.wait_writable(PRIORITY_CONTROL))
+	waiter = loop.create_task(scheduler.wait_writable(PRIORITY_BULK))
+	loop.run_until_complete(asyncio.sleep(0))
+	assert not waiter.done()
+
+	protocol.writing_paused = False
+	protocol.resume_handler()
+	loop.run_until_complete(waiter)
+
+	assert protocol.written[1:] == [b'kick', b'chat', b'u' * 60, b'b' * 60]
+	stats = scheduler.stats()
+	assert stats['depth'] == 0
+	assert stats['priorities']['bulk']['backpressure_waits'] == 1
+	assert stats['priorities']['ui']['frames'] == 2
+	loop.close()
@@ -0,0 +1,85 @@
+import asyncio
+import json
+import urllib.request
+
+from pyplanet.god.supervisor import Heartbeat, Supervisor, get_rss
+
+
+class FakeInstance:
+	def __init__(self, loop):
+		self.loop = loop
+		self.gbx = type('Gbx', (), dict(callbacks_received=0))()
+
+
+def test_heartbeat_to_status():
+	supervisor = Supervisor(interval=0.05, lag_threshold=10)
+	sender = supervisor.register('default')
+
+	loop = asyncio.new_event_loop()
+	try:
+		instance = FakeInstance(loop)
+		heartbeat = Heartbeat(instance, sender, interval=0.05)
+		heartbeat.start()
+		instance.gbx.callbacks_received = 10
+		loop.run_until_complete(asyncio.sleep(0.07))
+	finally:
+		loop.close()
+
+	supervisor.poll(timeout=1)
+	status = supervisor.status()
+	beat = status['instances']['default']
+	assert beat['callbacks'] == 10
+	assert beat['callbacks_per_second'] > 0
+	assert beat['tasks'] >= 0
+	assert beat['lag'] >= 0
+	assert status['total']['instances'] == 1
+	assert supervisor.get_hung() == []
+
+	# An exited process is forgotten, so it's never reported as hung.
+	sender.close()
+	supervisor.poll(timeout=1)
+	assert 'default' not in supervisor.heartbeats and 'default' not in supervisor.connections
+	supervisor.close()
+
+
+def test_hung_instances():
+	supervisor = Supervisor(interval=0.01, lag_threshold=0.05)
+	supervisor.register('silent')
+	supervisor.register('lagging')
+	supervisor.register('starting')
+
+	supervisor.receive('silent', dict(lag=0.0, rss=None, tasks=1, callbacks_per_second=0.0))
+	supervisor.heartbeats['silent']['received'] -= 1
+	supervisor.receive('lagging', dict(lag=1.0, rss=None, tasks=1, callbacks_per_second=0.0))
+
+	# Instances are only checked after the first heartbeat.
+	assert sorted(supervisor.get_hung()) == ['lagging', 'silent']
+
+	# A new process of the instance starts with a clean state.
+	supervisor.register('silent')
+	assert supervisor.get_hung() == ['lagging']
+
+	supervisor.lag_threshold = 0
+	assert supervisor.get_hung() == []
+	supervisor.close()
+
+
+def test_status_endpoint():
+	supervisor = Supervisor()
+	supervisor.register('default')
+	supervisor.receive('default', dict(lag=0.5, rss=1024, tasks=3, callbacks_per_second=2.0))
+	supervisor.serve(0)
+	try:
+		port = supervisor.server.server_port
+		with urllib.request.urlopen('http://127.0.0.1:{}/'.format(port), timeout=5) as response:
+			status = json.loads(response.read().decode('utf-8'))
+	finally:
+		supervisor.close()
+
+	assert status['instances']['default']['tasks'] == 3
+	assert status['total']['rss'] == 1024
+	assert status['total']['max_lag'] == 0.5
+
+
+def test_rss():
+	assert get_rss() > 0
@@ -0,0 +1,51 @@
+import random
+
+from pyplanet.apps.contrib.local_records.index import RecordIndex
+
+
+class FakePlayer:
+	def __init__(self, login):
+		self.login = login
+
+
+class FakeRecord:
+	def __init__(self, login, score):
+		self.player = FakePlayer(login)
+		self.score = score
+
+
+def test_load_and_lookup():
+	records = RecordIndex([FakeRecord('a', 100), FakeRecord('b', 200), FakeRecord('c', 200)])
+
+	assert len(records) == 3
+	assert records.rank('c') == 3 and records.rank('unknown') is None
+	assert records.get('b').score == 200
+	assert [r.player.login for r in records[:2]] == ['a', 'b']
+	assert records.index(records.get('c')) == 2
+
+
+def test_updates_match_sorted_list():
+	rnd = random.Random(42)
+	records = RecordIndex()
+	reference = list()
+
+	for _ in range(500):
+		login = 'player{}'.format(rnd.randrange(40))
+		score = rnd.randint(1000, 2000)
+		record = records.get(login)
+		if record is not None and score >= record.score:
+			continue
+		if record is None:
+			record = FakeRecord(login, score)
+			reference.append(record)
+		record.score = score
+
+		# Equal scores keep the record that was driven first on top.
+		reference.remove(record)
+		reference.insert(len([r for r in reference if r.score <= score]), record)
+
+		assert records.update(record) == reference.index(record) + 1
+
+	assert list(records) == reference
+	for position, record in enumerate(reference):
+		assert records.rank(record.player.login) == position + 1
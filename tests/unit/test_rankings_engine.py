@@ -0,0 +1,70 @@
+import random
+
+from pyplanet.apps.contrib.rankings.engine import RankEngine
+
+
+def calculate_ranks(map_records, record_limit, minimum_records):
+	# Reference implementation of the former SQL calculation.
+	sums, counts = dict(), dict()
+	for player_ids in map_records.values():
+		for rank, player_id in enumerate(player_ids[:record_limit], start=1):
+			sums[player_id] = sums.get(player_id, 0) + rank
+			counts[player_id] = counts.get(player_id, 0) + 1
+	map_count = len(map_records)
+	return dict(
+		(player_id, round((sums[player_id] + (map_count - counts[player_id]) * record_limit) / map_count * 10000))
+		for player_id in sums if counts[player_id] >= minimum_records
+	)
+
+
+def test_incremental_updates_match_full_calculation():
+	rnd = random.Random(42)
+	map_records = dict((map_id, rnd.sample(range(50), rnd.randint(0, 30))) for map_id in range(20))
+
+	engine = RankEngine(record_limit=10, minimum_records=3)
+	engine.load(map_records)
+
+	for _ in range(200):
+		map_id = rnd.randrange(25)
+		if map_id in map_records and rnd.random() < 0.1:
+			del map_records[map_id]
+			engine.remove_map(map_id)
+			continue
+		player_ids = list(map_records.get(map_id, []))
+		player_id = rnd.randrange(50)
+		if player_id in player_ids:
+			player_ids.remove(player_id)
+		player_ids.insert(rnd.randint(0, len(player_ids)), player_id)
+		map_records[map_id] = player_ids
+		engine.set_map(map_id, player_ids)
+
+	expected = calculate_ranks(map_records, 10, 3)
+	assert dict((player_id, engine.average(player_id)) for player_id in expected) == expected
+	assert engine.total == len(expected)
+
+	ordered = sorted(expected.values())
+	for player_id, average in expected.items():
+		assert engine.get_rank(player_id) == (ordered.index(average) + 1, average)
+
+		next_rank = engine.get_next(player_id)
+		if next_rank is None:
+			assert ordered.index(average) == 0
+		else:
+			assert next_rank[2] < average and next_rank[1] == ordered.index(next_rank[2]) + 1
+
+
+def test_changes():
+	engine = RankEngine(record_limit=5, minimum_records=1)
+	engine.load({1: [10, 20], 2: [20]})
+
+	full, changes = engine.pop_changes()
+	assert full and set(changes.keys()) == {10, 20}
+
+	engine.set_map(1, [20, 10])
+	full, changes = engine.pop_changes()
+	assert not full and changes == {10: engine.average(10), 20: engine.average(20)}
+
+	engine.set_map(2, [])
+	engine.set_map(1, [20])
+	full, changes = engine.pop_changes()
+	assert changes[10] is None and engine.get_rank(20) == (1, 30000)
@@ -1,8 +1,9 @@
+import asyncio
 import asynctest
 
 from pyplanet.apps import AppConfig
 from pyplanet.core import Controller
-from pyplanet.core.events import Signal
+from pyplanet.core.events import BatchedSignal, Signal
 
 
 class TestSignals(asynctest.TestCase):
@@ -92,8 +93,69 @@ class TestSignals(asynctest.TestCase):
 		assert self.got_sync == 1
 		assert self.got_async == 1
 
+	async def test_budget_and_timings(self):
+		instance = Controller.prepare(name='default').instance
+		test1 = Signal(code='test_budget', namespace='tests')
+		instance.signals.register_signal(test1)
+
+		self.got_sync = 0
+		self.got_async = 0
+		self.got_raw = 0
+		self.got_slow = 0
+
+		test1.register(self.sync_listener)
+		test1.register(self.async_listener)
+		test1.register(self.slow_listener, budget=0.01)
+
+		responses = await test1.send(dict(glue=False), raw=True)
+
+		# The slow listener is detached, the others are done.
+		assert len(responses) == 3
+		assert responses[2] == (self.slow_listener, None)
+		assert self.got_sync == 1
+		assert self.got_async == 1
+		assert self.got_slow == 0
+
+		await asyncio.sleep(0.2)
+		assert self.got_slow == 1
+
+		stats = {row['receiver'].rpartition('.')[2]: row for row in test1.get_receiver_stats()}
+		assert stats['sync_listener']['count'] == 1
+		assert stats['slow_listener']['detached'] == 1
+		assert any(row['signal'] == 'tests:test_budget' for row in instance.signals.get_receiver_stats())
+
+	async def test_batched(self):
+		instance = Controller.prepare(name='default').instance
+		source = Signal(code='test_source', namespace='tests')
+		instance.signals.register_signal(source)
+		batched = BatchedSignal(source, code='test_source_batch', namespace='tests', interval=0.05, max_size=3)
+
+		self.batches = list()
+		batched.register(self.batch_listener)
+
+		# Delivered after the interval.
+		await source.send(dict(nr=1), raw=True)
+		await source.send(dict(nr=2), raw=True)
+		assert len(self.batches) == 0
+		await asyncio.sleep(0.1)
+		assert [[e['nr'] for e in b] for b in self.batches] == [[1, 2]]
+
+		# Delivered when the max size is reached, or when flushed.
+		for nr in range(3, 7):
+			await source.send(dict(nr=nr), raw=True)
+		await asyncio.sleep(0)
+		await batched.flush()
+		assert [[e['nr'] for e in b] for b in self.batches] == [[1, 2], [3, 4, 5], [6]]
+
 	####################################################################################################################
 
+	async def batch_listener(self, events, **kwargs):
+		self.batches.append(events)
+
+	async def slow_listener(self, **kwargs):
+		await asyncio.sleep(0.1)
+		self.got_slow += 1
+
 	def sync_listener(self, glue=None, source=None, **kwargs):
 		self.got_sync += 1
 		if glue is not True:
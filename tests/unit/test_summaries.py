@@ -0,0 +1,117 @@
+import asynctest
+
+from peewee import IntegrityError, InsertQuery, SelectQuery
+
+from pyplanet.apps.contrib.karma.models import Karma, KarmaSummary
+from pyplanet.apps.contrib.local_records.index import RecordIndex
+from pyplanet.apps.contrib.local_records.models import LocalRecord, LocalRecordSummary
+from pyplanet.apps.contrib.local_records.signals import local_records_changed
+from pyplanet.apps.core.maniaplanet.models import Map, Player
+from pyplanet.core import Controller
+
+
+class TestSummaries(asynctest.TestCase):
+
+	def __init__(self, *args, **kwargs):
+		super().__init__(*args, **kwargs)
+
+		self.instance = Controller.prepare(name='default').instance
+
+	def setUp(self):
+		self.map = Map(id=1, uid='map1')
+		self.players = [Player(id=idx, login='player{}'.format(idx), nickname='Player{}'.format(idx)) for idx in (1, 2)]
+		self.widget = asynctest.Mock()
+		self.widget.display = asynctest.CoroutineMock()
+
+		self.patches = [
+			asynctest.patch.object(self.instance.map_manager, '_current_map', self.map),
+			asynctest.patch.object(self.instance, 'chat', asynctest.CoroutineMock()),
+		]
+		for patch in self.patches:
+			patch.start()
+
+	def tearDown(self):
+		for patch in self.patches:
+			patch.stop()
+
+	async def test_karma_votes(self):
+		app = self.instance.apps.apps['karma']
+		app.widget = self.widget
+		app.current_votes = [
+			Karma(id=1, map=self.map, player=self.players[0], score=1),
+			Karma(id=2, map=self.map, player=self.players[1], score=1),
+		]
+		app.current_summary = KarmaSummary(map=self.map, vote_count=2, total_score=2.0)
+
+		with asynctest.patch.object(app.setting_expanded_voting, 'get_value', return_value=False), \
+				asynctest.patch.object(self.instance.game, 'game', 'sm'), \
+				asynctest.patch.object(Karma, 'save'), \
+				asynctest.patch.object(Karma, 'execute'), \
+				asynctest.patch.object(KarmaSummary, 'save') as save_summary:
+			# Changing a vote changes the total score.
+			await app.player_chat(self.players[1], '--', None)
+			assert (app.current_summary.vote_count, app.current_summary.total_score) == (2, 0.0)
+			assert save_summary.call_count == 1
+
+			# Resetting a vote removes it from the summary.
+			await app.reset_karma_vote(self.players[0])
+			assert (app.current_summary.vote_count, app.current_summary.total_score) == (1, -1.0)
+			assert save_summary.call_count == 2
+
+		assert self.map.karma == dict(vote_count=1, map_karma=-1.0)
+
+	async def test_local_records(self):
+		app = self.instance.apps.apps['local_records']
+		app.widget = self.widget
+		app.current_records = RecordIndex([LocalRecord(id=1, map=self.map, player=self.players[0], score=1000)])
+		app.current_summary = LocalRecordSummary(map=self.map, record_count=1, best_player=self.players[0], best_score=1000)
+
+		with asynctest.patch.object(app.setting_record_limit, 'get_value', return_value=100), \
+				asynctest.patch.object(app.setting_chat_announce, 'get_value', return_value=0), \
+				asynctest.patch.object(self.instance.db.writer, 'save') as save, \
+				asynctest.patch.object(local_records_changed, 'send_robust'):
+			# A better finish of another player becomes the best record.
+			await app.player_finish(self.players[1], 900, 900, [450, 900], None, None)
+			summary = app.current_summary
+			assert (summary.record_count, summary.best_player_id, summary.best_score) == (2, 2, 900)
+			assert save.call_args_list[-1] == asynctest.call(summary)
+
+			# A worse finish doesn't change the summary.
+			save.reset_mock()
+			await app.player_finish(self.players[0], 1100, 1100, [550, 1100], None, None)
+			assert (summary.record_count, summary.best_player_id, summary.best_score) == (2, 2, 900)
+			assert not save.called
+
+			# A stored summary that is out of date is corrected when the records are loaded.
+			stale = LocalRecordSummary(id=1, map=self.map, record_count=5, best_player=self.players[0], best_score=800)
+			records = [LocalRecord(id=1, map=self.map, player=self.players[0], score=1000)]
+			with asynctest.patch.object(self.instance.db.writer, 'flush'), \
+					asynctest.patch.object(LocalRecord.objects, 'execute', return_value=records), \
+					asynctest.patch.object(LocalRecordSummary, 'execute', return_value=[stale]):
+				await app.refresh_locals()
+			assert app.current_summary is stale
+			assert (stale.record_count, stale.best_player_id, stale.best_score) == (1, 1, 1000)
+			assert save.call_args_list[-1] == asynctest.call(stale)
+
+	async def test_create_summaries(self):
+		app = self.instance.apps.apps['local_records']
+		inserted = list()
+
+		async def execute(query):
+			if isinstance(query, SelectQuery):
+				return [LocalRecordSummary(map=row['map'], record_count=row['record_count']) for row in inserted]
+			if isinstance(query, InsertQuery):
+				# The summary of the second map is created by another process in the meantime.
+				row = dict((getattr(field, 'name', field), value) for field, value in query._rows[0].items())
+				if query._is_multi_row_insert or row['map'] == 2:
+					raise IntegrityError('Duplicate entry')
+				inserted.append(row)
+
+		with asynctest.patch.object(LocalRecord, 'execute', return_value=[(1, 2, 900), (1, 1, 1000)]), \
+				asynctest.patch.object(LocalRecordSummary, 'execute', execute):
+			summaries = await app.create_summaries([1, 2])
+
+		# The rows are inserted one by one after the failed bulk insert, and the created summaries are returned.
+		assert inserted == [dict(map=1, record_count=2, best_player=2, best_score=900)]
+		assert list(summaries.keys()) == [1]
+		assert summaries[1].record_count == 2
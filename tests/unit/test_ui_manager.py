@@ -0,0 +1,78 @@
+import asynctest
+
+from types import SimpleNamespace
+
+from pyplanet.core import Controller
+
+
+class TestUIManager(asynctest.TestCase):
+	async def test_digests(self):
+		instance = Controller.prepare(name='default').instance
+		manager = instance.ui_manager
+		manialink = SimpleNamespace(id='test_digests', timeout=0, hide_click=False, deduplicate=True)
+
+		assert manager.should_deduplicate(manialink)
+		body = '<manialink id="test_digests"></manialink>'
+		digest = manager.get_digest(body)
+		skipped = manager.stats['skipped']
+
+		assert manager.filter_changed_logins(manialink, ['a', 'b'], digest, len(body)) == ['a', 'b']
+		assert manager.filter_changed_logins(manialink, ['a', 'b', 'c'], digest, len(body)) == ['c']
+		assert manager.filter_changed_logins(manialink, ['a'], manager.get_digest(body + ' '), len(body)) == ['a']
+
+		# Reconnecting player should get the body again.
+		manager.player_changed(SimpleNamespace(login='b'))
+		assert manager.filter_changed_logins(manialink, ['a', 'b', 'c'], digest, len(body)) == ['a', 'b']
+		assert manager.stats['skipped'] - skipped == 3
+
+		manager.forget_digests('test_digests')
+		assert 'test_digests' not in manager.sent_digests
+
+	async def test_relaxed_queue(self):
+		instance = Controller.prepare(name='default').instance
+		manager = instance.ui_manager
+		manialink = SimpleNamespace(id='test_relaxed')
+		query = lambda method, *args: SimpleNamespace(method=method, args=args)
+
+		manager.queue_relaxed(manialink, [query('SendDisplayManialinkPageToLogin', 'a', 'v1', 0, False)])
+		manager.queue_relaxed(manialink, [query('SendDisplayManialinkPageToLogin', 'b', 'v1', 0, False)])
+		manager.queue_relaxed(manialink, [query('SendDisplayManialinkPageToLogin', 'a', 'v2', 0, False)])
+		assert [q.args[:2] for q in manager.send_queue.values()] == [('b', 'v1'), ('a', 'v2')]
+
+		# Global update replaces all the pending updates of the manialink.
+		manager.queue_relaxed(manialink, [query('SendDisplayManialinkPage', 'v3', 0, False)])
+		assert [q.args[0] for q in manager.send_queue.values()] == ['v3']
+		assert manager._send_queue_since is not None
+
+		manager.send_queue.clear()
+		manager._send_queue_since = None
+		manager._send_queue_event.clear()
+
+	async def test_faulted_display(self):
+		instance = Controller.prepare(name='default').instance
+		manager = instance.ui_manager
+		manialink = SimpleNamespace(id='test_faulted', timeout=0, hide_click=False, deduplicate=True)
+		body = '<manialink id="test_faulted"></manialink>'
+		manager.filter_changed_logins(manialink, ['a', 'b', 'c'], manager.get_digest(body), len(body))
+
+		calls = list()
+		fault = dict(faultCode=-1000, faultString='Login unknown.')
+
+		async def multicall(*queries, priority=None):
+			assert all(q.method == 'SendDisplayManialinkPageToLogin' for q in queries)
+			calls.append([q.args[0] for q in queries])
+			return [fault if q.args[0] in ('a,b,c', 'b') else True for q in queries]
+
+		# Without a connection the known methods are empty, and the calls would be turned into script calls.
+		instance.player_manager._online_logins = {'a', 'b'}
+		with asynctest.patch.object(instance.gbx, 'gbx_methods', ['SendDisplayManialinkPageToLogin']), \
+				asynctest.patch.object(instance.gbx, 'multicall', multicall):
+			await manager.execute_queries([
+				(manialink.id, instance.gbx('SendDisplayManialinkPageToLogin', 'a,b,c', body, 0, False)),
+			])
+
+		# The faulted call is retried per online login, the digests of the faulted logins are forgotten.
+		assert calls == [['a,b,c'], ['a', 'b']]
+		assert manager.sent_digests['test_faulted'] == dict()
+		instance.player_manager._online_logins = set()
+		manager.forget_digests('test_faulted')
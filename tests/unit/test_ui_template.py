@@ -1,8 +1,9 @@
 import asynctest
 from jinja2 import Template
 
+from pyplanet.conf import settings
 from pyplanet.core import Controller
-from pyplanet.core.ui.template import load_template
+from pyplanet.core.ui.template import load_template, EnvironmentManager
 
 
 class TestTemplate(asynctest.TestCase):
@@ -23,3 +24,28 @@ class TestTemplate(asynctest.TestCase):
 			title='TRY_TO_SEARCH_THIS'
 		)
 		assert 'TRY_TO_SEARCH_THIS' in body
+
+	async def test_template_cache(self):
+		instance = Controller.prepare(name='default').instance
+		await instance.db.connect()
+		await instance.apps.discover()
+		first = await load_template('core.views/generics/list.xml')
+		second = await load_template('core.views/generics/list.xml')
+		if not EnvironmentManager.environment.auto_reload:
+			assert first.template is second.template
+
+	async def test_template_render_pool(self):
+		instance = Controller.prepare(name='default').instance
+		await instance.db.connect()
+		await instance.apps.discover()
+		template = await load_template('core.views/generics/list.xml')
+		payloads = [dict(title='TITLE_{}'.format(idx)) for idx in range(20)]
+
+		settings.UI_RENDER_WORKERS = 4
+		try:
+			bodies = await template.render_many(payloads)
+		finally:
+			settings.UI_RENDER_WORKERS = 0
+		assert len(bodies) == 20
+		assert all('TITLE_{}'.format(idx) in body for idx, body in enumerate(bodies))
+		assert bodies == await template.render_many(payloads)
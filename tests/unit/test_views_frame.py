@@ -0,0 +1,47 @@
+import random
+
+from pyplanet.utils import style
+from pyplanet.views.generics.frame import Frame
+
+
+def search(rows, text, columns):
+	# Reference implementation of the former list based filter.
+	text = text.lower()
+	return [
+		row for row in rows if any(
+			row[index] and text in (style.style_strip(str(row[index]).lower()) if strip else str(row[index]).lower())
+			for index, strip in columns
+		)
+	]
+
+
+def test_search_and_sort_match_list_implementation():
+	rnd = random.Random(42)
+	rows = [dict(
+		id=idx, name='$o$f00{}$z map {}'.format(rnd.choice(['Alpha', 'Beta', 'Gamma']), rnd.randint(0, 50)),
+		author=rnd.choice(['abc', 'abd', None, '']), karma=rnd.choice([None, 1, 2, 3]),
+	) for idx in range(500)]
+	frame = Frame(rows)
+	columns = [('name', True), ('author', False)]
+
+	for text in ['a', 'al', 'alp', 'alpha map 1', 'ab', 'abd', '$f00', 'BETA']:
+		expected = search(rows, text, columns)
+		positions = frame.search(text, columns)
+		assert frame.select(positions) == expected
+
+		for reverse in (False, True):
+			assert frame.select(positions, 'karma', reverse) == sorted(
+				expected, key=lambda e: (e['karma'] is None, e['karma']), reverse=reverse
+			)
+
+	assert frame.select(None, 'id', True) == list(reversed(rows))
+
+
+def test_frame_of():
+	rows = [dict(name='a')]
+	frame = Frame(rows)
+	assert frame.is_frame_of(rows)
+	assert not frame.is_frame_of(list(rows))
+
+	rows.append(dict(name='b'))
+	assert not frame.is_frame_of(rows)
@@ -0,0 +1,156 @@
+import asynctest
+
+from pyplanet.apps.core.maniaplanet.models import Player
+from pyplanet.core import Controller
+from pyplanet.views.generics.list import ListView
+
+
+class PlayerListView(ListView):
+	model = Player
+	pagination = 'keyset'
+
+	def __init__(self, *args, **kwargs):
+		super().__init__(*args, **kwargs)
+		self.num_per_page = 2
+		self.query = Player.select()
+
+	async def get_fields(self):
+		return [
+			{'name': 'Login', 'index': 'login', 'searching': True, 'sorting': True},
+			{'name': 'Nickname', 'index': 'nickname', 'searching': True, 'sorting': True},
+		]
+
+
+class FakeObjects:
+	"""
+	Counts the executed count queries.
+	"""
+	def __init__(self, count):
+		self.count_result = count
+		self.counts = 0
+
+	async def count(self, query):
+		self.counts += 1
+		return self.count_result
+
+
+class TestListView(asynctest.TestCase):
+
+	def __init__(self, *args, **kwargs):
+		super().__init__(*args, **kwargs)
+
+		self.instance = Controller.prepare(name='default').instance
+
+	def setUp(self):
+		ListView._count_cache.clear()
+
+	async def get_query(self, view):
+		"""
+		Get the SQL of the paginated query of the view, the same way as the view builds it.
+		"""
+		query = await view.apply_filter(await view.get_query())
+		query = await view.apply_ordering(query)
+		return (await view.apply_pagination(query)).sql()
+
+	async def test_seek_expression(self):
+		view = PlayerListView()
+		view.sort_field = {'index': 'nickname'}
+
+		# Ascending: the rows after the cursor, ties on the sort column are broken by the primary key.
+		view.sort_order = 1
+		sql, params = Player.select().where(view.get_seek_expression('nick', 5)).sql()
+		assert '("t1"."nickname" > %s) OR (("t1"."nickname" = %s) AND ("t1"."id" > %s))' in sql
+		assert params == ['nick', 'nick', 5]
+
+		# Descending: the same, but the other way around.
+		view.sort_order = 0
+		sql, params = Player.select().where(view.get_seek_expression('nick', 5)).sql()
+		assert '("t1"."nickname" < %s) OR (("t1"."nickname" = %s) AND ("t1"."id" < %s))' in sql
+		assert params == ['nick', 'nick', 5]
+
+		# Without sorting, only the primary key is used.
+		view.sort_field = None
+		sql, params = Player.select().where(view.get_seek_expression(None, 5)).sql()
+		assert '("t1"."id" > %s)' in sql
+		assert params == [5]
+
+	async def test_pagination(self):
+		view = PlayerListView()
+		view.sort_field = {'index': 'nickname'}
+		view.sort_order = 0
+		rows = [Player(id=idx, login='player{}'.format(idx), nickname='nick') for idx in (4, 3)]
+
+		async def execute(query):
+			return rows
+
+		with asynctest.patch.object(Player, 'objects', FakeObjects(10)), \
+				asynctest.patch.object(Player, 'execute', execute):
+			# The first page is limited, and the last row is remembered as cursor of the page.
+			sql, params = await self.get_query(view)
+			assert 'ORDER BY "t1"."nickname" DESC, "t1"."id" DESC' in sql and 'LIMIT 2' in sql and 'OFFSET' not in sql
+			await view.get_object_data()
+			assert view._cursors == {1: ('nick', 3)}
+
+			# The next page seeks from the cursor of the previous page.
+			view.page = 2
+			sql, params = await self.get_query(view)
+			assert '"t1"."nickname" < %s' in sql and 'LIMIT 2' in sql and 'OFFSET' not in sql
+			assert params == ['nick', 'nick', 3]
+
+			# A page after a page that isn't visited falls back to the offset.
+			view.page = 5
+			sql, params = await self.get_query(view)
+			assert 'LIMIT 2 OFFSET 8' in sql
+			assert params == []
+
+	async def test_cursor_reset(self):
+		view = PlayerListView()
+		view.sort_field = {'index': 'nickname'}
+		view._check_cursors()
+		view._cursors = {1: ('nick', 3)}
+
+		# The cursors stay valid for the same search and sorting.
+		view._check_cursors()
+		assert view._cursors == {1: ('nick', 3)}
+
+		# Changing the sort order resets the cursors.
+		view.sort_order = 0
+		view._check_cursors()
+		assert view._cursors == dict()
+
+		# As does changing the sort field.
+		view._cursors = {1: ('nick', 3)}
+		view.sort_field = {'index': 'login'}
+		view._check_cursors()
+		assert view._cursors == dict()
+
+		# And searching.
+		view._cursors = {1: ('player3', 3)}
+		view.search_text = 'player'
+		view._check_cursors()
+		assert view._cursors == dict()
+
+	async def test_count_cache(self):
+		view = PlayerListView()
+		objects = FakeObjects(10)
+
+		with asynctest.patch.object(Player, 'objects', objects):
+			# The count is cached for the same query.
+			assert await view.get_count(Player.select()) == 10
+			objects.count_result = 11
+			assert await view.get_count(Player.select()) == 10
+			assert objects.counts == 1
+
+			# Another query is counted on its own.
+			assert await view.get_count(Player.select().where(Player.login == 'player1')) == 11
+			assert objects.counts == 2
+
+			# Writing to the model invalidates the cache.
+			Player.mark_written()
+			assert await view.get_count(Player.select()) == 11
+			assert objects.counts == 3
+
+			# Disabling the cache counts every time.
+			view.count_cache_ttl = 0
+			assert await view.get_count(Player.select()) == 11
+			assert objects.counts == 4
@@ -0,0 +1,70 @@
+import asyncio
+import time
+
+from pyplanet.core.events.dispatcher import Signal
+from pyplanet.utils.diagnostics import _LoopMonitor
+
+
+def blocking_receiver(**kwargs):
+	time.sleep(0.15)
+
+
+async def blocking_coroutine():
+	await asyncio.sleep(0)
+	time.sleep(0.15)
+
+
+def test_slow_callbacks():
+	previous_loop = asyncio.get_event_loop()
+	loop = asyncio.new_event_loop()
+	asyncio.set_event_loop(loop)
+	monitor = _LoopMonitor()
+	try:
+		monitor.start(threshold=0.05, summary_interval=0)
+
+		signal = Signal(code='blocking', namespace='test')
+		signal.register(blocking_receiver, weak=False)
+		loop.run_until_complete(signal.send(dict(), raw=True))
+		loop.run_until_complete(blocking_coroutine())
+		loop.run_until_complete(asyncio.sleep(0.6))
+	finally:
+		monitor.stop()
+		loop.close()
+		asyncio.set_event_loop(previous_loop)
+
+	by_name = dict((entry['name'], entry) for entry in monitor.slow_callbacks)
+	assert 'blocking_coroutine' in by_name
+	assert by_name['blocking_coroutine']['duration'] >= 0.15
+	assert by_name['blocking_coroutine']['stack']
+	assert by_name['blocking_coroutine']['location'].endswith('test_diagnostics.py:{}'.format(
+		blocking_coroutine.__code__.co_firstlineno + 2
+	))
+
+	# The sync receiver runs inline in the send task, with the signal in the context.
+	signal_entries = [entry for entry in monitor.slow_callbacks if entry['signal'] == 'test:blocking']
+	assert len(signal_entries) == 1
+
+	summary = monitor.summary()
+	assert summary['slow_callbacks'] == 2
+	assert summary['lag']['max'] >= 0
+	assert 'slow callbacks: 2' in monitor.format_summary()
+	assert 'blocking_coroutine' in monitor.format_report()
+
+	monitor.reset()
+	assert monitor.summary()['slow_callbacks'] == 0
+
+
+def test_stop_restores_loop():
+	original = asyncio.events.Handle._run
+	previous_loop = asyncio.get_event_loop()
+	loop = asyncio.new_event_loop()
+	asyncio.set_event_loop(loop)
+	monitor = _LoopMonitor()
+	try:
+		monitor.start(threshold=0.05, summary_interval=0)
+		assert asyncio.events.Handle._run is not original
+	finally:
+		monitor.stop()
+		loop.close()
+		asyncio.set_event_loop(previous_loop)
+	assert asyncio.events.Handle._run is original